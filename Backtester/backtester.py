@@ -1,67 +1,91 @@
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 import json
 import os
+import queue
 from datetime import datetime
-from multiprocessing import Pool, cpu_count
-from itertools import product
+from time import perf_counter
+from multiprocessing import Pool, cpu_count, util
+from itertools import product, cycle, islice
 
 from config import *
-from utils import log_info, log_error
+from utils import log_info, log_error, worker_log_queue, attach_worker_logging
 from mt5_connector import fetch_historical_data, initialize_mt5, shutdown_mt5
-from strategy import calculate_indicators
+from strategy import calculate_indicators, row_signal, verify_compact, INPUT_COLUMNS
 from funded_risk import BacktestRiskManager
-
-def worker_init():
-    """Initialize MT5 in each pool worker."""
-    if not mt5.initialize():
-        log_error("MT5 initialization failed in worker")
-
-def is_session_allowed(t: datetime.time) -> bool:
-    for start, end in ALLOWED_SESSIONS:
-        if start <= t <= end:
-            return True
-    return False
-
-def simulate_params(task):
+from indicator_cache import IndicatorCache, INDICATOR_KEYS, indicator_key, dataset_fingerprint
+from sim_kernel import BarArrays, simulate_arrays, simulate_exit_grid
+from calendar_index import CalendarIndex, calendar_for
+from shared_data import SharedDataset, attach_frame, detach_all
+from sweep_results import SweepResults
+from optimizer import OPTIMIZERS, build_search_space
+from results_store import ResultsStore
+from intrabar import TickStore, intrabar_path, simulate_intrabar, simulate_intrabar_grid
+from telemetry import TaskStats, SweepProgress, clock
+
+# Per-process caches; each pool worker gets its own copy
+_indicator_cache = IndicatorCache()
+_symbol_meta = {}
+
+def worker_init(log_queue=None):
     """
-    Simulate backtest for one set of params.
-    task = (symbol, timeframe, params_dict, records_list)
+    Route a pool worker's logging through the parent. Workers get symbol meta
+    from the dataset handle, so they don't attach to MT5 up front.
     """
-    symbol, timeframe, params, records = task
-
-    # Build df
-    df = pd.DataFrame.from_records(records)
-    if 'time' not in df.columns:
-        return {"profit": -float('inf'), "params": params}
-    if not pd.api.types.is_datetime64_any_dtype(df['time']):
-        df['time'] = pd.to_datetime(df['time'])
-    df = calculate_indicators(df, params)
-    if df.empty:
-        return {"profit": -float('inf'), "params": params}
-
-    # Ensure symbol info
-    if not mt5.symbol_select(symbol, True):
-        return {"profit": -float('inf'), "params": params}
-    info = mt5.symbol_info(symbol)
-    if info is None:
-        return {"profit": -float('inf'), "params": params}
+    if log_queue is not None:
+        attach_worker_logging(log_queue)
+    # Release cached frames and shared datasets when the worker exits
+    util.Finalize(None, release_worker, exitpriority=10)
 
-    point = info.point
-    contract_size = info.trade_contract_size
+def release_worker():
+    _indicator_cache.clear()
+    detach_all()
 
+def load_indicator_frame(dataset_id, load_bars, params):
+    """
+    Build the indicator frame for params, reusing this worker's cache when possible.
+    load_bars() returns the raw OHLC frame and is only called on a cache miss.
+    """
+    def compute():
+        with clock.time("indicators"):
+            df = load_bars()
+            if 'time' not in df.columns:
+                return pd.DataFrame()
+            if not pd.api.types.is_datetime64_any_dtype(df['time']):
+                df['time'] = pd.to_datetime(df['time'])
+            return calculate_indicators(df, params, INDICATOR_COMPACT, INDICATOR_FLOAT32)
+
+    return _indicator_cache.get(indicator_key(dataset_id, params), compute)
+
+def get_symbol_meta(symbol):
+    """Return (point, contract_size) for symbol, or None if MT5 does not know it. Cached per process."""
+    if symbol not in _symbol_meta:
+        # Pool workers only reach this without a handle meta; attach to MT5 lazily
+        if not mt5.symbol_select(symbol, True) and not (mt5.initialize() and mt5.symbol_select(symbol, True)):
+            return None
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            return None
+        _symbol_meta[symbol] = (info.point, info.trade_contract_size)
+    return _symbol_meta[symbol]
+
+def run_simulation(df, params, point, contract_size, start=1, stop=None, calendar=None):
+    """
+    Walk one indicator frame bar by bar for one param set, over bars [start, stop).
+    Returns profit (-inf if the funded max loss was hit).
+    """
     balance = START_BALANCE
     position = None
     entry = 0.0
     stop_loss = 0.0
     risk_mgr = BacktestRiskManager()
+    calendar = calendar or CalendarIndex(df.index)
+    day, allowed = calendar.day, calendar.allowed
 
-    for i in range(1, len(df)):
-        row = df.iloc[i]
-        prev = df.iloc[i - 1]
-
+    for i in range(max(start, 1), len(df) if stop is None else stop):
         # Daily / total loss checks
-        risk_mgr.update_day(row.name, balance)
+        risk_mgr.update_day_index(day[i], balance)
         if FUNDED_MODE:
             if risk_mgr.is_max_total_loss_exceeded(balance):
                 balance = -float('inf')
@@ -70,16 +94,19 @@ def simulate_params(task):
                 continue
 
         # Skip weekends / out-of-session
-        if row.name.weekday() in WEEKEND_DAYS or not is_session_allowed(row.name.time()):
+        if not allowed[i]:
             continue
 
-        if any(pd.isna([row['supertrend_signal'], row['adx'], row['rsi'], row['close']])):
-            continue
+        row = df.iloc[i]
+        prev = df.iloc[i - 1]
 
-        sig_cur = row['supertrend_signal']
-        sig_pre = prev['supertrend_signal']
+        sig_cur = row_signal(row)
+        sig_pre = row_signal(prev)
         price = row['close']
 
+        if any(pd.isna([sig_cur, row['adx'], row['rsi'], price])):
+            continue
+
         # ENTRY
         if sig_cur == sig_pre and row['adx'] >= params["adx_threshold"] and \
            params["rsi_oversold"] <= row['rsi'] <= params["rsi_overbought"]:
@@ -119,42 +146,123 @@ def simulate_params(task):
                 balance += pnl
                 position = None
 
-    return {"profit": balance - START_BALANCE, "params": params}
+    return balance - START_BALANCE
 
-def backtest_symbol_timeframe(symbol, timeframe, df_raw):
+def simulate_params(task):
     """
-    Build tasks and run simulate_params in parallel.
-    Returns best params + profit.
+    Simulate backtest for one set of params.
+    task = (symbol, timeframe, params_dict, records_list)
     """
-    # Pre-serialize data once
-    records = df_raw.to_dict('records')
-
-    # Symbol META for SL ranges
-    if not mt5.symbol_select(symbol, True):
-        raise RuntimeError(f"Cannot select {symbol}")
-    info = mt5.symbol_info(symbol)
-    if info is None:
-        raise RuntimeError(f"No symbol info for {symbol}")
+    symbol, timeframe, params, records = task
+    if not records:
+        return {"profit": -float('inf'), "params": params}
+    dataset_id = dataset_fingerprint(symbol, timeframe, records[0].get('time'), records[-1].get('time'), len(records))
+    df = load_indicator_frame(dataset_id, lambda: pd.DataFrame.from_records(records), params)
+    return simulate_frame(symbol, df, [params])[0]
 
-    point = info.point
-    contract_size = info.trade_contract_size
-    step_eur = max(1, int((10.0 / (LOT_SIZE * contract_size * point)) + 0.5))
-    risk_amt = START_BALANCE * 0.01
-    max_sl = int(risk_amt / (LOT_SIZE * contract_size * point))
-    min_sl = info.trade_stops_level + 1
-    max_sl = max(max_sl, min_sl)
+def simulate_group(task):
+    """
+    Simulate every param set sharing one indicator set.
+    Indicators are computed once and reused for all threshold/exit combinations.
+    task = (symbol, timeframe, dataset_handle, params_list, window)
+    window is (start, stop) bar positions to score on, or None for the whole history.
+    """
+    symbol, timeframe, handle, params_list, window = task
+    df = load_indicator_frame(handle.dataset_id, lambda: attach_frame(handle), params_list[0])
+    if df.empty:
+        return simulate_frame(symbol, df, params_list)
+    intrabar = None
+    if INTRABAR_ENABLED and handle.meta is not None:
+        intrabar = intrabar_path(symbol, timeframe, handle.dataset_id, bar_times_ms(df.index),
+                                 df['close'].to_numpy(), handle.meta[0])
+    calendar = calendar_for(handle.dataset_id, df.index)
+    return simulate_frame(symbol, df, params_list, window, handle.meta, intrabar, calendar)
+
+def simulate_tagged(item):
+    """
+    simulate_group for an interleaved stream: item = (pair_key, task).
+    Returns (pair_key, results, TaskStats); the stats ride back with the results for progress reporting.
+    A failing task is logged and scored as failed, so it cannot abort the other tasks of the sweep.
+    """
+    key, task = item
+    symbol, timeframe, handle, params_list, window = task
+    clock.take()
+    t0 = perf_counter()
+    try:
+        results = simulate_group(task)
+    except Exception as e:
+        group = {k: params_list[0][k] for k in INDICATOR_KEYS}
+        log_error(f"Error simulating {symbol}@{timeframe} group {group}: {e}")
+        results = [{"profit": -float('inf'), "params": p} for p in params_list]
+    busy = perf_counter() - t0
+    start, stop = window or (1, None)
+    bars = (handle.n_bars if stop is None else stop) - max(start, 1)
+    return key, results, TaskStats(os.getpid(), busy, clock.take().get("indicators", 0.0), bars, len(params_list))
+
+def bar_times_ms(times):
+    """Bar open times (DatetimeIndex or datetime column) as epoch milliseconds."""
+    return np.asarray(times, dtype="datetime64[ms]").astype(np.int64)
+
+def simulate_frame(symbol, df, params_list, window=None, meta=None, intrabar=None, calendar=None):
+    """
+    Score every param set in params_list against one indicator frame, optionally over a bar window.
+    With an IntrabarPath, stops and fills are replayed on the quotes inside each bar.
+    calendar is the dataset's CalendarIndex; it is built from df.index when not given.
+    """
+    failed = [{"profit": -float('inf'), "params": p} for p in params_list]
+    if df.empty:
+        return failed
 
-    tasks = []
-    for atr_p, mult, adx_p, adx_th, rsi_p, rsi_lo, rsi_hi in product(
-            range(5, 15), range(2, 6),
-            range(10, 20, 5), range(20, 35, 5),
-            range(10, 20, 5), range(25, 40, 5),
-            range(60, 75, 5)
-    ):
+    # Ensure symbol info
+    meta = meta or get_symbol_meta(symbol)
+    if meta is None:
+        return failed
+    point, contract_size = meta
+
+    start, stop = window or (1, None)
+    calendar = calendar or CalendarIndex(df.index)
+
+    if intrabar is not None:
+        bars = BarArrays.from_frame(df, calendar)
+        if SIM_ENGINE == "batched" and len(params_list) >= BATCH_MIN_COMBOS:
+            profits = simulate_intrabar_grid(bars, intrabar, params_list, point, contract_size, start, stop)
+        else:
+            profits = [simulate_intrabar(bars, intrabar, p, point, contract_size, start, stop) for p in params_list]
+        return [{"profit": profit, "params": p} for profit, p in zip(profits, params_list)]
+
+    if SIM_ENGINE == "legacy":
+        return [{"profit": run_simulation(df, p, point, contract_size, start, stop, calendar), "params": p}
+                for p in params_list]
+
+    bars = BarArrays.from_frame(df, calendar)
+    if SIM_ENGINE == "batched" and len(params_list) >= BATCH_MIN_COMBOS:
+        profits = simulate_exit_grid(bars, params_list, point, contract_size, start, stop)
+    else:
+        profits = [simulate_arrays(bars, p, point, contract_size, start, stop) for p in params_list]
+
+    if SIM_ENGINE == "parity":
+        batched = simulate_exit_grid(bars, params_list, point, contract_size, start, stop)
+        for k, p in enumerate(params_list):
+            legacy = run_simulation(df, p, point, contract_size, start, stop, calendar)
+            if legacy != profits[k] or legacy != batched[k]:
+                log_error(f"Engine mismatch for {p}: legacy={legacy!r} numpy={profits[k]!r} "
+                          f"batched={batched[k]!r}")
+                profits[k] = legacy
+
+    return [{"profit": profit, "params": p} for profit, p in zip(profits, params_list)]
+
+# Indicator dimensions of the grid; one task per combination
+INDICATOR_GRID = (range(5, 15), range(2, 6), range(10, 20, 5), range(10, 20, 5))
+# Threshold dimensions, expanded inside each task
+THRESHOLD_GRID = (range(20, 35, 5), range(25, 40, 5), range(60, 75, 5))
+
+def iter_group_params(atr_p, mult, adx_p, rsi_p, min_sl, max_sl, step_eur):
+    """Yield every threshold/exit param set for one indicator set."""
+    for adx_th, rsi_lo, rsi_hi in product(*THRESHOLD_GRID):
         for sl in range(min_sl, max_sl + 1, step_eur):
             for trig in range(step_eur, max_sl + 1, step_eur):
                 for trail in range(step_eur, trig + 1, step_eur):
-                    p = {
+                    yield {
                         "supertrend_period":     atr_p,
                         "supertrend_multiplier": mult,
                         "adx_period":            adx_p,
@@ -166,25 +274,266 @@ def backtest_symbol_timeframe(symbol, timeframe, df_raw):
                         "trailing_trigger_pts":  trig,
                         "trailing_dist_pts":     trail
                     }
-                    tasks.append((symbol, timeframe, p, records))
 
-    # limit to one fewer than total cores
-    num_workers = max(1, int(cpu_count()/2))
-    log_info(f"Starting pool with {num_workers} workers (out of {cpu_count()} cores)")
-    with Pool(processes=num_workers, initializer=worker_init) as pool:
-        results = pool.map(simulate_params, tasks)
+def iter_tasks(symbol, timeframe, handle, min_sl, max_sl, step_eur):
+    """
+    Lazily yield one task per indicator set; thresholds and exits ride along in params_list.
+    Only the task being dispatched is materialized.
+    """
+    for atr_p, mult, adx_p, rsi_p in product(*INDICATOR_GRID):
+        params_list = list(iter_group_params(atr_p, mult, adx_p, rsi_p, min_sl, max_sl, step_eur))
+        yield (symbol, timeframe, handle, params_list, None)
 
-    best = max(results, key=lambda x: x["profit"])
-    return best["params"], best["profit"]
+def sweep_ranges(info):
+    """(min_sl, max_sl, step_eur) in points for the exit grid, from symbol meta."""
+    point = info.point
+    contract_size = info.trade_contract_size
+    step_eur = max(1, int((10.0 / (LOT_SIZE * contract_size * point)) + 0.5))
+    risk_amt = START_BALANCE * 0.01
+    max_sl = int(risk_amt / (LOT_SIZE * contract_size * point))
+    min_sl = info.trade_stops_level + 1
+    max_sl = max(max_sl, min_sl)
+    return min_sl, max_sl, step_eur
 
-if __name__ == "__main__":
-    if not initialize_mt5():
-        log_error("MT5 initialization failed.")
-        exit()
+def make_evaluator(pool, num_workers, symbol, timeframe, handle, n_bars, store=None, progress=None):
+    """
+    evaluate(params_list, fraction) for the adaptive optimizers: scores params on the
+    most recent `fraction` of the history through the pool, grouped by indicator set.
+    Full-history scores are read from and written to the results store, if given.
+    """
+    key = (symbol, timeframe)
+    def evaluate(params_list, fraction=1.0):
+        start = max(1, n_bars - int(n_bars * fraction))
+        groups = {}
+        for p in params_list:
+            groups.setdefault(indicator_key(handle.dataset_id, p), []).append(p)
+        cached, tasks = [], []
+        for group in groups.values():
+            if store is not None and start == 1:
+                group, stored = store.split(handle.dataset_id, group)
+                cached.extend(stored)
+            if group:
+                tasks.append((key, (symbol, timeframe, handle, group, (start, None))))
+        if progress is not None:
+            progress.skip(len(cached))
+        chunksize = max(1, len(tasks) // (num_workers * CHUNKS_PER_WORKER))
+        scored = []
+        for _, group, stats in pool.imap_unordered(simulate_tagged, tasks, chunksize=chunksize):
+            if store is not None and start == 1:
+                store.add(handle.dataset_id, group)
+            if progress is not None:
+                progress.add(key, stats)
+                progress.log()
+            scored.extend(group)
+        return cached + scored
+    return evaluate
+
+def default_workers():
+    """POOL_WORKERS, or every core but one for the parent's reducer."""
+    return POOL_WORKERS or max(1, cpu_count() - 1)
+
+def interleave(*iterables):
+    """Round-robin over several task streams until all are exhausted."""
+    active = len(iterables)
+    nexts = cycle(iter(it).__next__ for it in iterables)
+    while active:
+        try:
+            for nxt in nexts:
+                yield nxt()
+        except StopIteration:
+            active -= 1
+            nexts = cycle(islice(nexts, active))
+
+def calibrate(tasks, n_tasks):
+    """
+    Time a few tasks in-process and pick (workers, chunksize) from the measured time per task.
+    With POOL_WORKERS = 0 the pool gets one worker per MIN_WORKER_SECONDS of remaining work,
+    up to every core but one, so a short sweep does not start workers it cannot keep busy.
+    Chunks hold about TARGET_CHUNK_SECONDS of work, but at least CHUNKS_PER_WORKER chunks
+    per worker so a slow tail still spreads across the pool.
+    Returns (workers, chunksize, [(pair_key, results, TaskStats)] of the timed tasks).
+    """
+    timed = [simulate_tagged(item) for item in tasks]
+    per_task = sum(stats.busy_s for _, _, stats in timed) / max(1, len(timed))
+
+    remaining = max(1, n_tasks - len(timed))
+    work = per_task * remaining
+    workers = default_workers()
+    if not POOL_WORKERS and per_task > 0:
+        workers = min(workers, max(1, int(work / MIN_WORKER_SECONDS)))
+    workers = max(1, min(workers, remaining))
+    by_time = int(TARGET_CHUNK_SECONDS / per_task) if per_task > 0 else remaining
+    chunksize = max(1, min(by_time, remaining // (workers * CHUNKS_PER_WORKER)))
+    log_info(f"Calibration: {per_task * 1000:.1f} ms per task over {len(timed)} task(s), "
+             f"~{work:.0f}s of work left -> {workers} workers (of {cpu_count()} cores), chunksize {chunksize}")
+    return workers, chunksize, timed
+
+def group_size(min_sl, max_sl, step_eur):
+    """Number of param sets iter_group_params yields for one indicator set."""
+    n_thresholds = 1
+    for dim in THRESHOLD_GRID:
+        n_thresholds *= len(dim)
+    n_sl = len(range(min_sl, max_sl + 1, step_eur))
+    n_exits = sum(len(range(step_eur, trig + 1, step_eur)) for trig in range(step_eur, max_sl + 1, step_eur))
+    return n_thresholds * n_sl * n_exits
+
+def published_columns():
+    """Bar columns pool workers need; compact runs leave out the ones indicators never read."""
+    return INPUT_COLUMNS if INDICATOR_COMPACT else None
+
+def check_compact(symbol, timeframe, df_raw):
+    """Parity of compact and full indicator frames for the grid's first indicator set; logs the outcome."""
+    params = dict(zip(INDICATOR_KEYS, (dim[0] for dim in INDICATOR_GRID)))
+    full = calculate_indicators(df_raw.copy(), params)
+    compact = calculate_indicators(df_raw.copy(), params, compact=True, float32=INDICATOR_FLOAT32)
+    if not verify_compact(full, compact):
+        log_error(f"[COMPACT] {symbol} @ {timeframe}: compact frames differ from the full ones; "
+                  f"scores may not match INDICATOR_COMPACT = False")
+
+def publish_pair(symbol, timeframe, df_raw):
+    """Publish one pair's bars with its symbol meta; returns (SharedDataset, (min_sl, max_sl, step_eur))."""
+    # Symbol META for SL ranges
+    if not mt5.symbol_select(symbol, True):
+        raise RuntimeError(f"Cannot select {symbol}")
+    info = mt5.symbol_info(symbol)
+    if info is None:
+        raise RuntimeError(f"No symbol info for {symbol}")
 
-    overall = {"best_profit": -float('inf'), "symbol": None, "timeframe": None, "params": None}
+    # Publish bars once; tasks only carry the shared memory handle
+    dataset_id = dataset_fingerprint(symbol, timeframe, df_raw['time'].iloc[0], df_raw['time'].iloc[-1], len(df_raw))
+    if INDICATOR_COMPACT and INDICATOR_COMPACT_VERIFY:
+        check_compact(symbol, timeframe, df_raw)
+    dataset = SharedDataset(df_raw, dataset_id, (info.point, info.trade_contract_size), published_columns())
+    if INTRABAR_ENABLED:
+        # Summarize once here so pool workers only memory-map the result
+        intrabar_path(symbol, timeframe, dataset_id, bar_times_ms(df_raw['time']),
+                      df_raw['close'].to_numpy(), info.point)
+    return dataset, sweep_ranges(info)
+
+def backtest_pairs(pairs):
+    """
+    Backtest every (symbol, timeframe, df_raw) on one long-lived pool.
+    In grid mode the pairs' tasks are interleaved into one stream, so the pool stays
+    saturated while a slow pair finishes; adaptive searches run pair by pair on the same pool.
+    Returns {(symbol, timeframe): SweepResults}.
+    """
+    datasets, ranges = {}, {}
+    progress = None
+    store = ResultsStore() if RESULTS_STORE_ENABLED else None
+    # Results already in the store, found by the task feeder; drained by this thread
+    reused = queue.SimpleQueue()
+    try:
+        for symbol, timeframe, df_raw in pairs:
+            key = (symbol, timeframe)
+            try:
+                datasets[key], ranges[key] = publish_pair(symbol, timeframe, df_raw)
+            except Exception as e:
+                log_error(f"Error preparing {symbol}@{timeframe}: {e}")
+
+        sweeps = {key: SweepResults() for key in datasets}
+        if not datasets:
+            return sweeps
+
+        def pair_tasks(key):
+            symbol, timeframe = key
+            dataset_id = datasets[key].handle.dataset_id
+            for task in iter_tasks(symbol, timeframe, datasets[key].handle, *ranges[key]):
+                if store is not None:
+                    todo, cached = store.split(dataset_id, task[3])
+                    if cached:
+                        reused.put((key, cached))
+                    if not todo:
+                        continue
+                    task = task[:3] + (todo,) + task[4:]
+                yield key, task
+
+        def reduce(key, group, new=True):
+            sweeps[key].add_all(group)
+            if new and store is not None:
+                store.add(datasets[key].handle.dataset_id, group)
+
+        def drain_reused():
+            while not reused.empty():
+                key, cached = reused.get()
+                reduce(key, cached, new=False)
+                progress.skip(len(cached))
+
+        n_groups = 1
+        for dim in INDICATOR_GRID:
+            n_groups *= len(dim)
+        if SEARCH_MODE == "grid":
+            stream = interleave(*(pair_tasks(key) for key in datasets))
+            workers, chunksize, timed = calibrate(islice(stream, CALIBRATION_TASKS), n_groups * len(datasets))
+            total_combos = n_groups * sum(group_size(*ranges[key]) for key in datasets)
+        else:
+            # The optimizers pick their own points and size each batch's chunks (see make_evaluator)
+            workers, chunksize, timed = default_workers(), None, []
+            total_combos = None
+        progress = SweepProgress(total_combos, workers, info={
+            "search_mode": SEARCH_MODE,
+            "sim_engine": "intrabar" if INTRABAR_ENABLED else SIM_ENGINE,
+            "pool_workers": workers,
+            "chunksize": chunksize,
+        })
+        for key, group, stats in timed:
+            reduce(key, group)
+            progress.add(key, stats, timed_in_parent=True)
+
+        log_info(f"Starting pool with {workers} workers for {len(datasets)} pair(s), "
+                 f"{n_groups} indicator groups each")
+        try:
+            with Pool(processes=workers, initializer=worker_init, initargs=(worker_log_queue(),)) as pool:
+                if SEARCH_MODE == "grid":
+                    for key, group, stats in pool.imap_unordered(simulate_tagged, stream, chunksize=chunksize):
+                        reduce(key, group)
+                        progress.add(key, stats)
+                        drain_reused()
+                        progress.log()
+                    drain_reused()
+                else:
+                    for key, dataset in datasets.items():
+                        symbol, timeframe = key
+                        space = build_search_space(*ranges[key])
+                        optimizer = OPTIMIZERS[SEARCH_MODE](space)
+                        log_info(f"{SEARCH_MODE} search on {symbol}@{timeframe}: budget {optimizer.budget} "
+                                 f"of {space.size()} points")
+                        try:
+                            sweeps[key] = optimizer.run(make_evaluator(pool, workers, symbol, timeframe, dataset.handle,
+                                                                       dataset.handle.n_bars, store, progress))
+                        except Exception as e:
+                            log_error(f"Error in {SEARCH_MODE} search on {symbol}@{timeframe}: {e}")
+                # Let the workers exit normally so they release their shared datasets
+                pool.close()
+                pool.join()
+        except Exception as e:
+            # Keep what finished; the caller still writes it out
+            log_error(f"Sweep stopped early: {e}. Keeping the results finished so far.")
+        if store is not None and store.reused:
+            log_info(f"Reused {store.reused} stored results; evaluated only the missing points")
+    finally:
+        # Calibration ran tasks here; drop frames that view the shared blocks before closing them
+        _indicator_cache.clear()
+        for dataset in datasets.values():
+            dataset.close()
+        if store is not None:
+            # Flush whatever finished, even if the sweep was interrupted
+            store.close()
+        if progress is not None:
+            progress.log(force=True)
+            progress.write()
+
+    return sweeps
 
+def backtest_symbol_timeframe(symbol, timeframe, df_raw):
+    """Backtest one pair; returns a SweepResults with the top-K params and tested/rejected counters."""
+    return backtest_pairs([(symbol, timeframe, df_raw)]).get((symbol, timeframe), SweepResults())
+
+def load_pairs():
+    """Load every SYMBOL_LIST x TIMEFRAME_LIST history in the backtest range as (symbol, timeframe, df)."""
+    pairs = []
     for symbol in SYMBOL_LIST:
+        if INTRABAR_ENABLED:
+            TickStore(symbol).download(BACKTEST_START_DATE, BACKTEST_END_DATE)
         for timeframe in TIMEFRAME_LIST:
             log_info(f"Loading data for {symbol} @ {timeframe}...")
             df = fetch_historical_data(symbol, timeframe, BACKTEST_START_DATE, BACKTEST_END_DATE)
@@ -199,23 +548,44 @@ if __name__ == "__main__":
                 continue
 
             log_info(f"Backtesting {symbol} @ {timeframe} on {len(df)} bars...")
-            try:
-                best_p, best_pf = backtest_symbol_timeframe(symbol, timeframe, df)
-            except Exception as e:
-                log_error(f"Error backtesting {symbol}@{timeframe}: {e}")
-                continue
+            pairs.append((symbol, timeframe, df))
+    return pairs
 
-            if best_pf > overall["best_profit"]:
-                overall.update({
-                    "best_profit": best_pf,
-                    "symbol": symbol,
-                    "timeframe": timeframe,
-                    "params": best_p
-                })
+def write_results(sweeps):
+    """Merge {(symbol, timeframe): SweepResults} into best_params.json, the summary and rejected params."""
+    overall = {"best_profit": -float('inf'), "symbol": None, "timeframe": None, "params": None}
+    totals = SweepResults()
+
+    for (symbol, timeframe), sweep in sweeps.items():
+        totals.merge(sweep)
+        best_p, best_pf = sweep.best()
+        log_info(f"{symbol} @ {timeframe}: tested {sweep.tested}, rejected {sweep.rejected}, "
+                 f"best profit {best_pf:.2f}")
+
+        if best_pf > overall["best_profit"]:
+            overall.update({
+                "best_profit": best_pf,
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "params": best_p
+            })
 
     os.makedirs("results", exist_ok=True)
     with open("results/best_params.json", "w") as f:
         json.dump(overall, f, indent=4)
+    with open("results/final_backtest_summary.json", "w") as f:
+        json.dump(totals.summary(), f, indent=4)
+    with open("results/rejected_params.json", "w") as f:
+        json.dump(totals.rejected_params, f, indent=4)
 
     log_info(f"[DONE] Best result: {overall}")
+    return overall
+
+if __name__ == "__main__":
+    if not initialize_mt5():
+        log_error("MT5 initialization failed.")
+        exit()
+
+    # Load every pair first so one pool can work on all of them at once
+    write_results(backtest_pairs(load_pairs()))
     shutdown_mt5()
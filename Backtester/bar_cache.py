@@ -0,0 +1,110 @@
+# bar_cache.py
+
+import json
+import os
+import numpy as np
+from config import BAR_CACHE_DIR
+
+
+def _merge_intervals(intervals):
+    """Merge overlapping/adjacent [start, end] second intervals (inclusive)."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class BarCache:
+    """
+    On-disk cache of MT5 rate arrays, one .npy file per symbol/timeframe
+    plus a JSON sidecar listing which [start, end] second ranges are covered.
+    Arrays are loaded memory-mapped, so only the requested slice is read.
+    """
+    def __init__(self, root=BAR_CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, symbol, timeframe):
+        base = os.path.join(self.root, f"{symbol}_{timeframe}")
+        return base + ".npy", base + ".json"
+
+    def coverage(self, symbol, timeframe):
+        _, meta_path = self._paths(symbol, timeframe)
+        if not os.path.exists(meta_path):
+            return []
+        with open(meta_path, "r") as f:
+            return json.load(f)["covered"]
+
+    def missing_ranges(self, symbol, timeframe, start_s, end_s):
+        """Sub-ranges of [start_s, end_s] not yet covered by the cache."""
+        gaps, cursor = [], start_s
+        for lo, hi in self.coverage(symbol, timeframe):
+            if hi < cursor:
+                continue
+            if lo > end_s:
+                break
+            if lo > cursor:
+                gaps.append((cursor, lo - 1))
+            cursor = max(cursor, hi + 1)
+        if cursor <= end_s:
+            gaps.append((cursor, end_s))
+        return gaps
+
+    def load(self, symbol, timeframe):
+        """Memory-mapped rate array for symbol/timeframe, or None if nothing is cached."""
+        data_path, _ = self._paths(symbol, timeframe)
+        if not os.path.exists(data_path):
+            return None
+        return np.load(data_path, mmap_mode="r")
+
+    def read(self, symbol, timeframe, start_s, end_s):
+        """Copy of the cached bars with start_s <= time <= end_s."""
+        rates = self.load(symbol, timeframe)
+        if rates is None:
+            return None
+        times = rates["time"]
+        lo = np.searchsorted(times, start_s, side="left")
+        hi = np.searchsorted(times, end_s, side="right")
+        return np.array(rates[lo:hi])
+
+    def store(self, symbol, timeframe, rates, start_s, end_s, max_bars=None):
+        """
+        Merge rates into the cache and mark [start_s, end_s] as covered.
+        Newer bars replace cached bars with the same time (e.g. a bar that was still forming).
+        """
+        data_path, meta_path = self._paths(symbol, timeframe)
+        covered = self.coverage(symbol, timeframe)
+
+        if os.path.exists(data_path):
+            cached = np.load(data_path)
+            if not len(rates):
+                # Only marks a range without bars as covered
+                rates = cached[:0]
+            if cached.dtype != rates.dtype:
+                cached, covered = rates[:0], []
+            merged = np.concatenate([cached, rates])
+        else:
+            merged = np.array(rates)
+
+        # Stable sort keeps cached rows ahead of new rows, then keep the last row per time
+        merged = merged[np.argsort(merged["time"], kind="stable")]
+        if len(merged):
+            keep = np.append(merged["time"][1:] != merged["time"][:-1], True)
+            merged = merged[keep]
+
+        covered = _merge_intervals(covered + [[int(start_s), int(end_s)]])
+        if max_bars is not None and len(merged) > max_bars:
+            merged = merged[-max_bars:]
+            first = int(merged["time"][0])
+            covered = [[max(lo, first), hi] for lo, hi in covered if hi >= first]
+
+        # Write to temp files and swap in, so a crash never leaves a half-written cache
+        with open(data_path + ".tmp", "wb") as f:
+            np.save(f, merged)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"symbol": symbol, "timeframe": timeframe, "covered": covered}, f)
+        os.replace(data_path + ".tmp", data_path)
+        os.replace(meta_path + ".tmp", meta_path)
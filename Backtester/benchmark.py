@@ -0,0 +1,198 @@
+# benchmark.py
+# Offline performance benchmark for the backtester. Runs against fake_mt5,
+# so no terminal is needed. Usage:
+#   python benchmark.py --bars 20000 --groups 8
+#   python benchmark.py --bars-file bar_cache/US30_15.npy --compare results/benchmarks/<old>.json
+
+import fake_mt5
+mt5 = fake_mt5.install()
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from multiprocessing import Pool
+import pandas as pd
+
+from utils import log_info, log_error, worker_log_queue
+import backtester
+from backtester import iter_tasks, simulate_group, sweep_ranges, run_simulation, worker_init, default_workers
+from indicator_cache import dataset_fingerprint
+from shared_data import SharedDataset
+from sim_kernel import BarArrays, simulate_arrays
+from strategy import calculate_indicators
+
+BENCH_DIR = os.path.join("results", "benchmarks")
+# Metrics where a higher value is better; everything else compared is lower-is-better
+HIGHER_IS_BETTER = ("bars_per_sec", "tasks_per_sec")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process plus its reaped children, in MB (None if unknown)."""
+    try:
+        import resource
+        peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss +
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        # ru_maxrss is bytes on macOS, KB elsewhere
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def load_bars(args):
+    if args.bars_file:
+        rates = fake_mt5.load_rates(args.bars_file)
+        source = args.bars_file
+    else:
+        rates = fake_mt5.synthetic_rates(args.bars, seed=args.seed)
+        source = f"synthetic(seed={args.seed})"
+    fake_mt5.register_bars(args.symbol, args.timeframe, rates)
+    df = pd.DataFrame(rates)
+    df["time"] = pd.to_datetime(df["time"], unit="s")
+    return df, source
+
+
+def bench_in_process(df, tasks, point, contract_size, n_params):
+    """Time indicators and each engine separately on the first tasks, in this process."""
+    indicator_s = extract_s = 0.0
+    sim_s = {"legacy": 0.0, "numpy": 0.0}
+    sims = {"legacy": 0, "numpy": 0}
+
+    for _, _, _, params_list, _ in tasks:
+        t0 = time.perf_counter()
+        frame = calculate_indicators(df.copy(), params_list[0], backtester.INDICATOR_COMPACT, backtester.INDICATOR_FLOAT32)
+        t1 = time.perf_counter()
+        bars = BarArrays.from_frame(frame)
+        bars.as_lists()
+        t2 = time.perf_counter()
+        indicator_s += t1 - t0
+        extract_s += t2 - t1
+
+        for p in params_list[:n_params]:
+            t0 = time.perf_counter()
+            simulate_arrays(bars, p, point, contract_size)
+            sim_s["numpy"] += time.perf_counter() - t0
+            sims["numpy"] += 1
+        # The legacy loop is ~100x slower; a couple of param sets is enough
+        for p in params_list[:2]:
+            t0 = time.perf_counter()
+            run_simulation(frame, p, point, contract_size)
+            sim_s["legacy"] += time.perf_counter() - t0
+            sims["legacy"] += 1
+
+    n_groups = len(tasks)
+    return {
+        "indicator_s_per_group": indicator_s / n_groups,
+        "extract_s_per_group": extract_s / n_groups,
+        "engines": {
+            engine: {
+                "sim_s_per_task": sim_s[engine] / sims[engine],
+                "bars_per_sec": len(df) * sims[engine] / sim_s[engine],
+            } for engine in sim_s if sims[engine]
+        },
+    }
+
+
+def bench_sweep(symbol, timeframe, df, tasks, workers):
+    """Run the sampled tasks through a pool exactly like backtest_pairs does."""
+    dataset_id = dataset_fingerprint(symbol, timeframe, df['time'].iloc[0], df['time'].iloc[-1], len(df))
+    n_tasks = sum(len(task[3]) for task in tasks)
+    info = mt5.symbol_info(symbol)
+    with SharedDataset(df, dataset_id, (info.point, info.trade_contract_size), backtester.published_columns()) as dataset:
+        tasks = [(s, tf, dataset.handle, params_list, window) for s, tf, _, params_list, window in tasks]
+        t0 = time.perf_counter()
+        with Pool(processes=workers, initializer=worker_init, initargs=(worker_log_queue(),)) as pool:
+            for _ in pool.imap_unordered(simulate_group, tasks):
+                pass
+        elapsed = time.perf_counter() - t0
+    return {
+        "workers": workers,
+        "groups": len(tasks),
+        "tasks": n_tasks,
+        "elapsed_s": elapsed,
+        "tasks_per_sec": n_tasks / elapsed,
+        "bars_per_sec": n_tasks * len(df) / elapsed,
+    }
+
+
+def compare(current, previous_path, tolerance):
+    """Log metrics that moved the wrong way by more than tolerance versus a saved run."""
+    with open(previous_path, "r") as f:
+        previous = json.load(f)
+
+    def flatten(d, prefix=""):
+        out = {}
+        for k, v in d.items():
+            if isinstance(v, dict):
+                out.update(flatten(v, f"{prefix}{k}."))
+            elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                out[f"{prefix}{k}"] = v
+        return out
+
+    cur, prev = flatten(current["metrics"]), flatten(previous["metrics"])
+    regressions = 0
+    for key in sorted(cur.keys() & prev.keys()):
+        if not prev[key] or key.endswith(("workers", "groups", "tasks")):
+            continue
+        ratio = cur[key] / prev[key]
+        worse = ratio < 1 - tolerance if key.endswith(HIGHER_IS_BETTER) else ratio > 1 + tolerance
+        if worse:
+            regressions += 1
+            log_error(f"[REGRESSION] {key}: {prev[key]:.6g} -> {cur[key]:.6g} ({ratio:.2f}x)")
+    log_info(f"Compared against {previous_path}: {regressions} regression(s)")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline backtester benchmark")
+    parser.add_argument("--symbol", default="US30", choices=sorted(fake_mt5.SYMBOLS))
+    parser.add_argument("--timeframe", type=int, default=mt5.TIMEFRAME_M15)
+    parser.add_argument("--bars", type=int, default=20000, help="synthetic bar count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bars-file", help="recorded bars (.npy bar-cache file or CSV) instead of synthetic")
+    parser.add_argument("--groups", type=int, default=4, help="indicator groups to sample from the grid")
+    parser.add_argument("--params-per-group", type=int, default=50, help="param sets timed in-process per group")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--no-sweep", action="store_true", help="skip the pool sweep")
+    parser.add_argument("--compare", help="previous benchmark JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    df, source = load_bars(args)
+    info = mt5.symbol_info(args.symbol)
+    min_sl, max_sl, step_eur = sweep_ranges(info)
+    tasks = list(islice(iter_tasks(args.symbol, args.timeframe, None, min_sl, max_sl, step_eur), args.groups))
+    log_info(f"Benchmarking {args.symbol} @ {args.timeframe}: {len(df)} bars from {source}, {len(tasks)} groups")
+
+    metrics = {"in_process": bench_in_process(df, tasks, info.point, info.trade_contract_size,
+                                              args.params_per_group)}
+    if not args.no_sweep:
+        metrics["sweep"] = bench_sweep(args.symbol, args.timeframe, df, tasks, args.workers)
+    metrics["peak_rss_mb"] = peak_rss_mb()
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "source": source,
+        "n_bars": len(df),
+        "sim_engine": backtester.SIM_ENGINE,
+        "indicator_compact": backtester.INDICATOR_COMPACT,
+        "indicator_float32": backtester.INDICATOR_FLOAT32,
+        "metrics": metrics,
+    }
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    out_path = os.path.join(BENCH_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out_path, "w") as f:
+        json.dump(run, f, indent=4)
+    log_info(f"Benchmark saved to {out_path}: {json.dumps(metrics)}")
+
+    if args.compare and compare(run, args.compare, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,89 @@
+# calendar_index.py
+
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from config import ALLOWED_SESSIONS, WEEKEND_DAYS, DAY_BOUNDARY_TZ, BAR_TIMEZONE
+
+# Per-process calendars by dataset id; every indicator frame of a dataset shares one
+_calendars = OrderedDict()
+_MAX_CALENDARS = 8
+
+
+def session_mask(index):
+    """True for bars whose time of day falls inside ALLOWED_SESSIONS (bounds inclusive)."""
+    tod = (index - index.normalize()).to_numpy().astype('timedelta64[us]').astype(np.int64)
+    mask = np.zeros(len(index), dtype=bool)
+    for start, end in ALLOWED_SESSIONS:
+        lo = ((start.hour * 60 + start.minute) * 60 + start.second) * 1_000_000 + start.microsecond
+        hi = ((end.hour * 60 + end.minute) * 60 + end.second) * 1_000_000 + end.microsecond
+        mask |= (tod >= lo) & (tod <= hi)
+    return mask
+
+
+def day_ordinals(index, day_tz=DAY_BOUNDARY_TZ, bar_tz=BAR_TIMEZONE):
+    """
+    Days since 1970-01-01 for every bar. With day_tz set, days roll over at midnight in that
+    zone (e.g. "Europe/Berlin", as the live DailyLossManager does) instead of at the bar clock's.
+    """
+    if day_tz:
+        # Wall-clock repeats at the DST switch are read as standard time
+        index = (index.tz_localize(bar_tz, ambiguous=np.zeros(len(index), dtype=bool), nonexistent="shift_forward")
+                 .tz_convert(day_tz).tz_localize(None))
+    return index.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def next_true(mask):
+    """For every position, the first position at or after it where mask is True (len(mask) if none)."""
+    n = len(mask)
+    positions = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(positions[::-1])[::-1] if n else positions
+
+
+class CalendarIndex:
+    """
+    Calendar facts of one bar history that only depend on its timestamps:
+    session and weekend masks, the day ordinal of every bar, where each day
+    starts and the next in-session bar, so whole out-of-session spans can be skipped.
+    """
+    def __init__(self, index, day_tz=DAY_BOUNDARY_TZ, bar_tz=BAR_TIMEZONE):
+        index = pd.DatetimeIndex(index)
+        self.session = session_mask(index)
+        self.weekend = np.isin(index.weekday, WEEKEND_DAYS)
+        self.allowed = self.session & ~self.weekend
+        self.day = day_ordinals(index, day_tz, bar_tz)
+        changes = np.ones(len(self.day), dtype=bool)
+        changes[1:] = self.day[1:] != self.day[:-1]
+        self.day_starts = np.flatnonzero(changes)
+        self.next_allowed = next_true(self.allowed)
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.session, self.weekend, self.allowed, self.day,
+                                      self.day_starts, self.next_allowed))
+
+    def day_start(self, i):
+        """Position of the first bar of bar i's day."""
+        return int(self.day_starts[np.searchsorted(self.day_starts, i, side="right") - 1])
+
+    def allowed_spans(self, start=0, stop=None):
+        """(first, end) position ranges of consecutive in-session bars within [start, stop)."""
+        allowed = self.allowed[start:stop]
+        edges = np.flatnonzero(np.diff(allowed.astype(np.int8), prepend=0, append=0))
+        return [(start + int(lo), start + int(hi)) for lo, hi in zip(edges[::2], edges[1::2])]
+
+
+def calendar_for(dataset_id, index):
+    """The CalendarIndex of a dataset, built once per process."""
+    calendar = _calendars.get(dataset_id)
+    if calendar is None or len(calendar) != len(index):
+        calendar = _calendars[dataset_id] = CalendarIndex(index)
+        while len(_calendars) > _MAX_CALENDARS:
+            _calendars.popitem(last=False)
+    else:
+        _calendars.move_to_end(dataset_id)
+    return calendar
@@ -37,3 +37,78 @@ ALLOWED_SESSIONS = [
 ]
 
 WEEKEND_DAYS = [5, 6]  # Saturday and Sunday (skip trading)
+DAY_BOUNDARY_TZ = None  # Zone whose midnight starts a new risk day, e.g. "Europe/Berlin" as live; None = bar clock
+BAR_TIMEZONE = "UTC"    # Zone the bar timestamps are stamped in (the broker's server time)
+
+# --- Performance Settings ---
+INDICATOR_CACHE_SIZE = 32     # Max indicator frames kept per worker (LRU)
+INDICATOR_CACHE_MAX_MB = 512  # Max total size of cached frames per worker
+SIM_ENGINE = "batched"        # "legacy" (df.iloc loop), "numpy" (array kernel), "batched" (all exits per pass)
+                              # or "parity" (run all engines, compare)
+BATCH_MIN_COMBOS = 64         # Smaller groups use the per-param numpy kernel
+TOP_K_RESULTS = 20            # Best param sets kept per sweep
+MAX_REJECTED_KEPT = 1000      # Rejected param sets kept for rejected_params.json
+CHUNKS_PER_WORKER = 4         # Keep at least this many imap chunks per worker
+POOL_WORKERS = 0              # Pool size; 0 = sized by calibration, up to all cores but one
+CALIBRATION_TASKS = 2         # Grid tasks timed in-process to size the pool and its chunks
+TARGET_CHUNK_SECONDS = 2.0    # Aim for imap chunks of about this much work
+MIN_WORKER_SECONDS = 5.0      # With POOL_WORKERS = 0, start one worker per this much estimated work
+RESULTS_STORE_ENABLED = True  # Record every result in SQLite; reruns skip params already scored
+RESULTS_STORE_PATH = "results/results.sqlite"
+RESULTS_STORE_BATCH = 20000   # Rows per committed batch
+PROGRESS_INTERVAL_SECONDS = 5 # Progress line interval while a sweep runs
+RUN_PROFILE_PATH = "results/run_profile.json"  # Throughput/utilization profile of the last sweep
+INDICATOR_COMPACT = True      # Indicator frames keep only close/adx/rsi and an int8 signal
+INDICATOR_FLOAT32 = False     # Store adx/rsi as float32 (half the size; scores can move at threshold edges)
+INDICATOR_COMPACT_VERIFY = True  # Check compact vs full frames once per pair before a sweep
+BAR_CACHE_ENABLED = True      # Keep downloaded bars on disk and only fetch missing ranges
+BAR_CACHE_DIR = "bar_cache"
+
+# --- Adaptive Search ---
+SEARCH_MODE = "grid"          # "grid" (exhaustive), "random", "halving" (successive halving) or "tpe"
+SEARCH_BUDGET = 20000         # Full-history evaluations per symbol/timeframe
+SEARCH_SEED = 42
+SEARCH_PARAMS_PER_INDICATOR = 32  # Param sets sampled per indicator set (one indicator computation each)
+SEARCH_BATCH = 512            # Param sets proposed per TPE round
+SEARCH_EXIT_SCALE = 3         # Widen the SL/trailing range beyond the 1%-risk max
+HALVING_ETA = 3               # Keep the best 1/ETA at each rung
+HALVING_MIN_FRACTION = 1 / 9  # Share of history (most recent bars) scored at the first rung
+TPE_STARTUP = 1000            # Random evaluations before TPE proposals start
+TPE_GAMMA = 0.15              # Share of observations treated as "good"
+SEARCH_RANGES = {
+    "supertrend_period":     range(3, 60),
+    "supertrend_multiplier": [m / 2 for m in range(2, 17)],  # 1.0 .. 8.0
+    "adx_period":            range(5, 50),
+    "adx_threshold":         range(10, 50),
+    "rsi_period":            range(5, 50),
+    "rsi_oversold":          range(5, 50),
+    "rsi_overbought":        range(50, 96),
+}
+
+# --- Intrabar Replay ---
+INTRABAR_ENABLED = False          # Resolve stops and trailing on M1 bars or ticks inside each bar,
+                                  # with spread_pips, commission_per_trade and SLIPPAGE_PIPS applied
+                                  # (backtester.py only; walk_forward.py and distributed.py refuse it)
+INTRABAR_SOURCE = "m1"            # "m1" (four quotes per minute bar) or "ticks"
+INTRABAR_DIR = "intrabar_cache"   # One memory-mapped .npy chunk per symbol/source/day
+INTRABAR_BLOCK_TICKS = 1_000_000  # Quotes read at a time while summarizing; bounds memory
+INTRABAR_OPEN_CHUNKS = 16         # Memory-mapped day chunks kept open per worker
+
+# --- Walk-Forward ---
+WALK_FORWARD_FOLDS = 0            # Rolling IS/OOS folds; 0 = one per pool worker
+WALK_FORWARD_IS_OOS_RATIO = 4     # In-sample bars per out-of-sample bar in each fold
+
+# --- Distributed Sweep ---
+DISTRIBUTED_HOST = "127.0.0.1"       # Coordinator address (workers connect here)
+DISTRIBUTED_PORT = 5557
+DISTRIBUTED_TOKEN = ""               # Shared secret workers must present; set one off localhost
+DISTRIBUTED_LEASE_GROUPS = 4         # Indicator groups per lease
+DISTRIBUTED_LEASE_TIMEOUT = 120      # Seconds without a heartbeat before a lease is re-issued
+DISTRIBUTED_HEARTBEAT_SECONDS = 15
+DISTRIBUTED_CACHE_DIR = "dataset_cache"  # Worker-side copy of the coordinator's bars
+
+# --- Logging ---
+LOG_LEVEL = "INFO"              # "DEBUG" also logs the indicator frame dumps
+LOG_JSON = False                # JSON lines instead of plain text in the log file
+LOG_MAX_BYTES = 5 * 1024 * 1024 # Rotate the log file at this size
+LOG_BACKUP_COUNT = 5
@@ -0,0 +1,417 @@
+# distributed.py
+# Spread the grid sweep over several machines. The coordinator splits every
+# pair's indicator grid into leases; workers connect over TCP, pull leases,
+# score them and send back reduced results. Usage:
+#   python distributed.py coordinator
+#   python distributed.py worker --host 10.0.0.5 --processes 8
+#
+# Wire format: 4-byte big-endian length, a JSON header, then an optional raw
+# payload of header["payload_bytes"] bytes (only used to ship bars).
+
+import MetaTrader5 as mt5
+import argparse
+import hashlib
+import hmac
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from collections import deque, namedtuple
+from itertools import product
+from multiprocessing import Process
+from time import monotonic, sleep
+import numpy as np
+import pandas as pd
+
+from config import (
+    DISTRIBUTED_HOST, DISTRIBUTED_PORT, DISTRIBUTED_TOKEN, DISTRIBUTED_LEASE_GROUPS,
+    DISTRIBUTED_LEASE_TIMEOUT, DISTRIBUTED_HEARTBEAT_SECONDS, DISTRIBUTED_CACHE_DIR, INTRABAR_ENABLED
+)
+from utils import log_info, log_error
+from backtester import (
+    load_indicator_frame, simulate_frame, iter_group_params, sweep_ranges,
+    interleave, default_workers, load_pairs, write_results, INDICATOR_GRID
+)
+from indicator_cache import dataset_fingerprint
+from sweep_results import SweepResults
+
+HEADER = struct.Struct("!I")
+MAX_HEADER_BYTES = 64 * 1024 * 1024
+
+Lease = namedtuple("Lease", ["lease_id", "key", "groups"])
+
+
+# --- Wire protocol ---
+
+def send_message(sock, message, payload=b""):
+    if payload:
+        message = dict(message, payload_bytes=len(payload))
+    body = json.dumps(message).encode()
+    sock.sendall(HEADER.pack(len(body)) + body + payload)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if k == 0:
+            raise ConnectionError("connection closed")
+        got += k
+    return bytes(buf)
+
+
+def recv_message(sock):
+    """(message dict, payload bytes) of the next frame."""
+    (n,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if n > MAX_HEADER_BYTES:
+        raise ConnectionError(f"message header too large ({n} bytes)")
+    message = json.loads(_recv_exact(sock, n))
+    size = message.get("payload_bytes", 0)
+    return message, (_recv_exact(sock, size) if size else b"")
+
+
+def dataset_bytes(df):
+    """The bar columns of df as .npy bytes of one structured array (time as int64 ns)."""
+    fields, columns = [], []
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if col == "time":
+            values = values.astype("datetime64[ns]").astype(np.int64)
+        elif not np.issubdtype(values.dtype, np.number):
+            continue
+        fields.append((col, values.dtype.str))
+        columns.append(values)
+    rates = np.empty(len(df), dtype=fields)
+    for (col, _), values in zip(fields, columns):
+        rates[col] = values
+    buf = io.BytesIO()
+    np.save(buf, rates, allow_pickle=False)
+    return buf.getvalue()
+
+
+def dataset_frame(rates):
+    df = pd.DataFrame(rates)
+    df["time"] = df["time"].astype("datetime64[ns]")
+    return df
+
+
+# --- Coordinator ---
+
+class Coordinator:
+    """
+    Lease book for one sweep. Leases are handed out in an order that interleaves
+    the pairs, extended by heartbeats, and re-queued when their worker disconnects
+    or stays silent for longer than lease_timeout. The first result for a lease wins.
+    """
+    def __init__(self, pairs, lease_groups=DISTRIBUTED_LEASE_GROUPS, lease_timeout=DISTRIBUTED_LEASE_TIMEOUT):
+        self.lease_timeout = lease_timeout
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.datasets = {}  # dataset_id -> .npy bytes
+        self.specs = {}     # (symbol, timeframe) -> lease fields shared by all its leases
+        self.sweeps = {}
+
+        groups = list(product(*INDICATOR_GRID))
+        per_pair = []
+        for symbol, timeframe, df, info in pairs:
+            key = (symbol, timeframe)
+            dataset_id = dataset_fingerprint(symbol, timeframe, df['time'].iloc[0], df['time'].iloc[-1], len(df))
+            self.datasets[dataset_id] = dataset_bytes(df)
+            self.specs[key] = {
+                "dataset_id": dataset_id,
+                "meta": [info.point, info.trade_contract_size],
+                "ranges": list(sweep_ranges(info)),
+            }
+            self.sweeps[key] = SweepResults()
+            per_pair.append([(key, groups[i:i + lease_groups]) for i in range(0, len(groups), lease_groups)])
+
+        self.pending = deque(Lease(n, key, chunk) for n, (key, chunk) in enumerate(interleave(*per_pair)))
+        self.total = len(self.pending)
+        self.active = {}     # lease_id -> (Lease, worker, deadline)
+        self.completed = set()
+        if not self.total:
+            self.finished.set()
+
+    def checkout(self, worker):
+        with self.lock:
+            self._expire()
+            while self.pending:
+                lease = self.pending.popleft()
+                if lease.lease_id not in self.completed:
+                    self.active[lease.lease_id] = (lease, worker, monotonic() + self.lease_timeout)
+                    return lease
+            return None
+
+    def lease_message(self, lease):
+        symbol, timeframe = lease.key
+        return dict(self.specs[lease.key], type="lease", lease_id=lease.lease_id,
+                    symbol=symbol, timeframe=timeframe, groups=[list(g) for g in lease.groups])
+
+    def heartbeat(self, worker, lease_id):
+        with self.lock:
+            entry = self.active.get(lease_id)
+            if entry is not None and entry[1] == worker:
+                self.active[lease_id] = (entry[0], worker, monotonic() + self.lease_timeout)
+
+    def complete(self, worker, lease_id, results):
+        with self.lock:
+            entry = self.active.pop(lease_id, None)
+            if lease_id in self.completed:
+                return
+            if entry is None:
+                # Expired and re-queued, but this worker finished first: take it
+                entry = next(((l, None, 0) for l in self.pending if l.lease_id == lease_id), None)
+                if entry is None:
+                    return
+            self.completed.add(lease_id)
+            self.sweeps[entry[0].key].merge(SweepResults.from_dict(results))
+            if len(self.completed) == self.total:
+                self.finished.set()
+
+    def release_worker(self, worker):
+        """Re-queue every lease the worker still holds (it disconnected)."""
+        with self.lock:
+            for lease_id, (lease, owner, _) in list(self.active.items()):
+                if owner == worker:
+                    del self.active[lease_id]
+                    self.pending.appendleft(lease)
+                    log_error(f"[COORDINATOR] Worker {worker} dropped lease {lease_id}; re-queued")
+
+    def expire(self):
+        with self.lock:
+            self._expire()
+
+    def _expire(self):
+        now = monotonic()
+        for lease_id, (lease, worker, deadline) in list(self.active.items()):
+            if deadline < now:
+                del self.active[lease_id]
+                self.pending.appendleft(lease)
+                log_error(f"[COORDINATOR] Lease {lease_id} from {worker} timed out; re-queued")
+
+    def progress(self):
+        with self.lock:
+            return len(self.completed), len(self.active), len(self.pending)
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        sock = self.request
+        sock.settimeout(coordinator.lease_timeout * 2)
+        worker = None
+        try:
+            hello, _ = recv_message(sock)
+            token = str(hello.get("token", "")).encode()
+            if hello.get("type") != "hello" or not hmac.compare_digest(token, DISTRIBUTED_TOKEN.encode()):
+                send_message(sock, {"type": "error", "reason": "bad hello"})
+                return
+            worker = f"{hello.get('worker')}@{self.client_address[0]}"
+            send_message(sock, {"type": "ok"})
+            log_info(f"[COORDINATOR] Worker {worker} connected")
+
+            while True:
+                message, _ = recv_message(sock)
+                kind = message.get("type")
+                if kind == "lease":
+                    lease = coordinator.checkout(worker)
+                    if lease is not None:
+                        send_message(sock, coordinator.lease_message(lease))
+                    elif coordinator.finished.is_set():
+                        send_message(sock, {"type": "done"})
+                        return
+                    else:
+                        # Everything is leased out; wait in case a lease comes back
+                        send_message(sock, {"type": "wait", "seconds": 1})
+                elif kind == "dataset":
+                    send_message(sock, {"type": "dataset", "dataset_id": message["dataset_id"]},
+                                 coordinator.datasets[message["dataset_id"]])
+                elif kind == "heartbeat":
+                    coordinator.heartbeat(worker, message["lease_id"])
+                    send_message(sock, {"type": "ok"})
+                elif kind == "result":
+                    coordinator.complete(worker, message["lease_id"], message["results"])
+                    send_message(sock, {"type": "ok"})
+                else:
+                    send_message(sock, {"type": "error", "reason": f"unknown message {kind!r}"})
+        except (ConnectionError, OSError, ValueError) as e:
+            if worker is not None and not coordinator.finished.is_set():
+                log_error(f"[COORDINATOR] Worker {worker} disconnected: {e}")
+        finally:
+            if worker is not None:
+                coordinator.release_worker(worker)
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, coordinator):
+        super().__init__(address, _WorkerHandler)
+        self.coordinator = coordinator
+
+
+def run_coordinator(pairs, host=DISTRIBUTED_HOST, port=DISTRIBUTED_PORT):
+    """Serve leases for pairs = [(symbol, timeframe, df, symbol_info)] until all are scored."""
+    if INTRABAR_ENABLED:
+        # Workers have no tick store; they would score on bar closes and report it as intrabar
+        raise RuntimeError("Distributed sweeps have no intrabar engine. Set INTRABAR_ENABLED = False.")
+    coordinator = Coordinator(pairs)
+    server = CoordinatorServer((host, port), coordinator)
+    threading.Thread(target=server.serve_forever, name="coordinator", daemon=True).start()
+    log_info(f"[COORDINATOR] Serving {coordinator.total} leases for {len(pairs)} pair(s) on {host}:{port}")
+
+    try:
+        while not coordinator.finished.wait(DISTRIBUTED_HEARTBEAT_SECONDS):
+            coordinator.expire()
+            done, active, pending = coordinator.progress()
+            log_info(f"[COORDINATOR] {done}/{coordinator.total} leases done, {active} active, {pending} pending")
+        # Give connected workers a moment to collect their "done"
+        sleep(1)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return coordinator.sweeps
+
+
+# --- Worker ---
+
+class Connection:
+    """One request/response socket shared by the scoring loop and the heartbeat thread."""
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.lock = threading.Lock()
+
+    def request(self, message, payload=b""):
+        with self.lock:
+            send_message(self.sock, message, payload)
+            return recv_message(self.sock)
+
+    def close(self):
+        self.sock.close()
+
+
+class Heartbeat:
+    """Keeps a lease alive while it is being scored."""
+    def __init__(self, conn, lease_id):
+        self.conn = conn
+        self.lease_id = lease_id
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop.wait(DISTRIBUTED_HEARTBEAT_SECONDS):
+            try:
+                self.conn.request({"type": "heartbeat", "lease_id": self.lease_id})
+            except (ConnectionError, OSError):
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+
+
+def load_dataset(conn, dataset_id, cache_dir=DISTRIBUTED_CACHE_DIR):
+    """Raw bars for dataset_id from the local cache, downloading them from the coordinator once."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, hashlib.sha1(dataset_id.encode()).hexdigest()[:20] + ".npy")
+    if not os.path.exists(path):
+        _, payload = conn.request({"type": "dataset", "dataset_id": dataset_id})
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    return dataset_frame(np.load(path, allow_pickle=False))
+
+
+def score_lease(lease, df_raw):
+    """Score every indicator group of a lease; returns one SweepResults."""
+    results = SweepResults()
+    symbol, meta, ranges = lease["symbol"], tuple(lease["meta"]), lease["ranges"]
+    for group in lease["groups"]:
+        params_list = list(iter_group_params(*group, *ranges))
+        df = load_indicator_frame(lease["dataset_id"], lambda: df_raw.copy(), params_list[0])
+        results.add_all(simulate_frame(symbol, df, params_list, None, meta))
+    return results
+
+
+def run_worker(host=DISTRIBUTED_HOST, port=DISTRIBUTED_PORT, token=DISTRIBUTED_TOKEN):
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    if INTRABAR_ENABLED:
+        log_error(f"[WORKER {worker}] Distributed sweeps have no intrabar engine. Set INTRABAR_ENABLED = False.")
+        return
+    conn = Connection(host, port)
+    frames = {}
+    try:
+        reply, _ = conn.request({"type": "hello", "worker": worker, "token": token})
+        if reply.get("type") != "ok":
+            log_error(f"[WORKER {worker}] Rejected by coordinator: {reply.get('reason')}")
+            return
+        scored = 0
+        while True:
+            lease, _ = conn.request({"type": "lease"})
+            kind = lease.get("type")
+            if kind == "done":
+                break
+            if kind == "wait":
+                sleep(lease["seconds"])
+                continue
+            if kind != "lease":
+                # "error", or anything this worker does not understand: retrying would not help
+                log_error(f"[WORKER {worker}] Coordinator replied {kind!r}: {lease.get('reason')}. Stopping.")
+                return
+
+            dataset_id = lease["dataset_id"]
+            if dataset_id not in frames:
+                frames[dataset_id] = load_dataset(conn, dataset_id)
+            with Heartbeat(conn, lease["lease_id"]):
+                results = score_lease(lease, frames[dataset_id])
+            conn.request({"type": "result", "lease_id": lease["lease_id"], "results": results.to_dict()})
+            scored += 1
+        log_info(f"[WORKER {worker}] Done after {scored} leases")
+    except (ConnectionError, OSError) as e:
+        log_error(f"[WORKER {worker}] Lost coordinator: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed grid sweep")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("--host", default=DISTRIBUTED_HOST)
+    parser.add_argument("--port", type=int, default=DISTRIBUTED_PORT)
+    parser.add_argument("--processes", type=int, default=default_workers(), help="worker processes on this machine")
+    args = parser.parse_args()
+    if INTRABAR_ENABLED:
+        log_error("Distributed sweeps have no intrabar engine. Set INTRABAR_ENABLED = False.")
+        exit()
+
+    if args.role == "worker":
+        procs = [Process(target=run_worker, args=(args.host, args.port)) for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+    else:
+        from mt5_connector import initialize_mt5, shutdown_mt5
+
+        if not initialize_mt5():
+            log_error("MT5 initialization failed.")
+            exit()
+        pairs = []
+        for symbol, timeframe, df in load_pairs():
+            info = mt5.symbol_info(symbol) if mt5.symbol_select(symbol, True) else None
+            if info is None:
+                log_error(f"No symbol info for {symbol}")
+                continue
+            pairs.append((symbol, timeframe, df, info))
+        write_results(run_coordinator(pairs, args.host, args.port))
+        shutdown_mt5()
@@ -0,0 +1,113 @@
+# fake_mt5.py
+# Offline stand-in for the MetaTrader5 module, for benchmarks and dry runs
+# without a terminal. install() must run before config/backtester are imported.
+
+import sys
+import types
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "point", "digits", "trade_contract_size", "trade_stops_level",
+    "volume_min", "volume_max", "volume_step", "filling_mode"
+])
+AccountInfo = namedtuple("AccountInfo", ["login", "balance", "equity", "trade_allowed"])
+
+SYMBOLS = {
+    "US30":   SymbolInfo("US30", 0.01, 2, 1.0, 0, 0.01, 100.0, 0.01, 1),
+    "EURUSD": SymbolInfo("EURUSD", 0.00001, 5, 100000.0, 0, 0.01, 100.0, 0.01, 1),
+}
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")
+])
+
+TIMEFRAMES = {
+    "TIMEFRAME_M1": 1, "TIMEFRAME_M5": 5, "TIMEFRAME_M15": 15, "TIMEFRAME_M30": 30,
+    "TIMEFRAME_H1": 16385, "TIMEFRAME_H4": 16388, "TIMEFRAME_D1": 16408,
+}
+
+# (symbol, timeframe) -> structured rates array served by copy_rates_*
+_bars = {}
+
+
+def register_bars(symbol, timeframe, rates):
+    _bars[(symbol, timeframe)] = rates
+
+
+def synthetic_rates(n_bars, seed=0, start="2024-01-01", bar_seconds=900, start_price=40000.0, vol=0.0015):
+    """Seeded random-walk OHLC bars in MT5 rate-array layout."""
+    rng = np.random.default_rng(seed)
+    steps = 4
+    # Sub-steps per bar give a realistic high/low envelope around open/close
+    path = start_price * np.exp(np.cumsum(rng.normal(0.0, vol / np.sqrt(steps), n_bars * steps + 1)))
+    segments = np.lib.stride_tricks.sliding_window_view(path, steps + 1)[::steps][:n_bars]
+
+    rates = np.zeros(n_bars, dtype=RATES_DTYPE)
+    rates["time"] = int(pd.Timestamp(start).timestamp()) + np.arange(n_bars) * bar_seconds
+    rates["open"] = segments[:, 0]
+    rates["close"] = segments[:, -1]
+    rates["high"] = segments.max(axis=1)
+    rates["low"] = segments.min(axis=1)
+    rates["tick_volume"] = rng.integers(50, 500, n_bars)
+    rates["spread"] = 2
+    return rates
+
+
+def load_rates(path):
+    """Recorded bars from a bar-cache .npy file or a CSV with time/open/high/low/close columns."""
+    if path.endswith(".npy"):
+        return np.array(np.load(path, mmap_mode="r"))
+    df = pd.read_csv(path)
+    rates = np.zeros(len(df), dtype=RATES_DTYPE)
+    times = pd.to_datetime(df["time"])
+    rates["time"] = (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    for col in ("open", "high", "low", "close", "tick_volume", "spread", "real_volume"):
+        if col in df.columns:
+            rates[col] = df[col].to_numpy()
+    return rates
+
+
+def _to_seconds(value):
+    return int(pd.Timestamp(value).timestamp())
+
+
+def _copy_rates_range(symbol, timeframe, date_from, date_to):
+    rates = _bars.get((symbol, timeframe))
+    if rates is None:
+        return None
+    lo = np.searchsorted(rates["time"], _to_seconds(date_from), side="left")
+    hi = np.searchsorted(rates["time"], _to_seconds(date_to), side="right")
+    return rates[lo:hi].copy()
+
+
+def _copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    rates = _bars.get((symbol, timeframe))
+    if rates is None:
+        return None
+    end = len(rates) - start_pos
+    return rates[max(0, end - count):end].copy()
+
+
+def install():
+    """Register the stand-in as sys.modules['MetaTrader5'] and return it."""
+    module = sys.modules.get("MetaTrader5")
+    if module is not None and getattr(module, "IS_FAKE", False):
+        return module
+
+    module = types.ModuleType("MetaTrader5")
+    module.IS_FAKE = True
+    for name, value in TIMEFRAMES.items():
+        setattr(module, name, value)
+    module.initialize = lambda *args, **kwargs: True
+    module.shutdown = lambda: None
+    module.last_error = lambda: (1, "Success")
+    module.account_info = lambda: AccountInfo(0, 10000.0, 10000.0, True)
+    module.symbol_select = lambda symbol, enable=True: symbol in SYMBOLS
+    module.symbol_info = SYMBOLS.get
+    module.copy_rates_range = _copy_rates_range
+    module.copy_rates_from_pos = _copy_rates_from_pos
+    sys.modules["MetaTrader5"] = module
+    return module
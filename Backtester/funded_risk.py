@@ -60,6 +60,12 @@ class BacktestRiskManager:
             self.current_day = timestamp.date()
             self.day_start_balance = balance
 
+    def update_day_index(self, day, balance):
+        """update_day for a precomputed day ordinal (CalendarIndex.day) instead of a timestamp."""
+        if self.current_day != day:
+            self.current_day = day
+            self.day_start_balance = balance
+
     def is_daily_loss_exceeded(self, balance):
         if self.day_start_balance is None:
             self.day_start_balance = balance
@@ -0,0 +1,69 @@
+# indicator_cache.py
+
+from collections import OrderedDict
+import pandas as pd
+from config import INDICATOR_CACHE_SIZE, INDICATOR_CACHE_MAX_MB
+
+# Only these params change the SuperTrend/ADX/RSI frame; thresholds and exits do not.
+INDICATOR_KEYS = ("supertrend_period", "supertrend_multiplier", "adx_period", "rsi_period")
+
+
+def indicator_key(dataset_id, params):
+    return (dataset_id,) + tuple(params[k] for k in INDICATOR_KEYS)
+
+
+def dataset_fingerprint(symbol, timeframe, first_time, last_time, n_bars):
+    """Cheap id for one loaded history: symbol, timeframe, first/last bar time and length."""
+    return f"{symbol}:{timeframe}:{pd.Timestamp(first_time)}:{pd.Timestamp(last_time)}:{n_bars}"
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator frames, bounded by entry count and total size.
+    One instance lives in each pool worker.
+    """
+    def __init__(self, max_entries=INDICATOR_CACHE_SIZE, max_mb=INDICATOR_CACHE_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        """Return the cached frame for key, calling compute() on a miss."""
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return self._frames[key]
+
+        self.misses += 1
+        frame = compute()
+        self.put(key, frame)
+        return frame
+
+    def put(self, key, frame):
+        if key in self._frames:
+            self._evict(key)
+        size = int(frame.memory_usage(index=True).sum())
+        self._frames[key] = frame
+        self._sizes[key] = size
+        self.total_bytes += size
+
+        # Always keep the newest entry, even if it alone is over the byte limit
+        while len(self._frames) > 1 and (
+                len(self._frames) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._evict(next(iter(self._frames)))
+
+    def _evict(self, key):
+        self._frames.pop(key)
+        self.total_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        self._frames.clear()
+        self._sizes.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
@@ -0,0 +1,579 @@
+# intrabar.py
+#
+# High-resolution stop and trailing fills for the backtest. Quotes (real ticks,
+# or M1 bars expanded into an open/low/high/close path) are stored as one .npy
+# chunk per symbol and day and read memory-mapped. Every signal bar gets a
+# summary of the quotes inside it, so the replay only reads quotes for the few
+# bars where a stop can actually fire.
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import MetaTrader5 as mt5
+import numpy as np
+import pandas as pd
+from config import (INTRABAR_SOURCE, INTRABAR_DIR, INTRABAR_BLOCK_TICKS, INTRABAR_OPEN_CHUNKS,
+                    spread_pips, commission_per_trade, SLIPPAGE_PIPS, START_BALANCE, LOT_SIZE, FUNDED_MODE,
+                    WEEKEND_DAYS)
+from funded_risk import BacktestRiskManager
+from sim_kernel import BUY, SELL, FLAT
+from utils import log_info, log_error
+
+TICK_DTYPE = np.dtype([("time_msc", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+# Quotes of bar i are the global positions [lo, hi); a bar without quotes has lo == hi and
+# stands in for them with one quote at its close, so its stops are checked at the bar close
+SUMMARY_DTYPE = np.dtype([("bid_min", "<f8"), ("bid_max", "<f8"), ("ask_min", "<f8"), ("ask_max", "<f8"),
+                          ("close_bid", "<f8"), ("close_ask", "<f8"), ("lo", "<i8"), ("hi", "<i8")])
+# Offsets of the four quotes an M1 bar is expanded into
+M1_QUOTE_OFFSETS_MS = np.array([0, 15_000, 30_000, 59_000], dtype=np.int64)
+# Part of the saved summaries' key; bump when the summary layout or its meaning changes
+SUMMARY_VERSION = 2
+
+# Per-process cache: dataset_id -> IntrabarPath
+_paths = {}
+
+
+def timeframe_seconds(timeframe):
+    """Bar length in seconds for an MT5 TIMEFRAME_* constant (minutes, 0x4000|hours, 0x8001 = week)."""
+    if timeframe < 0x4000:
+        return timeframe * 60
+    if timeframe < 0x8000:
+        return (timeframe - 0x4000) * 3600
+    if timeframe == 0x8001:
+        return 7 * 86400
+    raise ValueError(f"Unsupported timeframe {timeframe}")
+
+
+def chunk_stamp(paths):
+    """[name, size, mtime_ns] of every day file, to tell whether a summary still matches the store."""
+    stamp = []
+    for path in paths:
+        st = os.stat(path)
+        stamp.append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+    return stamp
+
+
+def m1_to_quotes(rates, point):
+    """
+    Expand M1 rates into four quotes per bar: open, low and high in the order a bar
+    of that colour most likely took them (up bars dip first), then close.
+    The ask is the bid plus the bar's spread.
+    """
+    bullish = rates["close"] >= rates["open"]
+    first = np.where(bullish, rates["low"], rates["high"])
+    second = np.where(bullish, rates["high"], rates["low"])
+    bid = np.stack([rates["open"], first, second, rates["close"]], axis=1).ravel()
+
+    quotes = np.empty(len(bid), dtype=TICK_DTYPE)
+    quotes["time_msc"] = (rates["time"].astype(np.int64)[:, None] * 1000 + M1_QUOTE_OFFSETS_MS).ravel()
+    quotes["bid"] = bid
+    quotes["ask"] = bid + np.repeat(rates["spread"].astype(np.float64) * point, 4)
+    return quotes
+
+
+def ticks_to_quotes(ticks):
+    """MT5 tick array -> TICK_DTYPE, dropping ticks that carry no bid (last-price-only updates)."""
+    ticks = ticks[ticks["bid"] > 0]
+    quotes = np.empty(len(ticks), dtype=TICK_DTYPE)
+    quotes["time_msc"] = ticks["time_msc"]
+    quotes["bid"] = ticks["bid"]
+    quotes["ask"] = np.maximum(ticks["ask"], ticks["bid"])
+    return quotes
+
+
+class TickStore:
+    """
+    Quotes for one symbol and source, one TICK_DTYPE .npy file per day under
+    INTRABAR_DIR/<symbol>_<source>/YYYYMMDD.npy. Weekend days without quotes are
+    stored empty, so they are not downloaded again; an empty weekday (history the
+    terminal has not loaded yet, or a holiday) is left out and retried next time.
+    """
+    def __init__(self, symbol, source=INTRABAR_SOURCE, root=INTRABAR_DIR):
+        self.symbol = symbol
+        self.source = source
+        self.dir = os.path.join(root, f"{symbol}_{source}")
+        os.makedirs(self.dir, exist_ok=True)
+
+    def day_path(self, day):
+        return os.path.join(self.dir, f"{pd.Timestamp(day):%Y%m%d}.npy")
+
+    def has_day(self, day):
+        return os.path.exists(self.day_path(day))
+
+    def write_day(self, day, quotes):
+        path = self.day_path(day)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(quotes, dtype=TICK_DTYPE))
+        os.replace(path + ".tmp", path)
+
+    def chunks(self, first_ms, last_ms):
+        """Day files overlapping [first_ms, last_ms], oldest first."""
+        days = pd.date_range(pd.to_datetime(first_ms, unit="ms").normalize(),
+                             pd.to_datetime(last_ms, unit="ms").normalize(), freq="D")
+        return [self.day_path(day) for day in days if self.has_day(day)]
+
+    def download(self, start_date, end_date):
+        """Fetch every day in [start_date, end_date] that is not stored yet (today is always refetched)."""
+        if not mt5.symbol_select(self.symbol, True):
+            log_error(f"[INTRABAR] Symbol {self.symbol} not available in MT5.")
+            return False
+        info = mt5.symbol_info(self.symbol)
+        today = pd.Timestamp.now().normalize()
+        fetched = empty = 0
+        for day in pd.date_range(pd.to_datetime(start_date).normalize(),
+                                 pd.to_datetime(end_date).normalize(), freq="D"):
+            if self.has_day(day) and day < today:
+                continue
+            day_end = day + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+            if self.source == "ticks":
+                raw = mt5.copy_ticks_range(self.symbol, day, day_end, mt5.COPY_TICKS_ALL)
+                quotes = None if raw is None else ticks_to_quotes(raw)
+            else:
+                raw = mt5.copy_rates_range(self.symbol, mt5.TIMEFRAME_M1, day, day_end)
+                quotes = None if raw is None else m1_to_quotes(raw, info.point)
+            if quotes is None:
+                log_error(f"[INTRABAR] Could not fetch {self.source} for {self.symbol} on {day:%Y-%m-%d}")
+                continue
+            if len(quotes) == 0 and day.weekday() not in WEEKEND_DAYS:
+                empty += 1
+                continue
+            self.write_day(day, quotes)
+            fetched += 1
+        log_info(f"[INTRABAR] {self.symbol} {self.source}: fetched {fetched} day(s) into {self.dir}")
+        if empty:
+            log_error(f"[INTRABAR] {self.symbol} {self.source}: no quotes on {empty} weekday(s); "
+                      f"not stored, they are fetched again next time")
+        return True
+
+
+class IntrabarPath:
+    """
+    The quotes inside every bar of one dataset. Bar i owns the quotes after bar i-1's
+    close up to its own close, so quotes in a gap between bars go to the next bar.
+    Asks are floored at bid + spread_pips. Quotes are addressed by a global position
+    across the day chunks; chunks are memory-mapped on demand, a few at a time.
+    Bars without quotes fall back to their close (bid) and close + spread (ask).
+    """
+    def __init__(self, summary, chunks, starts, spread, stamp=None):
+        self.summary = summary
+        self.chunks = list(chunks)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.spread = spread
+        self.stamp = stamp  # chunk_stamp() of the day files the summary was built from
+        self._open = OrderedDict()
+        self._lists = None
+
+    @classmethod
+    def build(cls, store, bar_open_ms, bar_close, bar_ms, spread):
+        """Summarize the store's quotes for bars opening at bar_open_ms, INTRABAR_BLOCK_TICKS quotes at a time."""
+        bar_open_ms = np.asarray(bar_open_ms, dtype=np.int64)
+        close_ms = bar_open_ms + bar_ms
+        n = len(close_ms)
+        summary = np.zeros(n, dtype=SUMMARY_DTYPE)
+        for name in ("bid_min", "ask_min"):
+            summary[name] = np.inf
+        for name in ("bid_max", "ask_max"):
+            summary[name] = -np.inf
+        summary["close_bid"] = summary["close_ask"] = np.nan
+        summary["lo"] = summary["hi"] = -1
+
+        chunks, starts, offset = [], [], 0
+        for path in store.chunks(int(bar_open_ms[0]), int(close_ms[-1]) - 1):
+            data = np.load(path, mmap_mode="r")
+            chunks.append(path)
+            starts.append(offset)
+            for b in range(0, len(data), INTRABAR_BLOCK_TICKS):
+                block = data[b:b + INTRABAR_BLOCK_TICKS]
+                times = block["time_msc"]
+                bar = np.searchsorted(close_ms, times, side="right")
+                k0 = np.searchsorted(times, bar_open_ms[0], side="left")
+                k1 = np.searchsorted(bar, n, side="left")
+                if k0 >= k1:
+                    continue
+                bar = bar[k0:k1]
+                bid = np.asarray(block["bid"][k0:k1])
+                ask = np.maximum(block["ask"][k0:k1], bid + spread)
+
+                # Quotes are time ordered, so each bar is one contiguous run
+                first = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]])
+                last = np.r_[first[1:] - 1, len(bar) - 1]
+                idx = bar[first]
+                for name, values, reduce in (("bid_min", bid, np.minimum), ("bid_max", bid, np.maximum),
+                                             ("ask_min", ask, np.minimum), ("ask_max", ask, np.maximum)):
+                    summary[name][idx] = reduce(summary[name][idx], reduce.reduceat(values, first))
+                summary["close_bid"][idx] = bid[last]
+                summary["close_ask"][idx] = ask[last]
+                position = offset + b + k0
+                unseen = summary["lo"][idx] < 0
+                summary["lo"][idx[unseen]] = position + first[unseen]
+                summary["hi"][idx] = position + last + 1
+            offset += len(data)
+
+        empty = summary["lo"] < 0
+        summary["lo"][empty] = summary["hi"][empty] = 0
+        bid = np.asarray(bar_close, dtype=np.float64)[empty]
+        for name in ("bid_min", "bid_max", "close_bid"):
+            summary[name][empty] = bid
+        for name in ("ask_min", "ask_max", "close_ask"):
+            summary[name][empty] = bid + spread
+        return cls(summary, chunks, starts, spread, chunk_stamp(chunks))
+
+    def save(self, base):
+        with open(base + ".npy.tmp", "wb") as f:
+            np.save(f, self.summary)
+        with open(base + ".json.tmp", "w") as f:
+            json.dump({"chunks": self.chunks, "starts": self.starts.tolist(), "spread": self.spread,
+                       "stamp": self.stamp}, f)
+        os.replace(base + ".npy.tmp", base + ".npy")
+        os.replace(base + ".json.tmp", base + ".json")
+
+    @classmethod
+    def load(cls, base):
+        with open(base + ".json", "r") as f:
+            meta = json.load(f)
+        return cls(np.load(base + ".npy", mmap_mode="r"), meta["chunks"], meta["starts"], meta["spread"],
+                   meta.get("stamp"))
+
+    def __len__(self):
+        return len(self.summary)
+
+    @property
+    def n_quotes(self):
+        return int(self.summary["hi"].max()) if len(self.summary) else 0
+
+    @property
+    def n_missing(self):
+        """Bars without quotes, whose stops are only checked at the bar close."""
+        return int((self.summary["hi"] == self.summary["lo"]).sum())
+
+    def as_lists(self):
+        if self._lists is None:
+            self._lists = tuple(self.summary[name].tolist() for name in
+                                ("bid_min", "bid_max", "ask_min", "ask_max", "close_bid", "close_ask"))
+        return self._lists
+
+    def _chunk(self, c):
+        data = self._open.get(c)
+        if data is None:
+            data = self._open[c] = np.load(self.chunks[c], mmap_mode="r")
+            if len(self._open) > INTRABAR_OPEN_CHUNKS:
+                self._open.popitem(last=False)
+        else:
+            self._open.move_to_end(c)
+        return data
+
+    def quotes(self, i):
+        """(bid, ask) arrays of the quotes inside bar i."""
+        lo, hi = int(self.summary["lo"][i]), int(self.summary["hi"][i])
+        if lo == hi:
+            return self.summary["close_bid"][i:i + 1], self.summary["close_ask"][i:i + 1]
+        c = int(np.searchsorted(self.starts, lo, side="right")) - 1
+        parts = []
+        while lo < hi:
+            data = self._chunk(c)
+            base = int(self.starts[c])
+            end = min(hi, base + len(data))
+            parts.append(data[lo - base:end - base])
+            lo, c = end, c + 1
+        block = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        bid = np.asarray(block["bid"])
+        return bid, np.maximum(block["ask"], bid + self.spread)
+
+    def long_stops(self, i, entry, stop_loss, point, trig_pts, trail_dist):
+        """
+        Replay bar i against long trailing stops (arrays, one entry per position).
+        Returns (bid each stop filled at, NaN if not hit; stop level at the fill or at the bar's end).
+        """
+        bid, _ = self.quotes(i)
+        return _replay_stops(bid, entry, stop_loss, point, trig_pts, trail_dist)
+
+    def short_stops(self, i, entry, stop_loss, point, trig_pts, trail_dist):
+        """long_stops for shorts: trails and triggers on the ask."""
+        _, ask = self.quotes(i)
+        fill, level = _replay_stops(-ask, -np.asarray(entry), -np.asarray(stop_loss), point, trig_pts, trail_dist)
+        return -fill, -level
+
+
+def _replay_stops(prices, entry, stop_loss, point, trig_pts, trail_dist):
+    """
+    First quote at or through each long trailing stop (shorts pass negated prices and levels).
+    The trailing level after a quote only depends on the running peak, so every
+    position is replayed at once as a quotes x positions matrix, in column blocks
+    that keep it under INTRABAR_BLOCK_TICKS cells.
+    """
+    entry, stop_loss = np.atleast_1d(entry), np.atleast_1d(stop_loss)
+    trig_pts, trail_dist = np.atleast_1d(trig_pts), np.atleast_1d(trail_dist)
+    peak = np.maximum.accumulate(prices)[:, None]
+    fill = np.full(len(entry), np.nan)
+    level = np.empty(len(entry))
+    width = max(1, INTRABAR_BLOCK_TICKS // len(prices))
+    for c in range(0, len(entry), width):
+        cols = slice(c, c + width)
+        armed = (peak - entry[cols]) / point >= trig_pts[cols]
+        levels = np.where(armed, np.maximum(stop_loss[cols], peak - trail_dist[cols]), stop_loss[cols])
+        hits = prices[:, None] <= levels
+        hit = hits.any(axis=0)
+        first = np.where(hit, hits.argmax(axis=0), len(prices) - 1)
+        level[cols] = levels[first, np.arange(levels.shape[1])]
+        fill[cols] = np.where(hit, prices[first], np.nan)
+    return fill, level
+
+
+def intrabar_path(symbol, timeframe, dataset_id, bar_open_ms, bar_close, point):
+    """
+    IntrabarPath for one dataset: from this process's cache, from the summary a
+    previous build saved under INTRABAR_DIR/summaries, or built from the tick store.
+    A saved summary is rebuilt when the day files it covers were added or rewritten since.
+    """
+    path = _paths.get(dataset_id)
+    if path is not None:
+        return path
+    key = hashlib.sha1(f"{dataset_id}|{INTRABAR_SOURCE}|{spread_pips}|{point}|{SUMMARY_VERSION}".encode()).hexdigest()
+    base = os.path.join(INTRABAR_DIR, "summaries", key)
+    store = TickStore(symbol)
+    bar_open_ms = np.asarray(bar_open_ms, dtype=np.int64)
+    bar_ms = timeframe_seconds(timeframe) * 1000
+    stamp = chunk_stamp(store.chunks(int(bar_open_ms[0]), int(bar_open_ms[-1]) + bar_ms - 1))
+    if os.path.exists(base + ".json"):
+        path = IntrabarPath.load(base)
+        if path.stamp != stamp:
+            log_info(f"[INTRABAR] {symbol} {INTRABAR_SOURCE} quotes changed since {symbol}@{timeframe} "
+                     f"was summarized. Rebuilding.")
+            path = None
+    if path is None:
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        path = IntrabarPath.build(store, bar_open_ms, bar_close, bar_ms, spread_pips * point)
+        path.save(base)
+        log_info(f"[INTRABAR] Summarized {path.n_quotes} {INTRABAR_SOURCE} quotes over {len(path)} bars "
+                 f"of {symbol}@{timeframe}")
+        if path.n_missing:
+            log_error(f"[INTRABAR] {path.n_missing} of {len(path)} bars of {symbol}@{timeframe} have no "
+                      f"{INTRABAR_SOURCE} quotes; their stops are only checked at the bar close")
+    _paths[dataset_id] = path
+    return path
+
+
+def simulate_intrabar(bars, path, params, point, contract_size, start=1, stop=None):
+    """
+    simulate_arrays with fills taken from the quotes inside each bar. Signals and
+    entries still happen at the bar close, filled at the closing ask (buys) or bid
+    (sells). Stops and trailing stops rest with the broker, so they are replayed on
+    every bar a position is open, in or out of session, and fill at the quote that
+    crossed them; on bars without quotes, at the bar close. Every market fill pays
+    SLIPPAGE_PIPS and every round trip pays commission_per_trade. Returns profit (-inf if the funded max loss was hit).
+    """
+    close, adx, rsi, signal, tradable, day = bars.as_lists()
+    bid_min, bid_max, ask_min, ask_max, close_bid, close_ask = path.as_lists()
+
+    risk = BacktestRiskManager()
+    start_balance = risk.start_balance
+    daily_loss_limit = risk.daily_loss_limit
+    max_total_loss = risk.max_total_loss
+
+    adx_th = params["adx_threshold"]
+    rsi_lo = params["rsi_oversold"]
+    rsi_hi = params["rsi_overbought"]
+    sl_dist = params["stop_loss_pts"] * point
+    trig_pts = params["trailing_trigger_pts"]
+    trail_dist = params["trailing_dist_pts"] * point
+    lot_value = LOT_SIZE * contract_size
+    slippage = SLIPPAGE_PIPS * point
+
+    balance = START_BALANCE
+    position = FLAT
+    entry = 0.0
+    stop_loss = 0.0
+    current_day = None
+    day_start_balance = balance
+
+    for i in range(max(start, 1), len(close) if stop is None else stop):
+        # Daily / total loss checks
+        if day[i] != current_day:
+            current_day = day[i]
+            day_start_balance = balance
+        if FUNDED_MODE and start_balance - balance >= max_total_loss:
+            balance = -float('inf')
+            break
+
+        # STOPS inside the bar; the extremes rule out a hit without reading quotes
+        if position == BUY:
+            reach = stop_loss
+            if (bid_max[i] - entry) / point >= trig_pts:
+                reach = max(stop_loss, bid_max[i] - trail_dist)
+            if bid_min[i] > reach:
+                stop_loss = reach
+            else:
+                fill, level = path.long_stops(i, entry, stop_loss, point, trig_pts, trail_dist)
+                stop_loss = float(level[0])
+                if fill[0] == fill[0]:
+                    fill = float(fill[0])
+                    balance += (fill - slippage - entry) * lot_value - commission_per_trade
+                    position = FLAT
+
+        elif position == SELL:
+            reach = stop_loss
+            if (entry - ask_min[i]) / point >= trig_pts:
+                reach = min(stop_loss, ask_min[i] + trail_dist)
+            if ask_max[i] < reach:
+                stop_loss = reach
+            else:
+                fill, level = path.short_stops(i, entry, stop_loss, point, trig_pts, trail_dist)
+                stop_loss = float(level[0])
+                if fill[0] == fill[0]:
+                    fill = float(fill[0])
+                    balance += (entry - fill - slippage) * lot_value - commission_per_trade
+                    position = FLAT
+
+        if FUNDED_MODE and day_start_balance - balance >= daily_loss_limit:
+            continue
+
+        # Skip weekends / out-of-session / NaN inputs
+        if not tradable[i]:
+            continue
+
+        sig_cur = signal[i]
+        bid = close_bid[i] if close_bid[i] == close_bid[i] else close[i]
+        ask = close_ask[i] if close_ask[i] == close_ask[i] else bid + path.spread
+
+        # ENTRY at the closing quote
+        if sig_cur == signal[i - 1] and adx[i] >= adx_th and rsi_lo <= rsi[i] <= rsi_hi:
+            if sig_cur == BUY and position != BUY:
+                if position == SELL:
+                    balance += (entry - ask - slippage) * lot_value - commission_per_trade
+                position = BUY
+                entry = ask + slippage
+                stop_loss = entry - sl_dist
+
+            elif sig_cur == SELL and position != SELL:
+                if position == BUY:
+                    balance += (bid - slippage - entry) * lot_value - commission_per_trade
+                position = SELL
+                entry = bid - slippage
+                stop_loss = entry + sl_dist
+
+    return balance - START_BALANCE
+
+
+def simulate_intrabar_grid(bars, path, params_list, point, contract_size, start=1, stop=None):
+    """
+    Batched version of simulate_intrabar for many param sets sharing one indicator set,
+    stepped together on each bar the way sim_kernel.simulate_exit_grid is. Quotes are
+    only read for bars where some position's stop can fire, and then replayed for all
+    of those positions at once. Returns one profit per entry of params_list, identical
+    to simulate_intrabar.
+    """
+    close, adx, rsi, signal, tradable, day = bars.as_lists()
+    bid_min, bid_max, ask_min, ask_max, close_bid, close_ask = path.as_lists()
+    n = len(params_list)
+
+    risk = BacktestRiskManager()
+    start_balance = risk.start_balance
+    daily_loss_limit = risk.daily_loss_limit
+    max_total_loss = risk.max_total_loss
+
+    adx_th = np.array([p["adx_threshold"] for p in params_list], dtype=np.float64)
+    rsi_lo = np.array([p["rsi_oversold"] for p in params_list], dtype=np.float64)
+    rsi_hi = np.array([p["rsi_overbought"] for p in params_list], dtype=np.float64)
+    sl_dist = np.array([p["stop_loss_pts"] * point for p in params_list], dtype=np.float64)
+    trig_pts = np.array([p["trailing_trigger_pts"] for p in params_list], dtype=np.float64)
+    trail_dist = np.array([p["trailing_dist_pts"] * point for p in params_list], dtype=np.float64)
+    lot_value = LOT_SIZE * contract_size
+    slippage = SLIPPAGE_PIPS * point
+
+    balance = np.full(n, float(START_BALANCE))
+    position = np.zeros(n, dtype=np.int8)
+    entry = np.zeros(n)
+    stop_loss = np.zeros(n)
+    alive = np.ones(n, dtype=bool)
+    day_start_balance = balance.copy()
+    current_day = None
+    risk_dirty = True
+    any_open = False
+
+    stop = len(close) if stop is None else stop
+    last_seen = None
+    for i in range(max(start, 1), stop):
+        # Balances only move on tradable bars or while a stop is resting
+        if not tradable[i] and not any_open:
+            continue
+        last_seen = i
+
+        if day[i] != current_day:
+            current_day = day[i]
+            day_start_balance = balance.copy()
+        if FUNDED_MODE and risk_dirty:
+            alive = alive & (start_balance - balance < max_total_loss)
+            risk_dirty = False
+
+        # STOPS inside the bar
+        if any_open:
+            longs = np.flatnonzero(alive & (position == BUY))
+            if longs.size:
+                reach = stop_loss[longs]
+                armed = (bid_max[i] - entry[longs]) / point >= trig_pts[longs]
+                reach = np.where(armed, np.maximum(reach, bid_max[i] - trail_dist[longs]), reach)
+                safe = bid_min[i] > reach
+                stop_loss[longs[safe]] = reach[safe]
+                scan = longs[~safe]
+                if scan.size:
+                    fill, stop_loss[scan] = path.long_stops(i, entry[scan], stop_loss[scan], point,
+                                                            trig_pts[scan], trail_dist[scan])
+                    hit = fill == fill
+                    if hit.any():
+                        closed = scan[hit]
+                        balance[closed] += (fill[hit] - slippage - entry[closed]) * lot_value - commission_per_trade
+                        position[closed] = FLAT
+                        risk_dirty = True
+
+            shorts = np.flatnonzero(alive & (position == SELL))
+            if shorts.size:
+                reach = stop_loss[shorts]
+                armed = (entry[shorts] - ask_min[i]) / point >= trig_pts[shorts]
+                reach = np.where(armed, np.minimum(reach, ask_min[i] + trail_dist[shorts]), reach)
+                safe = ask_max[i] < reach
+                stop_loss[shorts[safe]] = reach[safe]
+                scan = shorts[~safe]
+                if scan.size:
+                    fill, stop_loss[scan] = path.short_stops(i, entry[scan], stop_loss[scan], point,
+                                                             trig_pts[scan], trail_dist[scan])
+                    hit = fill == fill
+                    if hit.any():
+                        closed = scan[hit]
+                        balance[closed] += (entry[closed] - fill[hit] - slippage) * lot_value - commission_per_trade
+                        position[closed] = FLAT
+                        risk_dirty = True
+
+        sig_cur = signal[i]
+        if tradable[i] and sig_cur != FLAT and sig_cur == signal[i - 1]:
+            active = alive
+            if FUNDED_MODE:
+                active = alive & (day_start_balance - balance < daily_loss_limit)
+            enter = active & (position != sig_cur) & (adx[i] >= adx_th) & (rsi_lo <= rsi[i]) & (rsi[i] <= rsi_hi)
+            if enter.any():
+                bid = close_bid[i] if close_bid[i] == close_bid[i] else close[i]
+                ask = close_ask[i] if close_ask[i] == close_ask[i] else bid + path.spread
+                closing = enter & (position == -sig_cur)
+                if closing.any():
+                    if sig_cur == BUY:
+                        balance[closing] += (entry[closing] - ask - slippage) * lot_value - commission_per_trade
+                    else:
+                        balance[closing] += (bid - slippage - entry[closing]) * lot_value - commission_per_trade
+                    risk_dirty = True
+                position[enter] = sig_cur
+                entry[enter] = ask + slippage if sig_cur == BUY else bid - slippage
+                if sig_cur == BUY:
+                    stop_loss[enter] = entry[enter] - sl_dist[enter]
+                else:
+                    stop_loss[enter] = entry[enter] + sl_dist[enter]
+
+        any_open = bool((alive & (position != FLAT)).any())
+
+    # The bar-by-bar engine would catch a breach on any later bar
+    if FUNDED_MODE and last_seen is not None and last_seen + 1 < stop:
+        alive = alive & (start_balance - balance < max_total_loss)
+
+    profits = balance - START_BALANCE
+    if FUNDED_MODE:
+        profits[~alive] = -float('inf')
+    return profits.tolist()
@@ -2,6 +2,9 @@
 
 import MetaTrader5 as mt5
 import pandas as pd
+import time
+from config import BAR_CACHE_ENABLED
+from bar_cache import BarCache
 from utils import log_info, log_error
 
 def initialize_mt5():
@@ -19,15 +22,54 @@ def shutdown_mt5():
     mt5.shutdown()
     log_info("Disconnected from MT5.")
 
-def fetch_historical_data(symbol, timeframe, start_date, end_date):
+def _fetch_rates(symbol, timeframe, start_s, end_s):
     if not mt5.symbol_select(symbol, True):
         log_error(f"Symbol {symbol} not available in MT5.")
-        return pd.DataFrame()
+        return None
+    utc_from = pd.to_datetime(start_s, unit="s")
+    utc_to = pd.to_datetime(end_s, unit="s")
+    return mt5.copy_rates_range(symbol, timeframe, utc_from, utc_to)
+
+def fetch_historical_data(symbol, timeframe, start_date, end_date):
+    start_s = int(pd.to_datetime(start_date).timestamp())
+    end_s = int(pd.to_datetime(end_date).timestamp())
 
-    utc_from = pd.to_datetime(start_date)
-    utc_to = pd.to_datetime(end_date)
+    if not BAR_CACHE_ENABLED:
+        rates = _fetch_rates(symbol, timeframe, start_s, end_s)
+    else:
+        # Only ask the terminal for ranges the cache has not seen yet
+        cache = BarCache()
+        cached = cache.load(symbol, timeframe)
+        # First bar known so far; an empty range after it is a market closure, not missing history
+        history_start = int(cached["time"][0]) if cached is not None and len(cached) else None
+        for gap_start, gap_end in cache.missing_ranges(symbol, timeframe, start_s, end_s):
+            rates = _fetch_rates(symbol, timeframe, gap_start, gap_end)
+            if rates is None:
+                log_error(f"Could not fetch {symbol} bars for missing range, using cache only.")
+                break
+            if len(rates) == 0:
+                # Weekends, holidays and quiet sessions are covered once they are well in the past.
+                # Before the first known bar (history still syncing, or older than the terminal
+                # keeps) or near "now", leave the range uncovered so a later run asks again
+                if history_start is not None and history_start < gap_start and gap_end < time.time() - 86400:
+                    cache.store(symbol, timeframe, rates, gap_start, gap_end)
+                continue
+            if history_start is None or int(rates["time"][0]) < history_start:
+                history_start = int(rates["time"][0])
+            # The terminal may return less than asked ("Max bars in chart"), so coverage starts
+            # at the first bar it actually returned
+            covered_start = max(gap_start, int(rates["time"][0]))
+            covered_end = gap_end
+            # Near "now" the last bar may still be forming; leave it uncovered so it is refetched
+            if gap_end >= time.time() - 86400:
+                covered_end = min(gap_end, int(rates["time"][-1]) - 1)
+            if covered_start <= covered_end:
+                cache.store(symbol, timeframe, rates, covered_start, covered_end)
+            if covered_start > gap_start:
+                log_info(f"{symbol}: terminal history starts at {pd.to_datetime(covered_start, unit='s')}, "
+                         f"after the requested {pd.to_datetime(gap_start, unit='s')}")
+        rates = cache.read(symbol, timeframe, start_s, end_s)
 
-    rates = mt5.copy_rates_range(symbol, timeframe, utc_from, utc_to)
     if rates is None or len(rates) == 0:
         log_error(f"No data returned for {symbol} in given range.")
         return pd.DataFrame()
@@ -0,0 +1,184 @@
+# optimizer.py
+
+import math
+import random
+from config import *
+from indicator_cache import INDICATOR_KEYS
+from sweep_results import SweepResults
+
+THRESHOLD_KEYS = ("adx_threshold", "rsi_oversold", "rsi_overbought")
+EXIT_KEYS = ("stop_loss_pts", "trailing_trigger_pts", "trailing_dist_pts")
+
+
+def build_search_space(min_sl, max_sl, step_eur):
+    """Candidate values per param: SEARCH_RANGES plus exit ranges widened by SEARCH_EXIT_SCALE."""
+    wide_sl = max(min_sl, int(max_sl * SEARCH_EXIT_SCALE))
+    dims = {name: list(values) for name, values in SEARCH_RANGES.items()}
+    dims["stop_loss_pts"] = list(range(min_sl, wide_sl + 1, step_eur))
+    dims["trailing_trigger_pts"] = list(range(step_eur, wide_sl + 1, step_eur))
+    dims["trailing_dist_pts"] = list(range(step_eur, wide_sl + 1, step_eur))
+    return SearchSpace(dims)
+
+
+class SearchSpace:
+    """Discrete values per param. Samples keep trailing_dist_pts <= trailing_trigger_pts, as the grid does."""
+    def __init__(self, dims):
+        self.dims = dims
+
+    def size(self):
+        return math.prod(len(values) for values in self.dims.values())
+
+    def fix(self, params):
+        trigger = params["trailing_trigger_pts"]
+        if params["trailing_dist_pts"] > trigger:
+            params["trailing_dist_pts"] = max(v for v in self.dims["trailing_dist_pts"] if v <= trigger)
+        return params
+
+    def sample(self, rng, names, weights=None):
+        """Draw one value per name, uniformly or from per-value weights."""
+        if weights is None:
+            return {name: rng.choice(self.dims[name]) for name in names}
+        return {name: rng.choices(self.dims[name], weights=weights[name])[0] for name in names}
+
+
+def params_key(params):
+    return tuple(sorted(params.items()))
+
+
+class Optimizer:
+    """
+    Base class for adaptive searches. run(evaluate) spends at most `budget`
+    full-history evaluations and returns a SweepResults.
+    evaluate(params_list, fraction) scores params on the latest `fraction` of the
+    history with simulate_params' scoring and returns [{"profit", "params"}, ...].
+    """
+    def __init__(self, space, budget=SEARCH_BUDGET, seed=SEARCH_SEED,
+                 params_per_indicator=SEARCH_PARAMS_PER_INDICATOR):
+        self.space = space
+        self.budget = min(budget, space.size())
+        self.rng = random.Random(seed)
+        self.params_per_indicator = params_per_indicator
+        self._seen = set()
+
+    def _unique(self, params):
+        key = params_key(params)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def sample_params(self, n, indicator_weights=None, other_weights=None):
+        """
+        Draw up to n unseen param sets, params_per_indicator at a time for each
+        indicator set so every worker group amortizes one indicator computation.
+        """
+        other_keys = THRESHOLD_KEYS + EXIT_KEYS
+        out, attempts = [], 0
+        while len(out) < n and attempts < n * 20:
+            indicator = self.space.sample(self.rng, INDICATOR_KEYS, indicator_weights)
+            for _ in range(min(self.params_per_indicator, n - len(out))):
+                attempts += 1
+                params = dict(indicator, **self.space.sample(self.rng, other_keys, other_weights))
+                params = self.space.fix(params)
+                if self._unique(params):
+                    out.append(params)
+        return out
+
+    def run(self, evaluate):
+        raise NotImplementedError
+
+
+class RandomSearch(Optimizer):
+    def run(self, evaluate):
+        results = SweepResults()
+        results.add_all(evaluate(self.sample_params(self.budget), 1.0))
+        return results
+
+
+class SuccessiveHalving(Optimizer):
+    """
+    Score many candidates on a short recent window, then promote the best 1/eta
+    to a window eta times longer, until the survivors are scored on the full history.
+    Each rung costs about the same number of bar evaluations.
+    """
+    def __init__(self, space, budget=SEARCH_BUDGET, seed=SEARCH_SEED, eta=HALVING_ETA,
+                 min_fraction=HALVING_MIN_FRACTION, **kwargs):
+        super().__init__(space, budget, seed, **kwargs)
+        self.eta = eta
+        self.n_rungs = max(1, round(math.log(1 / min_fraction, eta)) + 1)
+        self.fractions = [min(1.0, min_fraction * eta ** k) for k in range(self.n_rungs)]
+
+    def run(self, evaluate):
+        n0 = max(self.eta ** (self.n_rungs - 1),
+                 int(self.budget / (self.n_rungs * self.fractions[0])))
+        candidates = self.sample_params(n0)
+        results = SweepResults()
+
+        for rung, fraction in enumerate(self.fractions):
+            scored = evaluate(candidates, fraction)
+            if rung == self.n_rungs - 1:
+                results.add_all(scored)
+                break
+            scored.sort(key=lambda r: r["profit"], reverse=True)
+            candidates = [r["params"] for r in scored[:max(1, len(scored) // self.eta)]]
+        return results
+
+
+class TPESearch(Optimizer):
+    """
+    Tree-structured Parzen estimator over the discrete space, one independent
+    categorical density per param. After TPE_STARTUP random evaluations it splits
+    observations into the best TPE_GAMMA ("good") and the rest, and proposes
+    values with a high good/bad density ratio.
+    """
+    def __init__(self, space, budget=SEARCH_BUDGET, seed=SEARCH_SEED, startup=TPE_STARTUP,
+                 gamma=TPE_GAMMA, batch=SEARCH_BATCH, **kwargs):
+        super().__init__(space, budget, seed, **kwargs)
+        self.startup = startup
+        self.gamma = gamma
+        self.batch = batch
+        self.observations = []
+
+    def _ratio_weights(self):
+        ranked = sorted(self.observations, key=lambda r: r["profit"], reverse=True)
+        n_good = max(1, int(len(ranked) * self.gamma))
+        good, bad = ranked[:n_good], ranked[n_good:] or ranked[-1:]
+
+        weights = {}
+        for name, values in self.space.dims.items():
+            index = {v: i for i, v in enumerate(values)}
+            # +1 prior keeps every value reachable
+            l = [1.0] * len(values)
+            g = [1.0] * len(values)
+            for r in good:
+                l[index[r["params"][name]]] += 1
+            for r in bad:
+                g[index[r["params"][name]]] += 1
+            l_total, g_total = sum(l), sum(g)
+            weights[name] = [(lv / l_total) / (gv / g_total) for lv, gv in zip(l, g)]
+        return weights
+
+    def run(self, evaluate):
+        results = SweepResults()
+        evaluated = 0
+        while evaluated < self.budget:
+            n = min(self.budget - evaluated, self.startup if not self.observations else self.batch)
+            if len(self.observations) < self.startup:
+                batch = self.sample_params(n)
+            else:
+                weights = self._ratio_weights()
+                batch = self.sample_params(n, weights, weights)
+            if not batch:
+                break
+            scored = evaluate(batch, 1.0)
+            self.observations.extend(scored)
+            results.add_all(scored)
+            evaluated += len(batch)
+        return results
+
+
+OPTIMIZERS = {
+    "random": RandomSearch,
+    "halving": SuccessiveHalving,
+    "tpe": TPESearch,
+}
@@ -0,0 +1,129 @@
+# results_store.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+from config import *
+from indicator_cache import INDICATOR_KEYS
+from optimizer import THRESHOLD_KEYS, EXIT_KEYS
+
+PARAM_KEYS = INDICATOR_KEYS + THRESHOLD_KEYS + EXIT_KEYS
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    dataset INTEGER NOT NULL,
+    param_hash INTEGER NOT NULL,
+    profit REAL NOT NULL,
+    {", ".join(f"{k} NUMERIC NOT NULL" for k in PARAM_KEYS)},
+    PRIMARY KEY (dataset, param_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_group ON results (dataset, {", ".join(INDICATOR_KEYS)});
+"""
+
+
+def settings_fingerprint():
+    """Config values that change a score; results are only reused under the same ones."""
+    settings = (LOT_SIZE, START_BALANCE, DAILY_MAX_LOSS_PERCENT, MAX_TOTAL_LOSS_PERCENT, FUNDED_MODE,
+                spread_pips, commission_per_trade, SLIPPAGE_PIPS, ALLOWED_SESSIONS, WEEKEND_DAYS,
+                DAY_BOUNDARY_TZ, BAR_TIMEZONE, INDICATOR_COMPACT and INDICATOR_FLOAT32,
+                INTRABAR_ENABLED, INTRABAR_SOURCE)
+    return hashlib.blake2b(repr(settings).encode(), digest_size=8).hexdigest()
+
+
+def param_hash(params):
+    """Stable signed 64-bit hash of a param set (SQLite INTEGER range)."""
+    key = repr(tuple(params[k] for k in PARAM_KEYS)).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big", signed=True)
+
+
+class ResultsStore:
+    """
+    Every evaluated (dataset fingerprint, params) -> profit, in SQLite, so an
+    interrupted or widened sweep only evaluates what is missing.
+    Writes are buffered and committed RESULTS_STORE_BATCH rows at a time.
+    Safe to share between the pool's task feeder thread and the reducer.
+    """
+    def __init__(self, path=RESULTS_STORE_PATH, batch=RESULTS_STORE_BATCH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.batch = batch
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.settings = settings_fingerprint()
+        self._datasets = {}
+        self._pending = []
+        self.reused = 0
+
+    def _dataset(self, fingerprint):
+        if fingerprint not in self._datasets:
+            key = f"{fingerprint}|{self.settings}"
+            self.conn.execute("INSERT OR IGNORE INTO datasets (fingerprint) VALUES (?)", (key,))
+            row = self.conn.execute("SELECT id FROM datasets WHERE fingerprint = ?", (key,)).fetchone()
+            self._datasets[fingerprint] = row[0]
+        return self._datasets[fingerprint]
+
+    def split(self, fingerprint, params_list):
+        """
+        (params still to evaluate, stored results for the rest) for params that share
+        one indicator set, as every task's params_list does.
+        """
+        if not params_list:
+            return [], []
+        first = params_list[0]
+        where = " AND ".join(f"{k} = ?" for k in INDICATOR_KEYS)
+        with self.lock:
+            dataset = self._dataset(fingerprint)
+            stored = dict(self.conn.execute(
+                f"SELECT param_hash, profit FROM results WHERE dataset = ? AND {where}",
+                (dataset, *(first[k] for k in INDICATOR_KEYS))))
+        if not stored:
+            return params_list, []
+
+        todo, cached = [], []
+        for params in params_list:
+            profit = stored.get(param_hash(params))
+            if profit is None:
+                todo.append(params)
+            else:
+                cached.append({"profit": profit, "params": params})
+        self.reused += len(cached)
+        return todo, cached
+
+    def add(self, fingerprint, results):
+        with self.lock:
+            dataset = self._dataset(fingerprint)
+            self._pending.extend(
+                (dataset, param_hash(r["params"]), r["profit"], *(r["params"][k] for k in PARAM_KEYS))
+                for r in results)
+            if len(self._pending) >= self.batch:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO results VALUES ({', '.join('?' * (3 + len(PARAM_KEYS)))})",
+                    self._pending)
+            self._pending = []
+
+    def count(self, fingerprint):
+        with self.lock:
+            dataset = self._dataset(fingerprint)
+            return self.conn.execute("SELECT COUNT(*) FROM results WHERE dataset = ?", (dataset,)).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
@@ -0,0 +1,108 @@
+# shared_data.py
+
+from collections import namedtuple
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+
+# Picklable reference to a published dataset; this is all a task needs to carry.
+# meta is the symbol's (point, contract_size), so workers never ask the terminal.
+DatasetHandle = namedtuple("DatasetHandle", ["shm_name", "dataset_id", "n_bars", "columns", "meta"],
+                           defaults=(None,))
+
+# Per-process attachments: shm_name -> (SharedMemory, {column: ndarray})
+_attached = {}
+
+
+class SharedDataset:
+    """
+    Publishes the bar columns of one history into a single shared memory block,
+    all numeric ones or only `columns` if given.
+    The owner keeps it alive for the whole sweep and unlinks it afterwards.
+    """
+    def __init__(self, df, dataset_id, meta=None, columns=None):
+        arrays = {}
+        for col in columns or df.columns:
+            values = df[col].to_numpy()
+            if col == "time":
+                values = values.astype("datetime64[ns]")
+            elif not np.issubdtype(values.dtype, np.number):
+                continue
+            arrays[col] = np.ascontiguousarray(values)
+
+        # Lay the columns out back to back, each 8-byte aligned
+        columns, offset = [], 0
+        for col, values in arrays.items():
+            columns.append((col, values.dtype.str, offset))
+            offset += (values.nbytes + 7) // 8 * 8
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (col, dtype, start), values in zip(columns, arrays.values()):
+            np.ndarray(values.shape, dtype=dtype, buffer=self.shm.buf, offset=start)[:] = values
+
+        self.handle = DatasetHandle(self.shm.name, dataset_id, len(df), tuple(columns), meta)
+
+    def close(self):
+        # The owner may have attached too (e.g. calibration runs tasks in-process)
+        detach(self.shm.name)
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_shm(name):
+    try:
+        # 3.13+: attaching processes must not unlink the block on exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before 3.13 attaching registers the block with the resource tracker, which then
+    # unlinks it and reports a leak when this process exits. Only the owner tracks it.
+    # Skipping the registration rather than unregistering afterwards matters: pool workers
+    # share the owner's tracker, so an unregister would drop the owner's entry as well.
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def attach_arrays(handle):
+    """Zero-copy column views onto a published dataset, attached once per process."""
+    if handle.shm_name not in _attached:
+        shm = _open_shm(handle.shm_name)
+        arrays = {col: np.ndarray((handle.n_bars,), dtype=dtype, buffer=shm.buf, offset=start)
+                  for col, dtype, start in handle.columns}
+        _attached[handle.shm_name] = (shm, arrays)
+    return _attached[handle.shm_name][1]
+
+
+def detach(shm_name):
+    """Close this process's attachment to a dataset; its column views must no longer be in use."""
+    entry = _attached.pop(shm_name, None)
+    if entry is None:
+        return
+    shm, arrays = entry
+    arrays.clear()
+    try:
+        shm.close()
+    except BufferError:
+        # A frame still views the block; the mapping is released with the last view
+        pass
+
+
+def detach_all():
+    for shm_name in list(_attached):
+        detach(shm_name)
+
+
+def attach_frame(handle):
+    """DataFrame over the shared columns, without copying the bar data."""
+    return pd.DataFrame(attach_arrays(handle), copy=False)
+
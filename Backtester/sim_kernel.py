@@ -0,0 +1,258 @@
+# sim_kernel.py
+
+import numpy as np
+
+from config import *
+from funded_risk import BacktestRiskManager
+from calendar_index import CalendarIndex
+
+SIGNAL_CODES = {"buy": 1, "sell": -1}
+BUY, SELL, FLAT = 1, -1, 0
+
+
+class BarArrays:
+    """
+    Contiguous per-bar columns pulled out of an indicator frame once,
+    so the simulation loop never touches pandas.
+    """
+    def __init__(self, close, adx, rsi, signal, session, day):
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.adx = np.ascontiguousarray(adx, dtype=np.float64)
+        self.rsi = np.ascontiguousarray(rsi, dtype=np.float64)
+        self.signal = np.ascontiguousarray(signal, dtype=np.int8)
+        self.session = np.ascontiguousarray(session, dtype=bool)
+        self.day = np.ascontiguousarray(day, dtype=np.int64)
+        # A bar is tradable when in session and none of the inputs are NaN
+        self.tradable = self.session & ~(np.isnan(self.close) | np.isnan(self.adx) | np.isnan(self.rsi))
+        self._lists = None
+
+    @classmethod
+    def from_frame(cls, df, calendar=None):
+        """Pass the dataset's CalendarIndex to skip rebuilding it from the frame's index."""
+        calendar = calendar or CalendarIndex(df.index)
+        if 'signal' in df.columns:
+            signal = df['signal'].to_numpy()  # compact frame: already int8 codes
+        else:
+            signal = df['supertrend_signal'].map(SIGNAL_CODES).fillna(0).to_numpy()
+        return cls(df['close'].to_numpy(), df['adx'].to_numpy(), df['rsi'].to_numpy(),
+                   signal, calendar.allowed, calendar.day)
+
+    def __len__(self):
+        return len(self.close)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.close, self.adx, self.rsi, self.signal,
+                                      self.session, self.day, self.tradable))
+
+    def tradable_bars(self, start, stop):
+        """Positions of the tradable bars in [start, stop); out-of-session spans drop out whole."""
+        return (np.flatnonzero(self.tradable[start:stop]) + start).tolist()
+
+    def as_lists(self):
+        # Python floats index ~10x faster than numpy scalars in a scalar loop
+        if self._lists is None:
+            self._lists = (self.close.tolist(), self.adx.tolist(), self.rsi.tolist(),
+                           self.signal.tolist(), self.tradable.tolist(), self.day.tolist())
+        return self._lists
+
+
+def simulate_arrays(bars, params, point, contract_size, start=1, stop=None, fills=None):
+    """
+    Same entry/trailing/exit and funded-risk rules as backtester.run_simulation,
+    run over BarArrays bars [start, stop). Returns profit (-inf if the funded max loss was hit).
+    If fills is a list, (bar, balance) is appended every time the balance changes.
+    """
+    close, adx, rsi, signal, tradable, day = bars.as_lists()
+
+    risk = BacktestRiskManager()
+    start_balance = risk.start_balance
+    daily_loss_limit = risk.daily_loss_limit
+    max_total_loss = risk.max_total_loss
+
+    adx_th = params["adx_threshold"]
+    rsi_lo = params["rsi_oversold"]
+    rsi_hi = params["rsi_overbought"]
+    sl_dist = params["stop_loss_pts"] * point
+    trig_pts = params["trailing_trigger_pts"]
+    trail_dist = params["trailing_dist_pts"] * point
+    lot_value = LOT_SIZE * contract_size
+
+    balance = START_BALANCE
+    position = FLAT
+    entry = 0.0
+    stop_loss = 0.0
+    current_day = None
+    day_start_balance = balance
+
+    # Weekends / out-of-session / NaN inputs are skipped whole. The balance only moves on
+    # tradable bars, so the day and loss checks give the same outcome when run there alone.
+    stop = len(close) if stop is None else stop
+    last_seen = None
+    for i in bars.tradable_bars(max(start, 1), stop):
+        last_seen = i
+        # Daily / total loss checks
+        if day[i] != current_day:
+            current_day = day[i]
+            day_start_balance = balance
+        if FUNDED_MODE:
+            if start_balance - balance >= max_total_loss:
+                return -float('inf')
+            if day_start_balance - balance >= daily_loss_limit:
+                continue
+
+        sig_cur = signal[i]
+        price = close[i]
+
+        # ENTRY
+        if sig_cur == signal[i - 1] and adx[i] >= adx_th and rsi_lo <= rsi[i] <= rsi_hi:
+            if sig_cur == BUY and position != BUY:
+                if position == SELL:
+                    balance += (entry - price) * lot_value
+                    if fills is not None:
+                        fills.append((i, balance))
+                position = BUY
+                entry = price
+                stop_loss = entry - sl_dist
+
+            elif sig_cur == SELL and position != SELL:
+                if position == BUY:
+                    balance += (price - entry) * lot_value
+                    if fills is not None:
+                        fills.append((i, balance))
+                position = SELL
+                entry = price
+                stop_loss = entry + sl_dist
+
+        # TRAILING + EXIT
+        if position == BUY:
+            if (price - entry) / point >= trig_pts:
+                stop_loss = max(stop_loss, price - trail_dist)
+            if price <= stop_loss:
+                balance += (price - entry) * lot_value
+                position = FLAT
+                if fills is not None:
+                    fills.append((i, balance))
+
+        elif position == SELL:
+            if (entry - price) / point >= trig_pts:
+                stop_loss = min(stop_loss, price + trail_dist)
+            if price >= stop_loss:
+                balance += (entry - price) * lot_value
+                position = FLAT
+                if fills is not None:
+                    fills.append((i, balance))
+
+    # The bar-by-bar engine would catch a breach on any later bar, tradable or not
+    if FUNDED_MODE and last_seen is not None and last_seen + 1 < stop and start_balance - balance >= max_total_loss:
+        return -float('inf')
+    return balance - START_BALANCE
+
+
+def simulate_exit_grid(bars, params_list, point, contract_size, start=1, stop=None):
+    """
+    Batched version of simulate_arrays for many param sets sharing one indicator set.
+    Position state is kept as vectors over the param axis and every combination is
+    stepped together on each bar, so the history is walked once per indicator set.
+    Returns one profit per entry of params_list, identical to simulate_arrays.
+    """
+    close, adx, rsi, signal, tradable, day = bars.as_lists()
+    n = len(params_list)
+
+    risk = BacktestRiskManager()
+    start_balance = risk.start_balance
+    daily_loss_limit = risk.daily_loss_limit
+    max_total_loss = risk.max_total_loss
+
+    adx_th = np.array([p["adx_threshold"] for p in params_list], dtype=np.float64)
+    rsi_lo = np.array([p["rsi_oversold"] for p in params_list], dtype=np.float64)
+    rsi_hi = np.array([p["rsi_overbought"] for p in params_list], dtype=np.float64)
+    sl_dist = np.array([p["stop_loss_pts"] * point for p in params_list], dtype=np.float64)
+    trig_pts = np.array([p["trailing_trigger_pts"] for p in params_list], dtype=np.float64)
+    trail_dist = np.array([p["trailing_dist_pts"] * point for p in params_list], dtype=np.float64)
+    lot_value = LOT_SIZE * contract_size
+
+    balance = np.full(n, float(START_BALANCE))
+    position = np.zeros(n, dtype=np.int8)
+    entry = np.zeros(n)
+    stop_loss = np.zeros(n)
+    alive = np.ones(n, dtype=bool)
+    active = alive
+    day_start_balance = balance.copy()
+    current_day = None
+    # Risk masks only change when a balance or the day changes
+    risk_dirty = True
+    any_open = False
+
+    stop = len(close) if stop is None else stop
+    last_seen = None
+    # Balances only move on tradable bars, so running the day/risk bookkeeping
+    # there alone gives the same outcome as running it on every bar
+    for i in bars.tradable_bars(max(start, 1), stop):
+        last_seen = i
+
+        if day[i] != current_day:
+            current_day = day[i]
+            day_start_balance = balance.copy()
+            risk_dirty = True
+        if FUNDED_MODE and risk_dirty:
+            alive = alive & (start_balance - balance < max_total_loss)
+            active = alive & (day_start_balance - balance < daily_loss_limit)
+            risk_dirty = False
+
+        sig_cur = signal[i]
+        price = close[i]
+
+        # ENTRY
+        if sig_cur != FLAT and sig_cur == signal[i - 1]:
+            enter = active & (position != sig_cur) & (adx[i] >= adx_th) & (rsi_lo <= rsi[i]) & (rsi[i] <= rsi_hi)
+            if enter.any():
+                closing = enter & (position == -sig_cur)
+                if closing.any():
+                    if sig_cur == BUY:
+                        balance[closing] += (entry[closing] - price) * lot_value
+                    else:
+                        balance[closing] += (price - entry[closing]) * lot_value
+                    risk_dirty = True
+                position[enter] = sig_cur
+                entry[enter] = price
+                if sig_cur == BUY:
+                    stop_loss[enter] = price - sl_dist[enter]
+                else:
+                    stop_loss[enter] = price + sl_dist[enter]
+                any_open = True
+
+        # TRAILING + EXIT
+        if not any_open:
+            continue
+
+        longs = active & (position == BUY)
+        if longs.any():
+            trail = longs & ((price - entry) / point >= trig_pts)
+            stop_loss[trail] = np.maximum(stop_loss[trail], price - trail_dist[trail])
+            exits = longs & (price <= stop_loss)
+            if exits.any():
+                balance[exits] += (price - entry[exits]) * lot_value
+                position[exits] = FLAT
+                risk_dirty = True
+
+        shorts = active & (position == SELL)
+        if shorts.any():
+            trail = shorts & ((entry - price) / point >= trig_pts)
+            stop_loss[trail] = np.minimum(stop_loss[trail], price + trail_dist[trail])
+            exits = shorts & (price >= stop_loss)
+            if exits.any():
+                balance[exits] += (entry[exits] - price) * lot_value
+                position[exits] = FLAT
+                risk_dirty = True
+
+        any_open = bool(position.any())
+
+    # The bar-by-bar engine would catch a breach on any later bar, tradable or not
+    if FUNDED_MODE and last_seen is not None and last_seen + 1 < stop:
+        alive = alive & (start_balance - balance < max_total_loss)
+
+    profits = balance - START_BALANCE
+    if FUNDED_MODE:
+        profits[~alive] = -float('inf')
+    return profits.tolist()
@@ -0,0 +1,96 @@
+# sweep_results.py
+
+import heapq
+import math
+from config import TOP_K_RESULTS, MAX_REJECTED_KEPT
+
+
+class SweepResults:
+    """
+    Streaming reducer for sweep results: keeps the top-K param sets by profit
+    plus the tested/rejected/accepted counters, so memory stays flat
+    however many results flow through it.
+    A result is rejected when its profit is -inf (no data or funded max loss hit).
+    """
+    def __init__(self, top_k=TOP_K_RESULTS, max_rejected_kept=MAX_REJECTED_KEPT):
+        self.top_k = top_k
+        self.max_rejected_kept = max_rejected_kept
+        self._heap = []   # min-heap of (profit, seq, params)
+        self._seq = 0
+        self.tested = 0
+        self.rejected = 0
+        self.rejected_params = []
+
+    @property
+    def accepted(self):
+        return self.tested - self.rejected
+
+    def add(self, result):
+        profit, params = result["profit"], result["params"]
+        self.tested += 1
+        if profit == -math.inf:
+            self.rejected += 1
+            if len(self.rejected_params) < self.max_rejected_kept:
+                self.rejected_params.append(params)
+            return
+
+        # seq breaks ties in arrival order and keeps dicts out of comparisons
+        self._seq += 1
+        item = (profit, -self._seq, params)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def add_all(self, results):
+        for result in results:
+            self.add(result)
+
+    def merge(self, other):
+        for profit, _, params in other._heap:
+            self.add({"profit": profit, "params": params})
+        self.tested += other.tested - len(other._heap)
+        self.rejected += other.rejected
+        room = self.max_rejected_kept - len(self.rejected_params)
+        self.rejected_params.extend(other.rejected_params[:max(room, 0)])
+
+    def to_dict(self):
+        """JSON-friendly state that from_dict() can rebuild and merge()."""
+        return {
+            "top": self.top(),
+            "tested": self.tested,
+            "rejected": self.rejected,
+            "rejected_params": self.rejected_params,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        results = cls()
+        results.add_all(data["top"])
+        results.tested = data["tested"]
+        results.rejected = data["rejected"]
+        results.rejected_params = data["rejected_params"][:results.max_rejected_kept]
+        return results
+
+    def top(self):
+        """Top-K results, best first."""
+        return [{"profit": profit, "params": params}
+                for profit, _, params in sorted(self._heap, reverse=True)]
+
+    def best(self):
+        """(params, profit) of the best result, or (None, -inf) if everything was rejected."""
+        if not self._heap:
+            return None, -math.inf
+        profit, _, params = max(self._heap)
+        return params, profit
+
+    def summary(self):
+        best_params, best_profit = self.best()
+        return {
+            "best_params": best_params,
+            "best_profit": best_profit,
+            "total_params_tested": self.tested,
+            "total_rejected_params": self.rejected,
+            "total_accepted_params": self.accepted,
+            "top_results": self.top()
+        }
@@ -0,0 +1,185 @@
+# telemetry.py
+#
+# Sweep progress for the parent process. Pool workers attach a TaskStats to
+# every group they return, so no extra channel is needed; the parent folds
+# them into a periodic progress line and a run profile written with the results.
+
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+from config import PROGRESS_INTERVAL_SECONDS, RUN_PROFILE_PATH
+from utils import log_info
+
+# One finished task, measured in the worker that ran it
+TaskStats = namedtuple("TaskStats", ["worker", "busy_s", "indicator_s", "bars", "combos"])
+
+
+class StageClock:
+    """Seconds this process spent per stage since the last take()."""
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def time(self, stage):
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + perf_counter() - t0
+
+    def take(self):
+        seconds, self.seconds = self.seconds, {}
+        return seconds
+
+
+# Per-process clock; indicator computations add to it, simulate_tagged reads it
+clock = StageClock()
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class _WorkerStats:
+    __slots__ = ("tasks", "busy_s", "indicator_s", "last_done")
+
+    def __init__(self):
+        self.tasks = 0
+        self.busy_s = 0.0
+        self.indicator_s = 0.0
+        self.last_done = 0.0
+
+
+class SweepProgress:
+    """
+    Folds TaskStats into throughput, ETA and per-worker utilization (busy time over
+    wall time since the pool started). log() prints a compact line at most every
+    PROGRESS_INTERVAL_SECONDS; write() saves the run profile as JSON.
+    total_combos may be None when the search decides its own size.
+    """
+    SLOWEST_KEPT = 5
+
+    def __init__(self, total_combos, workers, interval=PROGRESS_INTERVAL_SECONDS, info=None):
+        self.total_combos = total_combos
+        self.workers = workers
+        self.interval = interval
+        self.info = dict(info or {})
+        self.started = perf_counter()
+        self.last_log = self.started
+        self.tasks = 0
+        self.combos = 0
+        self.reused = 0
+        self.bar_evals = 0
+        self.busy_s = 0.0
+        self.indicator_s = 0.0
+        self.per_worker = {}
+        self.per_pair = {}
+        self.slowest = []  # (busy_s, pair, combos) of the longest tasks
+
+    def add(self, key, stats, timed_in_parent=False):
+        now = perf_counter()
+        self.tasks += 1
+        self.combos += stats.combos
+        self.bar_evals += stats.bars * stats.combos
+        self.busy_s += stats.busy_s
+        self.indicator_s += stats.indicator_s
+
+        pair = self.per_pair.setdefault(key, {"tasks": 0, "combos": 0, "busy_s": 0.0})
+        pair["tasks"] += 1
+        pair["combos"] += stats.combos
+        pair["busy_s"] += stats.busy_s
+
+        if not timed_in_parent:
+            worker = self.per_worker.get(stats.worker)
+            if worker is None:
+                worker = self.per_worker[stats.worker] = _WorkerStats()
+            worker.tasks += 1
+            worker.busy_s += stats.busy_s
+            worker.indicator_s += stats.indicator_s
+            worker.last_done = now
+
+        self.slowest.append((stats.busy_s, key, stats.combos))
+        if len(self.slowest) > 4 * self.SLOWEST_KEPT:
+            self.slowest = sorted(self.slowest, reverse=True)[:self.SLOWEST_KEPT]
+
+    def skip(self, combos):
+        """Count combos that were answered without running (e.g. from the results store)."""
+        self.reused += combos
+
+    def utilization(self):
+        """{worker: busy share of the wall time since the pool started}."""
+        wall = max(perf_counter() - self.started, 1e-9)
+        return {w: min(1.0, s.busy_s / wall) for w, s in self.per_worker.items()}
+
+    def line(self):
+        elapsed = max(perf_counter() - self.started, 1e-9)
+        done = self.combos + self.reused
+        parts = [f"{self.tasks} groups"]
+        if self.total_combos:
+            parts.append(f"{done:,}/{self.total_combos:,} params ({100 * done / self.total_combos:.1f}%)")
+        else:
+            parts.append(f"{done:,} params")
+        parts.append(f"{self.tasks / elapsed:.2f} groups/s, {self.bar_evals / elapsed / 1e6:.1f}M bar-evals/s")
+        if self.total_combos and self.combos:
+            remaining = max(0, self.total_combos - done)
+            parts.append(f"ETA {_duration(remaining * elapsed / self.combos)}")
+        util = self.utilization()
+        if util:
+            values = sorted(util.values())
+            idle = self.workers - len(util)
+            parts.append(f"workers {len(util)}/{self.workers} util avg {100 * sum(values) / self.workers:.0f}% "
+                         f"min {100 * (0.0 if idle else values[0]):.0f}%")
+        if self.busy_s:
+            share = self.indicator_s / self.busy_s
+            parts.append(f"indicators {100 * share:.0f}% / sim {100 * (1 - share):.0f}%")
+        return " | ".join(parts)
+
+    def log(self, force=False):
+        now = perf_counter()
+        if force or now - self.last_log >= self.interval:
+            self.last_log = now
+            log_info(f"[PROGRESS] {self.line()}")
+
+    def profile(self):
+        elapsed = perf_counter() - self.started
+        now = perf_counter()
+        util = self.utilization()
+        return {
+            **self.info,
+            "elapsed_s": round(elapsed, 3),
+            "groups": self.tasks,
+            "params_evaluated": self.combos,
+            "params_reused": self.reused,
+            "params_total": self.total_combos,
+            "groups_per_s": round(self.tasks / elapsed, 3) if elapsed else None,
+            "bar_evals_per_s": round(self.bar_evals / elapsed) if elapsed else None,
+            "busy_s": round(self.busy_s, 3),
+            "indicator_s": round(self.indicator_s, 3),
+            "simulation_s": round(self.busy_s - self.indicator_s, 3),
+            "workers": {
+                str(w): {
+                    "tasks": s.tasks,
+                    "busy_s": round(s.busy_s, 3),
+                    "indicator_s": round(s.indicator_s, 3),
+                    "utilization": round(util[w], 3),
+                    "idle_since_last_task_s": round(now - s.last_done, 3),
+                }
+                for w, s in sorted(self.per_worker.items())
+            },
+            "pairs": {f"{symbol}@{timeframe}": {**stats, "busy_s": round(stats["busy_s"], 3)}
+                      for (symbol, timeframe), stats in self.per_pair.items()},
+            "slowest_groups": [{"pair": f"{key[0]}@{key[1]}", "busy_s": round(busy, 3), "params": combos}
+                               for busy, key, combos in sorted(self.slowest, reverse=True)[:self.SLOWEST_KEPT]],
+        }
+
+    def write(self, path=RUN_PROFILE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.profile(), f, indent=4)
+        log_info(f"[PROGRESS] Run profile written to {path}")
@@ -0,0 +1,52 @@
+# conftest.py
+# Backtester tests run offline: fake_mt5 stands in for the terminal, so it is
+# installed before any module that imports MetaTrader5 (config, backtester, ...).
+# Run from Backtester/ (python -m pytest tests): Live Trading has its own config,
+# strategy, ... modules under the same names, so the two suites run separately.
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# utils opens backtester.log relative to the working directory at import time, and the
+# caches are relative paths too; keep them all out of the tree
+os.chdir(tempfile.mkdtemp(prefix="backtester-tests-"))
+
+import fake_mt5  # noqa: E402
+
+fake_mt5.install()
+
+
+@pytest.fixture
+def signal_frame():
+    """
+    Factory for a seeded indicator frame (close, supertrend_signal, adx, rsi) on
+    M15 bars, with the NaN warm-up and "hold" rows calculate_indicators produces.
+    """
+    def make(n_bars, seed, start="2025-01-01"):
+        rng = np.random.default_rng(seed)
+        index = pd.date_range(start, periods=n_bars, freq="15min", name="time")
+        close = 40000 + np.cumsum(rng.normal(0, 30, n_bars))
+        trend = pd.Series(close).rolling(8).mean().diff().fillna(0).to_numpy()
+        signal = np.where(trend > 0, "buy", "sell")
+        signal[:5] = "hold"
+        adx = rng.uniform(10, 50, n_bars)
+        adx[:20] = np.nan
+        rsi = rng.uniform(20, 80, n_bars)
+        rsi[:15] = np.nan
+        return pd.DataFrame({"close": close, "supertrend_signal": signal, "adx": adx, "rsi": rsi}, index=index)
+    return make
+
+
+@pytest.fixture
+def bar_frame():
+    """Factory for a seeded random-walk OHLC frame in the layout fetch_historical_data returns."""
+    def make(n_bars, seed):
+        df = pd.DataFrame(fake_mt5.synthetic_rates(n_bars, seed=seed))
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df
+    return make
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+import backtester  # noqa: E402
+from sim_kernel import BarArrays, simulate_arrays, simulate_exit_grid  # noqa: E402
+from strategy import calculate_indicators, row_signal, verify_compact  # noqa: E402
+
+INDICATORS = [dict(supertrend_period=10, supertrend_multiplier=3, adx_period=14, rsi_period=14),
+              dict(supertrend_period=7, supertrend_multiplier=2, adx_period=10, rsi_period=10)]
+EXITS = [dict(adx_threshold=th, rsi_oversold=30, rsi_overbought=70, stop_loss_pts=sl,
+              trailing_trigger_pts=trig, trailing_dist_pts=trig // 2)
+         for th in (15, 25) for sl in (3000, 15000) for trig in (5000, 20000)]
+
+
+@pytest.fixture(params=INDICATORS, ids=["st10", "st7"])
+def frames(request, bar_frame):
+    df = bar_frame(3000, seed=3)
+    full = calculate_indicators(df.copy(), request.param)
+    compact = calculate_indicators(df.copy(), request.param, compact=True)
+    return full, compact, calculate_indicators(df.copy(), request.param, compact=True, float32=True)
+
+
+def test_compact_layout(frames):
+    full, compact, small = frames
+    assert list(compact.columns) == ["close", "adx", "rsi", "signal"]
+    assert compact["signal"].dtype == np.int8
+    assert small["adx"].dtype == small["rsi"].dtype == np.float32
+    assert compact.index.equals(full.index)
+
+
+def test_compact_passes_verify(frames):
+    full, compact, small = frames
+    assert verify_compact(full, compact)
+    assert verify_compact(full, small)
+    np.testing.assert_array_equal(compact["adx"].to_numpy(), full["adx"].to_numpy())
+    np.testing.assert_array_equal(compact["rsi"].to_numpy(), full["rsi"].to_numpy())
+
+
+def test_verify_rejects_mismatch(frames):
+    full, compact, _ = frames
+    flipped = compact.copy()
+    flipped.iloc[-1, flipped.columns.get_loc("signal")] *= -1
+    assert not verify_compact(full, flipped)
+    drifted = compact.copy()
+    drifted["rsi"] *= 1.001
+    assert not verify_compact(full, drifted)
+
+
+def test_row_signal_reads_both_layouts(frames):
+    full, compact, _ = frames
+    assert [row_signal(row) for _, row in full.tail(300).iterrows()] == \
+        [row_signal(row) for _, row in compact.tail(300).iterrows()]
+
+
+def test_engines_score_compact_like_full(frames):
+    full, compact, _ = frames
+    full_bars, compact_bars = BarArrays.from_frame(full), BarArrays.from_frame(compact)
+    assert simulate_exit_grid(compact_bars, EXITS, 0.01, 1.0) == simulate_exit_grid(full_bars, EXITS, 0.01, 1.0)
+    for params in EXITS:
+        expected = simulate_arrays(full_bars, params, 0.01, 1.0)
+        assert simulate_arrays(compact_bars, params, 0.01, 1.0) == expected
+    for params in EXITS[:2]:
+        assert backtester.run_simulation(compact, params, 0.01, 1.0) == backtester.run_simulation(full, params, 0.01, 1.0)
@@ -0,0 +1,213 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+import fake_mt5
+import funded_risk
+import intrabar
+from intrabar import (TICK_DTYPE, IntrabarPath, TickStore, intrabar_path, m1_to_quotes, simulate_intrabar,
+                      simulate_intrabar_grid)
+from sim_kernel import BarArrays
+
+POINT = 0.01
+SPREAD = 20 * POINT
+BAR_MS = 900_000
+GAP_DAY = pd.Timestamp("2024-01-03")  # A weekday whose quotes are missing from the store
+BASE = dict(adx_threshold=20, rsi_oversold=25, rsi_overbought=75, stop_loss_pts=1000,
+            trailing_trigger_pts=2000, trailing_dist_pts=200)
+
+
+def m1_rates(n_minutes=15 * 2000, seed=5):
+    rates = fake_mt5.synthetic_rates(n_minutes, seed=seed, start="2024-01-01", bar_seconds=60, vol=0.0004)
+    rates["spread"] = np.random.default_rng(seed).integers(1, 30, n_minutes)
+    return rates
+
+
+def m15_frame(m1, seed):
+    """M15 bars aggregated from the M1 bars, with seeded adx/rsi and a trend-following signal."""
+    groups = m1[:len(m1) // 15 * 15].reshape(-1, 15)
+    index = pd.DatetimeIndex(pd.to_datetime(groups["time"][:, 0], unit="s"), name="time")
+    close = groups["close"][:, -1]
+    rng = np.random.default_rng(seed)
+    trend = pd.Series(close).rolling(4).mean().diff().fillna(0).to_numpy()
+    adx = rng.uniform(10, 50, len(close))
+    adx[:20] = np.nan
+    rsi = rng.uniform(20, 80, len(close))
+    rsi[:15] = np.nan
+    return pd.DataFrame({"close": close, "supertrend_signal": np.where(trend > 0, "buy", "sell"),
+                         "adx": adx, "rsi": rsi}, index=index)
+
+
+def write_store(store, quotes, skip=()):
+    days = pd.to_datetime(quotes["time_msc"], unit="ms").normalize()
+    for day in days.unique():
+        if day not in skip:
+            store.write_day(day, quotes[days == day])
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    m1 = m1_rates()
+    quotes = m1_to_quotes(m1, POINT)
+    store = TickStore("US30", "m1", str(tmp_path_factory.mktemp("ticks")))
+    write_store(store, quotes, skip=(GAP_DAY,))
+    df = m15_frame(m1, seed=1)
+    open_ms = np.asarray(df.index, dtype="datetime64[ms]").astype(np.int64)
+    path = IntrabarPath.build(store, open_ms, df["close"].to_numpy(), BAR_MS, SPREAD)
+    kept = pd.to_datetime(quotes["time_msc"], unit="ms").normalize() != GAP_DAY
+    return BarArrays.from_frame(df), path, quotes[kept], open_ms
+
+
+@pytest.fixture(autouse=True)
+def costs(monkeypatch):
+    monkeypatch.setattr(intrabar, "commission_per_trade", 0.3)
+    monkeypatch.setattr(intrabar, "SLIPPAGE_PIPS", 5)
+
+
+@pytest.fixture(params=[True, False], ids=["funded", "unfunded"])
+def funded_mode(request, monkeypatch):
+    for module in (intrabar, funded_risk):
+        monkeypatch.setattr(module, "FUNDED_MODE", request.param)
+    return request.param
+
+
+def replay(bars, quotes, open_ms, params, contract_size, start=1, stop=None):
+    """Quote by quote reference for simulate_intrabar: every quote moves and checks the stop."""
+    close, adx, rsi, signal, tradable, day = bars.as_lists()
+    close_ms = open_ms + BAR_MS
+    bounds = np.searchsorted(quotes["time_msc"], close_ms, side="left")
+    risk = funded_risk.BacktestRiskManager()
+    lot_value = intrabar.LOT_SIZE * contract_size
+    slippage = intrabar.SLIPPAGE_PIPS * POINT
+    commission = intrabar.commission_per_trade
+    sl_dist = params["stop_loss_pts"] * POINT
+    trail_dist = params["trailing_dist_pts"] * POINT
+    trig_pts = params["trailing_trigger_pts"]
+
+    balance = intrabar.START_BALANCE
+    position, entry, stop_loss = 0, 0.0, 0.0
+    current_day, day_start_balance = None, balance
+    for i in range(max(start, 1), len(close) if stop is None else stop):
+        if day[i] != current_day:
+            current_day, day_start_balance = day[i], balance
+        if intrabar.FUNDED_MODE and risk.start_balance - balance >= risk.max_total_loss:
+            return -float("inf")
+        bids = quotes["bid"][bounds[i - 1]:bounds[i]]
+        asks = np.maximum(quotes["ask"][bounds[i - 1]:bounds[i]], bids + SPREAD)
+        if not len(bids):
+            bids = np.array([close[i]])
+            asks = bids + SPREAD
+        for bid, ask in zip(bids.tolist(), asks.tolist()):
+            if position == 1:
+                if (bid - entry) / POINT >= trig_pts:
+                    stop_loss = max(stop_loss, bid - trail_dist)
+                if bid <= stop_loss:
+                    balance += (bid - slippage - entry) * lot_value - commission
+                    position = 0
+            elif position == -1:
+                if (entry - ask) / POINT >= trig_pts:
+                    stop_loss = min(stop_loss, ask + trail_dist)
+                if ask >= stop_loss:
+                    balance += (entry - ask - slippage) * lot_value - commission
+                    position = 0
+        if intrabar.FUNDED_MODE and day_start_balance - balance >= risk.daily_loss_limit:
+            continue
+        if not tradable[i]:
+            continue
+        bid, ask = float(bids[-1]), float(asks[-1])
+        sig = signal[i]
+        if sig == signal[i - 1] and adx[i] >= params["adx_threshold"] and \
+                params["rsi_oversold"] <= rsi[i] <= params["rsi_overbought"]:
+            if sig == 1 and position != 1:
+                if position == -1:
+                    balance += (entry - ask - slippage) * lot_value - commission
+                position, entry = 1, ask + slippage
+                stop_loss = entry - sl_dist
+            elif sig == -1 and position != -1:
+                if position == 1:
+                    balance += (bid - slippage - entry) * lot_value - commission
+                position, entry = -1, bid - slippage
+                stop_loss = entry + sl_dist
+    return balance - intrabar.START_BALANCE
+
+
+def param_grid():
+    return [dict(BASE, adx_threshold=adx, rsi_oversold=lo, stop_loss_pts=sl, trailing_trigger_pts=trig,
+                 trailing_dist_pts=dist)
+            for adx, lo, sl, trig in itertools.product((10, 25), (20, 30), (500, 3000, 8000), (500, 5000))
+            for dist in (200, trig)]
+
+
+def test_summary_covers_every_bar(dataset):
+    bars, path, quotes, open_ms = dataset
+    assert len(path) == len(bars)
+    assert path.n_quotes == len(quotes) - np.searchsorted(quotes["time_msc"], open_ms[0])
+    # The gap day's bars fall back to their close
+    gap = pd.to_datetime(open_ms, unit="ms").normalize() == GAP_DAY
+    assert path.n_missing == gap.sum() > 0
+    bid, ask = path.quotes(int(np.flatnonzero(gap)[3]))
+    assert len(bid) == 1 and ask[0] == pytest.approx(bid[0] + SPREAD)
+
+
+@pytest.mark.parametrize("contract_size", [1.0, 5.0])
+def test_matches_quote_by_quote_replay(dataset, funded_mode, contract_size):
+    bars, path, quotes, open_ms = dataset
+    results = []
+    for params in param_grid()[::3]:
+        result = simulate_intrabar(bars, path, params, POINT, contract_size)
+        assert result == pytest.approx(replay(bars, quotes, open_ms, params, contract_size), rel=0, abs=1e-6)
+        results.append(result)
+    assert len(set(results)) > 1
+
+
+@pytest.mark.parametrize("start, stop", [(1, None), (800, 1900)])
+def test_grid_matches_scalar(dataset, funded_mode, start, stop):
+    bars, path, _, _ = dataset
+    params_list = param_grid()
+    grid = simulate_intrabar_grid(bars, path, params_list, POINT, 5.0, start, stop)
+    assert grid == [simulate_intrabar(bars, path, p, POINT, 5.0, start, stop) for p in params_list]
+
+
+def test_summary_rebuilt_when_store_changes(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(intrabar, "_paths", {})
+    m1 = m1_rates(15 * 300)
+    store = TickStore("US30", "m1", intrabar.INTRABAR_DIR)
+    quotes = m1_to_quotes(m1, POINT)
+    write_store(store, quotes)
+    df = m15_frame(m1, seed=2)
+    open_ms = np.asarray(df.index, dtype="datetime64[ms]").astype(np.int64)
+    close = df["close"].to_numpy()
+
+    built = intrabar_path("US30", 15, "ds", open_ms, close, POINT)
+    intrabar._paths.clear()
+    loaded = intrabar_path("US30", 15, "ds", open_ms, close, POINT)
+    assert loaded is not built and loaded.stamp == built.stamp
+    assert np.array_equal(loaded.summary, built.summary)
+
+    # Rewrite the last day with one more quote, lower than any before it
+    last_day = pd.Timestamp(open_ms[-1], unit="ms").normalize()
+    day_quotes = np.load(store.day_path(last_day))
+    extra = np.array([(open_ms[-1] + 1, 1.0, 1.0)], dtype=TICK_DTYPE)
+    store.write_day(last_day, np.sort(np.concatenate([day_quotes, extra]), order="time_msc"))
+    intrabar._paths.clear()
+    rebuilt = intrabar_path("US30", 15, "ds", open_ms, close, POINT)
+    assert rebuilt.stamp != built.stamp
+    assert rebuilt.summary["bid_min"][-1] == 1.0
+    assert rebuilt.n_quotes == built.n_quotes + 1
+
+
+def test_download_keeps_empty_weekends_only(monkeypatch, tmp_path):
+    m1 = m1_rates(60 * 24 * 8)  # Mon 2024-01-01 .. Mon 2024-01-08
+    days = pd.to_datetime(m1["time"], unit="s").normalize()
+    holes = (days == pd.Timestamp("2024-01-02")) | (days.weekday >= 5)
+    monkeypatch.setitem(fake_mt5._bars, ("US30", fake_mt5.TIMEFRAMES["TIMEFRAME_M1"]), m1[~holes])
+    store = TickStore("US30", "m1", str(tmp_path))
+    assert store.download("2024-01-01", "2024-01-07")
+    stored = {pd.Timestamp(day) for day in pd.date_range("2024-01-01", "2024-01-07") if store.has_day(day)}
+    assert pd.Timestamp("2024-01-02") not in stored
+    assert {pd.Timestamp("2024-01-06"), pd.Timestamp("2024-01-07")} <= stored
+    assert len(np.load(store.day_path("2024-01-06"))) == 0
+    assert len(np.load(store.day_path("2024-01-01"))) == 4 * 60 * 24
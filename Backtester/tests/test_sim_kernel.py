@@ -0,0 +1,53 @@
+import itertools
+import numpy as np
+import pytest
+
+import funded_risk
+import sim_kernel
+from sim_kernel import BarArrays, simulate_arrays, simulate_exit_grid
+
+EXIT_GRID = [dict(adx_threshold=th, rsi_oversold=lo, rsi_overbought=70, stop_loss_pts=sl,
+                  trailing_trigger_pts=tr, trailing_dist_pts=td)
+             for th, lo, sl, tr, td in itertools.product((20, 30), (25, 35), (20, 100, 300, 900),
+                                                         (50, 200, 600), (20, 50, 150))]
+
+
+@pytest.fixture(params=[True, False], ids=["funded", "unfunded"])
+def funded_mode(request, monkeypatch):
+    for module in (sim_kernel, funded_risk):
+        monkeypatch.setattr(module, "FUNDED_MODE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("seed, start, stop", [(0, 1, None), (1, 500, None), (2, 1, 1500), (3, 700, 1800)])
+def test_kernel_matches_run_simulation(signal_frame, funded_mode, monkeypatch, seed, start, stop):
+    pytest.importorskip("pandas_ta")
+    import backtester
+    monkeypatch.setattr(backtester, "FUNDED_MODE", funded_mode)
+
+    df = signal_frame(2000, seed)
+    bars = BarArrays.from_frame(df)
+    for sl, trig, trail, th in itertools.product((50, 800), (100, 400), (50, 100), (20, 30)):
+        params = dict(adx_threshold=th, rsi_oversold=25, rsi_overbought=70, stop_loss_pts=sl,
+                      trailing_trigger_pts=trig, trailing_dist_pts=trail)
+        for contract_size in (1.0, 30.0):
+            expected = backtester.run_simulation(df, params, 1.0, contract_size, start, stop)
+            assert simulate_arrays(bars, params, 1.0, contract_size, start, stop) == expected
+
+
+@pytest.mark.parametrize("seed, start, stop", [(0, 1, None), (1, 500, None), (2, 1, 3500), (3, 500, 3500)])
+def test_exit_grid_matches_scalar(signal_frame, funded_mode, seed, start, stop):
+    bars = BarArrays.from_frame(signal_frame(4000, seed))
+    for contract_size in (1.0, 8.0, 30.0):
+        grid = simulate_exit_grid(bars, EXIT_GRID, 1.0, contract_size, start, stop)
+        scalar = [simulate_arrays(bars, p, 1.0, contract_size, start, stop) for p in EXIT_GRID]
+        assert grid == scalar
+
+
+def test_exit_grid_covers_blown_accounts(signal_frame, funded_mode):
+    """The parity above must include runs that hit the funded max loss (-inf), or it proves little."""
+    bars = BarArrays.from_frame(signal_frame(4000, 0))
+    grid = simulate_exit_grid(bars, EXIT_GRID, 1.0, 30.0)
+    assert (-np.inf in grid) == funded_mode
+    assert any(np.isfinite(grid))
+
@@ -1,17 +1,94 @@
+import atexit
+import json
 import logging
+import multiprocessing
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_LEVEL, LOG_JSON, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+
+LOG_FILE = "backtester.log"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers and jq."""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
 
 # --- Logging Setup ---
-logging.basicConfig(
-    filename="backtester.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-def log_info(message):
-    logging.info(message)
-    print(f"[INFO] {message}")
-
-def log_error(message):
-    logging.error(message)
-    print(f"[ERROR] {message}")
+# Callers only enqueue records; a listener thread does the console and disk I/O.
+_file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                    delay=True)
+_file_handler.setFormatter(JsonLineFormatter() if LOG_JSON else
+                           logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s", DATE_FORMAT))
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+_handlers = (_file_handler, _console_handler)
+
+_queue = queue.SimpleQueue()
+_listener = QueueListener(_queue, *_handlers)
+_listener.start()
+
+logger = logging.getLogger("backtester")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+logger.addHandler(QueueHandler(_queue))
+
+_worker_queue = None
+_worker_listener = None
+
+
+def worker_log_queue():
+    """
+    multiprocessing queue for pool workers (pass it to attach_worker_logging in
+    the pool initializer). Records from it go to this process's handlers, so
+    only one process ever writes and rotates the log file.
+    """
+    global _worker_queue, _worker_listener
+    if _worker_queue is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = QueueListener(_worker_queue, *_handlers)
+        _worker_listener.start()
+    return _worker_queue
+
+
+def attach_worker_logging(log_queue):
+    """In a pool worker: forward records to the parent through log_queue instead of writing locally."""
+    global _listener
+    if _listener is not None:
+        # Under spawn this process started its own listener; under fork the thread isn't running here
+        if _listener._thread is not None and _listener._thread.is_alive():
+            _listener.stop()
+        _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+
+
+@atexit.register
+def _stop_logging():
+    # Flush whatever is still queued before the interpreter exits
+    for listener in (_listener, _worker_listener):
+        if listener is not None and listener._thread is not None:
+            listener.stop()
+
+
+def log_info(message, *args):
+    logger.info(message, *args)
+
+def log_error(message, *args):
+    logger.error(message, *args)
+
+def log_debug(message, *args):
+    """Formatting args is skipped entirely unless LOG_LEVEL is DEBUG."""
+    logger.debug(message, *args)
@@ -0,0 +1,207 @@
+# walk_forward.py
+# Rolling walk-forward optimization: optimize on each fold's in-sample window,
+# trade the fold's best params on the following out-of-sample window, and
+# stitch the out-of-sample equity together. Usage: python walk_forward.py
+
+import MetaTrader5 as mt5
+import json
+import os
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+from config import *
+from utils import log_info, log_error, worker_log_queue
+from mt5_connector import fetch_historical_data, initialize_mt5, shutdown_mt5
+from backtester import (
+    worker_init, load_indicator_frame, simulate_frame, get_symbol_meta,
+    iter_tasks, sweep_ranges, default_workers, published_columns, INDICATOR_GRID
+)
+from indicator_cache import dataset_fingerprint
+from shared_data import SharedDataset, attach_frame
+from sim_kernel import BarArrays, simulate_arrays, simulate_exit_grid
+from calendar_index import calendar_for
+from sweep_results import SweepResults
+
+
+def make_folds(n_bars, n_folds, ratio=WALK_FORWARD_IS_OOS_RATIO):
+    """
+    Rolling folds over bar positions [1, n_bars): each is (is_start, is_stop, oos_stop),
+    with in-sample = ratio out-of-sample lengths and OOS windows tiling the tail of the history.
+    """
+    oos_len = (n_bars - 1) // (ratio + n_folds)
+    if oos_len < 1:
+        raise ValueError(f"{n_bars} bars are too few for {n_folds} folds at ratio {ratio}")
+    is_len = ratio * oos_len
+    first = n_bars - (is_len + n_folds * oos_len)
+    return [(first + k * oos_len, first + k * oos_len + is_len, first + (k + 1) * oos_len + is_len)
+            for k in range(n_folds)]
+
+
+def simulate_folds(task):
+    """
+    Score one indicator group on every fold's in-sample window.
+    The indicator frame is computed once over the full history (and cached), and its
+    BarArrays are built once for all folds, so a fold only changes the window.
+    task = (symbol, timeframe, dataset_handle, params_list, folds)
+    Returns one SweepResults per fold.
+    """
+    symbol, timeframe, handle, params_list, folds = task
+    df = load_indicator_frame(handle.dataset_id, lambda: attach_frame(handle), params_list[0])
+    meta = handle.meta or get_symbol_meta(symbol)
+    out = [SweepResults() for _ in folds]
+    calendar = calendar_for(handle.dataset_id, df.index)
+    if df.empty or meta is None or SIM_ENGINE not in ("numpy", "batched"):
+        # Nothing to score, or an engine that works on the frame itself
+        for results, (is_start, is_stop, _) in zip(out, folds):
+            results.add_all(simulate_frame(symbol, df, params_list, (is_start, is_stop), meta,
+                                           calendar=calendar))
+        return out
+
+    point, contract_size = meta
+    bars = BarArrays.from_frame(df, calendar)
+    batched = SIM_ENGINE == "batched" and len(params_list) >= BATCH_MIN_COMBOS
+    for results, (is_start, is_stop, _) in zip(out, folds):
+        if batched:
+            profits = simulate_exit_grid(bars, params_list, point, contract_size, is_start, is_stop)
+        else:
+            profits = [simulate_arrays(bars, p, point, contract_size, is_start, is_stop) for p in params_list]
+        results.add_all([{"profit": profit, "params": p} for profit, p in zip(profits, params_list)])
+    return out
+
+
+def simulate_oos(task):
+    """
+    Trade one fold's best params over its out-of-sample window.
+    task = (symbol, timeframe, dataset_handle, params, (oos_start, oos_stop))
+    Returns (profit, fills) with fills as [(bar, balance), ...].
+    """
+    symbol, timeframe, handle, params, (start, stop) = task
+    df = load_indicator_frame(handle.dataset_id, lambda: attach_frame(handle), params)
+    meta = handle.meta or get_symbol_meta(symbol)
+    if df.empty or meta is None:
+        return -float('inf'), []
+    fills = []
+    bars = BarArrays.from_frame(df, calendar_for(handle.dataset_id, df.index))
+    profit = simulate_arrays(bars, params, meta[0], meta[1], start, stop, fills)
+    return profit, fills
+
+
+def stitch_equity(times, folds, oos_results):
+    """Out-of-sample equity per bar; each fold starts from where the previous one ended."""
+    rows = []
+    offset = 0.0
+    for k, ((_, oos_start, oos_stop), (profit, fills)) in enumerate(zip(folds, oos_results)):
+        bars = np.arange(oos_start, oos_stop)
+        fill_bars = np.array([bar for bar, _ in fills], dtype=np.int64)
+        fill_pnl = np.array([balance - START_BALANCE for _, balance in fills] + [0.0])
+        # Index -1 (before the first fill) picks the trailing 0.0
+        pnl = fill_pnl[np.searchsorted(fill_bars, bars, side="right") - 1] if fills else np.zeros(len(bars))
+        rows.append(pd.DataFrame({"time": times[oos_start:oos_stop], "fold": k, "equity": START_BALANCE + offset + pnl}))
+        offset += pnl[-1]
+    return pd.concat(rows, ignore_index=True)
+
+
+def walk_forward(symbol, timeframe, df_raw, n_folds=WALK_FORWARD_FOLDS):
+    """
+    Walk-forward optimize one symbol/timeframe. Every pool task covers one indicator
+    group across all folds, so the pool stays busy whatever the fold count.
+    Returns (fold reports, stitched OOS equity frame).
+    """
+    if INTRABAR_ENABLED:
+        # Folds and OOS equity are scored on bar closes only; don't pass that off as an intrabar run
+        raise RuntimeError("Walk-forward has no intrabar engine. Set INTRABAR_ENABLED = False.")
+    info = mt5.symbol_info(symbol) if mt5.symbol_select(symbol, True) else None
+    if info is None:
+        raise RuntimeError(f"No symbol info for {symbol}")
+    min_sl, max_sl, step_eur = sweep_ranges(info)
+
+    num_workers = default_workers()
+    n_folds = n_folds or num_workers
+    folds = make_folds(len(df_raw), n_folds)
+    times = df_raw['time'].to_numpy()
+
+    dataset_id = dataset_fingerprint(symbol, timeframe, df_raw['time'].iloc[0], df_raw['time'].iloc[-1], len(df_raw))
+    dataset = SharedDataset(df_raw, dataset_id, (info.point, info.trade_contract_size), published_columns())
+
+    n_groups = 1
+    for dim in INDICATOR_GRID:
+        n_groups *= len(dim)
+    chunksize = max(1, n_groups // (num_workers * CHUNKS_PER_WORKER))
+    log_info(f"Walk-forward {symbol} @ {timeframe}: {n_folds} folds, {num_workers} workers, "
+             f"{n_groups} indicator groups")
+
+    fold_results = [SweepResults() for _ in folds]
+    try:
+        with Pool(processes=num_workers, initializer=worker_init, initargs=(worker_log_queue(),)) as pool:
+            tasks = ((s, tf, handle, params_list, folds)
+                     for s, tf, handle, params_list, _ in iter_tasks(symbol, timeframe, dataset.handle,
+                                                                      min_sl, max_sl, step_eur))
+            for per_fold in pool.imap_unordered(simulate_folds, tasks, chunksize=chunksize):
+                for results, fold in zip(fold_results, per_fold):
+                    results.merge(fold)
+
+            best = [results.best() for results in fold_results]
+            oos_tasks = [(symbol, timeframe, dataset.handle, params, (is_stop, oos_stop))
+                         for (params, _), (_, is_stop, oos_stop) in zip(best, folds) if params is not None]
+            oos_results = iter(pool.map(simulate_oos, oos_tasks))
+            # Let the workers exit normally so they release the shared dataset
+            pool.close()
+            pool.join()
+    finally:
+        dataset.close()
+
+    reports, traded_folds, traded = [], [], []
+    for k, ((is_start, is_stop, oos_stop), (params, is_profit), results) in enumerate(zip(folds, best, fold_results)):
+        oos_profit, fills = next(oos_results) if params is not None else (None, [])
+        reports.append({
+            "fold": k,
+            "in_sample": [str(times[is_start]), str(times[is_stop - 1])],
+            "out_of_sample": [str(times[is_stop]), str(times[oos_stop - 1])],
+            "best_params": params,
+            "in_sample_profit": is_profit,
+            "out_of_sample_profit": oos_profit,
+            "total_params_tested": results.tested,
+            "total_rejected_params": results.rejected,
+        })
+        if params is not None:
+            traded_folds.append((is_start, is_stop, oos_stop))
+            traded.append((oos_profit, fills))
+        log_info(f"Fold {k}: IS profit {is_profit:.2f}, OOS profit {oos_profit}")
+
+    equity = stitch_equity(times, traded_folds, traded) if traded else pd.DataFrame(columns=["time", "fold", "equity"])
+    return reports, equity
+
+
+if __name__ == "__main__":
+    if INTRABAR_ENABLED:
+        log_error("Walk-forward has no intrabar engine. Set INTRABAR_ENABLED = False.")
+        exit()
+    if not initialize_mt5():
+        log_error("MT5 initialization failed.")
+        exit()
+
+    os.makedirs("results", exist_ok=True)
+    for symbol in SYMBOL_LIST:
+        for timeframe in TIMEFRAME_LIST:
+            log_info(f"Loading data for {symbol} @ {timeframe}...")
+            df = fetch_historical_data(symbol, timeframe, BACKTEST_START_DATE, BACKTEST_END_DATE)
+            if df.empty:
+                log_error(f"No data for {symbol} @ {timeframe}")
+                continue
+            df = df[(df['time'] >= pd.to_datetime(BACKTEST_START_DATE)) &
+                    (df['time'] <= pd.to_datetime(BACKTEST_END_DATE))].reset_index(drop=True)
+
+            try:
+                reports, equity = walk_forward(symbol, timeframe, df)
+            except Exception as e:
+                log_error(f"Error in walk-forward for {symbol}@{timeframe}: {e}")
+                continue
+
+            with open(f"results/walk_forward_{symbol}_{timeframe}.json", "w") as f:
+                json.dump({"symbol": symbol, "timeframe": timeframe, "folds": reports}, f, indent=4)
+            equity.to_csv(f"results/walk_forward_equity_{symbol}_{timeframe}.csv", index=False)
+            final = equity["equity"].iloc[-1] - START_BALANCE if len(equity) else 0.0
+            log_info(f"{symbol} @ {timeframe}: stitched OOS profit {final:.2f} over {len(reports)} folds")
+
+    shutdown_mt5()
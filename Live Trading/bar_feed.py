@@ -0,0 +1,178 @@
+# bar_feed.py
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+from terminal import mt5
+from config import BAR_POLL_SECONDS, BAR_CLOSE_GRACE_SECONDS
+from metrics import metrics
+from mt5_connector import fetch_rates, session
+from utils import log_info, log_error
+
+
+def timeframe_seconds(timeframe):
+    """Bar length in seconds for an MT5 TIMEFRAME_* constant (minutes, 0x4000|hours, 0x8001 = week)."""
+    if timeframe < 0x4000:
+        return timeframe * 60
+    if timeframe < 0x8000:
+        return (timeframe - 0x4000) * 3600
+    if timeframe == 0x8001:
+        return 7 * 86400
+    raise ValueError(f"Unsupported timeframe {timeframe}")
+
+
+class BarRingBuffer:
+    """Fixed-capacity store of the most recent closed bars, as an MT5 rate array."""
+    def __init__(self, capacity, dtype):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.start = 0
+        self.size = 0
+
+    def extend(self, rates):
+        rates = rates[-self.capacity:]
+        n = len(rates)
+        if n == 0:
+            return
+        self.data[(self.start + self.size + np.arange(n)) % self.capacity] = rates
+        overflow = max(0, self.size + n - self.capacity)
+        self.size = min(self.capacity, self.size + n)
+        self.start = (self.start + overflow) % self.capacity
+
+    def to_array(self):
+        """Bars oldest first."""
+        idx = (self.start + np.arange(self.size)) % self.capacity
+        return self.data[idx]
+
+    def last_time(self):
+        if self.size == 0:
+            return None
+        return int(self.data[(self.start + self.size - 1) % self.capacity]["time"])
+
+    def __len__(self):
+        return self.size
+
+
+class BarFeed:
+    """
+    Detects newly closed bars with a one-bar query and fetches only the bars
+    after the last stored timestamp into a ring buffer.
+    """
+    def __init__(self, symbol, timeframe, capacity):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.bar_seconds = timeframe_seconds(timeframe)
+        self.capacity = capacity
+        self.buffer = None
+        self.forming_time = None
+        self.server_offset = 0.0  # server clock minus local clock, from the last tick
+        self.lock = threading.Lock()  # buffer updates vs state snapshots
+
+    def prime(self):
+        """Load history once; the last fetched bar is still forming and is not stored."""
+        rates = fetch_rates(self.symbol, self.timeframe, self.capacity + 1)
+        if rates is None or len(rates) < 2:
+            return False
+        self.buffer = BarRingBuffer(self.capacity, rates.dtype)
+        self.buffer.extend(rates[:-1])
+        self.forming_time = int(rates["time"][-1])
+        log_info(f"[BAR FEED] Primed {len(self.buffer)} closed bars for {self.symbol}")
+        return True
+
+    def restore(self, bars, forming_time):
+        """
+        Warm start from a saved buffer: fetch only the bars after its last one.
+        Returns the closed bars that were missed, or None when the snapshot cannot
+        be used (terminal failure, or a gap longer than the buffer); prime() then starts cold.
+        """
+        if len(bars) == 0:
+            return None
+        last = int(bars["time"][-1])
+        with metrics.timer("bar_fetch", symbol=self.symbol):
+            rates = mt5.copy_rates_range(self.symbol, self.timeframe, pd.to_datetime(last + 1, unit="s"),
+                                         pd.Timestamp.now() + pd.Timedelta(days=1))
+        if rates is None:
+            session.mark_failed()
+            return None
+        rates = rates[rates["time"] > last]
+        # The newest bar is still forming
+        missed = rates[:-1]
+        if len(missed) >= self.capacity:
+            return None
+        buffer = BarRingBuffer(self.capacity, bars.dtype)
+        buffer.extend(bars)
+        buffer.extend(missed.astype(bars.dtype))
+        with self.lock:
+            self.buffer = buffer
+            self.forming_time = int(rates["time"][-1]) if len(rates) else forming_time
+        log_info(f"[BAR FEED] Restored {len(self.buffer)} closed bars for {self.symbol}, {len(missed)} fetched")
+        return missed
+
+    def snapshot(self):
+        """(closed bars oldest first, forming bar time) for a state snapshot."""
+        with self.lock:
+            return self.buffer.to_array(), self.forming_time
+
+    def frame(self):
+        """Closed bars as a DataFrame, in the layout fetch_historical_data returns."""
+        df = pd.DataFrame(self.buffer.to_array())
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df
+
+    def poll(self):
+        """Cheap check for a new bar. Returns the newly closed bars (possibly empty), or None on failure."""
+        current = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, 1)
+        if current is None:
+            session.mark_failed()
+            return None
+        if len(current) == 0:
+            return None
+        tick = mt5.symbol_info_tick(self.symbol)
+        if tick is not None and tick.time:
+            self.server_offset = tick.time - time.time()
+
+        forming_time = int(current["time"][-1])
+        if forming_time <= self.forming_time:
+            return current[:0]
+
+        # A new bar opened: fetch every closed bar after the last stored one
+        last = self.buffer.last_time()
+        with metrics.timer("bar_fetch", symbol=self.symbol):
+            rates = mt5.copy_rates_range(self.symbol, self.timeframe,
+                                         pd.to_datetime(last + 1, unit="s"),
+                                         pd.to_datetime(forming_time - 1, unit="s"))
+        if rates is None:
+            log_error(f"[BAR FEED] Failed to fetch new bars for {self.symbol}")
+            return None
+        rates = rates[rates["time"] > last]
+        with self.lock:
+            self.buffer.extend(rates.astype(self.buffer.data.dtype))
+            self.forming_time = forming_time
+        return rates
+
+    def seconds_to_next_close(self):
+        """Local seconds until the forming bar is due to close (can be negative)."""
+        next_close = self.forming_time + self.bar_seconds
+        return next_close - (time.time() + self.server_offset)
+
+    def wait_for_bar(self, timeout):
+        """
+        Sleep until just after the forming bar closes, then poll until the new bar
+        shows up. Returns the new closed bars, or an empty/None result after timeout.
+        """
+        deadline = time.time() + timeout
+        while True:
+            wait = self.seconds_to_next_close() + BAR_CLOSE_GRACE_SECONDS
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return self.poll()
+            if wait > 0:
+                time.sleep(min(wait, remaining))
+                continue
+            bars = self.poll()
+            if bars is None or len(bars) > 0:
+                return bars
+            # A bar overdue by more than a whole bar means the market is closed; poll slower
+            overdue = -self.seconds_to_next_close() > self.bar_seconds
+            time.sleep(min(BAR_POLL_SECONDS * (10 if overdue else 1), max(remaining, 0)))
@@ -1,16 +1,11 @@
-import time
-import os
 import json
-import pandas as pd
-import MetaTrader5 as mt5
 
 from config import *
-from mt5_connector import (
-    initialize_mt5, shutdown_mt5, fetch_historical_data,
-    execute_trade, adjust_trailing_stop
-)
-from strategy import calculate_indicators
+from mt5_connector import initialize_mt5, shutdown_mt5
+from strategy_runner import LiveStrategy, StrategyRunner
 from funded_risk import DailyLossManager
+from metrics import metrics
+from state_store import load_state, strategy_state
 from utils import log_info, log_error
 
 # Load best config from file (symbol, timeframe, strategy params)
@@ -28,22 +23,38 @@ if not initialize_mt5():
     log_error("Failed to initialize MT5. Exiting.")
     exit()
 
-# Select symbol + timeframe + params
-if USE_MANUAL_SYMBOL:
-    symbol = MANUAL_SYMBOL
-    timeframe = MANUAL_TIMEFRAME
-    best_params = MANUAL_PARAMS
-    log_info(f"[MANUAL MODE] Trading {symbol} on timeframe {timeframe}")
+# Select strategies: STRATEGIES list, else one symbol + timeframe + params
+if STRATEGIES:
+    configs = [(s["symbol"], s["timeframe"], s["params"]) for s in STRATEGIES]
+    log_info(f"[PORTFOLIO MODE] Trading {len(configs)} strategies from STRATEGIES")
+elif USE_MANUAL_SYMBOL:
+    configs = [(MANUAL_SYMBOL, MANUAL_TIMEFRAME, MANUAL_PARAMS)]
+    log_info(f"[MANUAL MODE] Trading {MANUAL_SYMBOL} on timeframe {MANUAL_TIMEFRAME}")
 else:
     symbol, timeframe, best_params = load_best_config()
     if not all([symbol, timeframe, best_params]):
         log_error("Missing config from best_params.json. Exiting.")
         shutdown_mt5()
         exit()
+    configs = [(symbol, timeframe, best_params)]
     log_info(f"[AUTO MODE] Trading {symbol} on {timeframe} with loaded best params.")
 
+if any(params is None for _, _, params in configs):
+    log_error("No parameters defined for strategy.")
+    shutdown_mt5()
+    exit()
+
+# Each strategy primes its own bar feed: from the saved state plus the bars missed
+# since, else full history once; then only new bars
+saved = load_state()
+strategies = [LiveStrategy(symbol, timeframe, params) for symbol, timeframe, params in configs]
+if not all(s.prime(strategy_state(saved, s.name)) for s in strategies):
+    log_error("No historical data. Exiting.")
+    shutdown_mt5()
+    exit()
+
 # Setup daily loss logic
-daily_loss_manager = DailyLossManager()
+daily_loss_manager = DailyLossManager(saved["daily_loss"] if saved else None)
 
 # Initial risk check
 if FUNDED_MODE and daily_loss_manager.should_stop_bot():
@@ -51,54 +62,7 @@ if FUNDED_MODE and daily_loss_manager.should_stop_bot():
     shutdown_mt5()
     exit()
 
-# Main loop
-while True:
-    if os.path.exists("stop.flag"):
-        log_info("Stop flag detected. Exiting.")
-        os.remove("stop.flag")
-        break
-
-    if not mt5.initialize():
-        log_error("Reinitializing MT5...")
-        mt5.shutdown()
-        time.sleep(5)
-        continue
-
-    if FUNDED_MODE:
-        daily_loss_manager.update_day()
-        if daily_loss_manager.should_stop_bot():
-            log_error("FUNDED MODE: Max daily loss exceeded. Stopping.")
-            shutdown_mt5()
-            exit()
-
-    df = fetch_historical_data(symbol, timeframe, Bars)
-    if df.empty:
-        log_error("No historical data.")
-        time.sleep(TRADE_FREQUENCY_SECONDS)
-        continue
-
-    if best_params is None:
-        log_error("No parameters defined for strategy.")
-        shutdown_mt5()
-        exit()
-
-    df = calculate_indicators(df, best_params)
-
-    last_row = df.iloc[-1]
-    prev_row = df.iloc[-2]
-
-    supertrend_signal = last_row['supertrend_signal'] if last_row['supertrend_signal'] == prev_row['supertrend_signal'] else "hold"
-    adx = last_row['adx']
-    rsi = last_row['rsi']
-    price = last_row['close']
-
-    log_info(f"SuperTrend: {supertrend_signal}, ADX: {adx}, RSI: {rsi}, Price: {price}")
-
-    if all(pd.notna([supertrend_signal, adx, rsi, price])):
-        if supertrend_signal == "buy" and adx >= best_params["adx_threshold"] and best_params["rsi_oversold"] <= rsi <= best_params["rsi_overbought"]:
-            execute_trade(symbol, "buy", price)
-        elif supertrend_signal == "sell" and adx >= best_params["adx_threshold"] and best_params["rsi_oversold"] <= rsi <= best_params["rsi_overbought"]:
-            execute_trade(symbol, "sell", price)
-
-    adjust_trailing_stop()
-    time.sleep(TRADE_FREQUENCY_SECONDS)
+metrics.start()
+StrategyRunner(strategies, daily_loss_manager).run()
+shutdown_mt5()
+metrics.stop()
@@ -12,7 +12,39 @@ Bars = 10000
 TRAILING_STOP_TRIGGER_PIPS = 50
 TRAILING_STOP_ENABLED = True
 TRAILING_STOP_DISTANCE_PIPS = 30
-TRADE_FREQUENCY_SECONDS = 30
+TRADE_FREQUENCY_SECONDS = 30   # Max wait between trailing-stop checks; signals run on bar close
+SNAPSHOT_MAX_AGE_SECONDS = TRADE_FREQUENCY_SECONDS * 2  # Signals reuse the loop's snapshot up to this age
+BAR_POLL_SECONDS = 1           # Poll interval once a bar is due to close
+BAR_CLOSE_GRACE_SECONDS = 0.5  # Wait this long past the expected close before the first poll
+
+# Order execution (orders are sent from a worker thread)
+ORDER_MAX_ATTEMPTS = 3
+ORDER_RETRY_BACKOFF_SECONDS = 0.25  # Doubles per attempt for timeout/connection retcodes
+ORDER_REPORT_HISTORY = 1000         # Recent order latency/slippage reports kept in memory
+ORDER_MAGIC = 123456
+
+# Connector session
+SYMBOL_META_TTL_SECONDS = 3600   # Re-read static symbol metadata (point, digits, volume limits...) after this
+CONNECTION_CHECK_SECONDS = 60    # Re-check a healthy terminal connection at most this often
+
+# Bar cache (only bars newer than the cached tail are fetched)
+BAR_CACHE_ENABLED = True
+BAR_CACHE_DIR = "bar_cache"
+BAR_CACHE_MAX_BARS = Bars * 2
+
+# Incremental indicators (seeded once, then O(1) per closed bar)
+STREAMING_INDICATORS = True
+STREAMING_VERIFY = True       # Compare against pandas_ta once after seeding
+STREAMING_TOLERANCE = 1e-6    # Max relative ADX/RSI deviation vs pandas_ta (native, non TA-Lib)
+
+# Compact indicator frames (close/adx/rsi + int8 signal) for full recalculations
+INDICATOR_COMPACT = True
+INDICATOR_COMPACT_VERIFY = True  # Compare against the full frame once after priming
+
+# Warm-start state (bar buffer, indicator state, day-start balance) for fast restarts
+STATE_ENABLED = True
+STATE_PATH = "bot_state.pkl"
+STATE_SAVE_SECONDS = 60       # Also saved at shutdown
 
 # Symbol & Timeframe Settings
 USE_MANUAL_SYMBOL = False
@@ -28,7 +60,25 @@ MANUAL_PARAMS = {
     "rsi_overbought": 70
 }
 
+# Portfolio mode: several strategies in one process (empty = single strategy above / best_params.json)
+# e.g. {"symbol": "US30", "timeframe": mt5.TIMEFRAME_M15, "params": {...same keys as MANUAL_PARAMS...}}
+STRATEGIES = []
+
 
 # Prop firm logic
 FUNDED_MODE = True
 DAILY_MAX_LOSS_PERCENT = 4.5  # If needed in future
+
+# Metrics (per-stage latency histograms and counters; disabled = no recording)
+METRICS_ENABLED = False
+METRICS_HTTP_HOST = "127.0.0.1"
+METRICS_HTTP_PORT = 9108           # Prometheus text format at /metrics; 0 = no HTTP endpoint
+METRICS_SNAPSHOT_PATH = "metrics.json"
+METRICS_SNAPSHOT_SECONDS = 60      # JSON snapshot interval; 0 = only at shutdown
+METRICS_WINDOW = 1024              # Recent samples per timer behind p50/p99
+
+# Logging
+LOG_LEVEL = "INFO"              # "DEBUG" also logs the indicator frame dumps
+LOG_JSON = False                # JSON lines instead of plain text in the log file
+LOG_MAX_BYTES = 5 * 1024 * 1024 # Rotate the log file at this size
+LOG_BACKUP_COUNT = 5
@@ -1,23 +1,31 @@
+import threading
 from datetime import datetime, time
 from zoneinfo import ZoneInfo
-import MetaTrader5 as mt5
+from terminal import mt5
 from config import START_BALANCE, DAILY_MAX_LOSS_PERCENT, FUNDED_MODE
 from utils import log_info, log_error
 
 class DailyLossManager:
-    def __init__(self):
+    def __init__(self, saved=None):
         # Set timezone and initialize today's date
         self.timezone = ZoneInfo("Europe/Berlin")
         now = datetime.now(self.timezone)
         self.today = now.date()
+        # Strategy threads check before each order, the monitor loop every cycle
+        self.lock = threading.Lock()
 
-        # Fetch starting balance at the beginning of the day
-        account_info = mt5.account_info()
-        if account_info is None:
-            log_error("Failed to get account info at init. Using START_BALANCE.")
-            self.day_start_balance = START_BALANCE
+        if saved is not None and saved["day"] == self.today.isoformat():
+            # Restarted the same day: keep the balance the day really started with
+            self.day_start_balance = saved["day_start_balance"]
+            log_info(f"[DAILY LOSS RESTORE] Start Balance {self.day_start_balance:.2f} from the saved state")
         else:
-            self.day_start_balance = account_info.balance
+            # Fetch starting balance at the beginning of the day
+            account_info = mt5.account_info()
+            if account_info is None:
+                log_error("Failed to get account info at init. Using START_BALANCE.")
+                self.day_start_balance = START_BALANCE
+            else:
+                self.day_start_balance = account_info.balance
 
         # Calculate maximum allowed daily loss
         self.max_daily_loss = START_BALANCE * (DAILY_MAX_LOSS_PERCENT / 100)
@@ -26,37 +34,50 @@ class DailyLossManager:
             f"Max Loss: {self.max_daily_loss:.2f}"
         )
 
-    def update_day(self):
+    def state(self):
+        """Berlin day and its start balance, for the warm-start snapshot."""
+        with self.lock:
+            return {"day": self.today.isoformat(), "day_start_balance": self.day_start_balance}
+
+    def check(self, snapshot=None):
+        """update_day() then should_stop_bot(), as one step that is safe to call from any thread."""
+        with self.lock:
+            self.update_day(snapshot)
+            return self.should_stop_bot(snapshot)
+
+    def update_day(self, snapshot=None):
         # Reset tracking at Berlin midnight
         now = datetime.now(self.timezone)
         if now.date() != self.today:
             self.today = now.date()
-            account_info = mt5.account_info()
+            account_info = snapshot.account if snapshot else mt5.account_info()
             if account_info is None:
                 log_error("Failed to get account info at day reset.")
             else:
                 self.day_start_balance = account_info.balance
                 log_info(f"[DAILY LOSS RESET] New day detected. Start Balance reset to {self.day_start_balance:.2f}")
 
-    def get_closed_pnl(self):
+    def get_closed_pnl(self, snapshot=None):
         # Closed P/L is the difference in account balance since start of day
-        account_info = mt5.account_info()
+        account_info = snapshot.account if snapshot else mt5.account_info()
         if account_info is None:
             log_error("Failed to fetch account info for closed P/L.")
             return 0.0
         return account_info.balance - self.day_start_balance
 
-    def get_floating_pnl(self):
+    def get_floating_pnl(self, snapshot=None):
         # Floating P/L is the sum of open position profits/losses
+        if snapshot:
+            return snapshot.floating_pnl
         positions = mt5.positions_get()
         if positions is None:
             log_error("Failed to fetch open positions for floating P/L.")
             return 0.0
         return sum(pos.profit for pos in positions)
 
-    def get_current_daily_loss(self):
-        closed = self.get_closed_pnl()
-        floating = self.get_floating_pnl()
+    def get_current_daily_loss(self, snapshot=None):
+        closed = self.get_closed_pnl(snapshot)
+        floating = self.get_floating_pnl(snapshot)
         total = closed + floating
         log_info(
             f"[DAILY LOSS] Closed: {closed:.2f} | Floating: {floating:.2f} | "
@@ -64,7 +85,7 @@ class DailyLossManager:
         )
         return total
 
-    def should_stop_bot(self):
+    def should_stop_bot(self, snapshot=None):
         if not FUNDED_MODE:
             return False
-        return self.get_current_daily_loss() <= -self.max_daily_loss
+        return self.get_current_daily_loss(snapshot) <= -self.max_daily_loss
@@ -0,0 +1,251 @@
+# metrics.py
+# Per-stage latency histograms and counters for the live loop, served in the
+# Prometheus text format over local HTTP and written to a JSON snapshot file.
+# With METRICS_ENABLED off, timers and counters return without recording.
+
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, time
+from config import (METRICS_ENABLED, METRICS_HTTP_HOST, METRICS_HTTP_PORT, METRICS_SNAPSHOT_PATH,
+                    METRICS_SNAPSHOT_SECONDS, METRICS_WINDOW)
+from terminal import worker
+from utils import log_info, log_error
+
+PREFIX = "bot"
+# Histogram bucket upper bounds in milliseconds (a final +Inf bucket is implied)
+BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    """Cumulative buckets since start, plus the last `window` samples for exact p50/p99."""
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self, window):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += ms
+        self.count += 1
+        self.recent.append(ms)
+
+    def percentiles(self):
+        """(p50, p99, max) over the recent samples, or None."""
+        samples = sorted(self.recent)
+        if not samples:
+            return None
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        return pick(0.5), pick(0.99), samples[-1]
+
+
+class _Timer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, (perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    Stage timers (histograms in ms) and counters keyed by name and labels.
+    `with metrics.timer("stage", symbol=...)` times a block, observe() records a
+    duration measured elsewhere, inc() bumps a counter. start() serves /metrics
+    and /snapshot.json on METRICS_HTTP_PORT and writes METRICS_SNAPSHOT_PATH
+    every METRICS_SNAPSHOT_SECONDS; stop() writes a final snapshot.
+    """
+    def __init__(self, enabled=METRICS_ENABLED, window=METRICS_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.started_at = time()
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> count
+        self._server = None
+        self._stop = threading.Event()
+        self._writer = None
+
+    def timer(self, stage, **labels):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (stage, _labels(labels)))
+
+    def observe(self, stage, ms, **labels):
+        if self.enabled:
+            self._observe((stage, _labels(labels)), ms)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, key, ms):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.window)
+            histogram.observe(ms)
+
+    def _terminal_call(self, fn_name, wait_ms, run_ms):
+        # Queue wait shows contention on the terminal thread; run time shows terminal stalls
+        self._observe(("terminal_wait", (("fn", fn_name),)), wait_ms)
+        self._observe(("terminal_call", (("fn", fn_name),)), run_ms)
+
+    def render_prometheus(self):
+        with self._lock:
+            histograms = sorted((key, h.counts[:], h.total, h.count, h.percentiles())
+                                for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines, typed = [], set()
+        for (name, labels), counts, total, count, recent in histograms:
+            family = f"{PREFIX}_{name}_ms"
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {family} histogram")
+                lines.append(f"# TYPE {family}_recent gauge")
+            cumulative = 0
+            for bound, n in zip((*BUCKETS_MS, "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{family}_bucket{_format_labels(labels, (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{family}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{family}_count{_format_labels(labels)} {count}")
+            if recent is not None:
+                for quantile, value in zip(("0.5", "0.99", "1"), recent):
+                    lines.append(f"{family}_recent{_format_labels(labels, (('quantile', quantile),))} {value}")
+        for (name, labels), value in counters:
+            family = f"{PREFIX}_{name}_total"
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {family} counter")
+            lines.append(f"{family}{_format_labels(labels)} {value}")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Plain dict of every timer (count, mean, p50/p99/max ms) and counter."""
+        with self._lock:
+            histograms = [(key, h.total, h.count, h.percentiles()) for key, h in self._histograms.items()]
+            counters = dict(self._counters)
+        stages = {}
+        for (name, labels), total, count, recent in sorted(histograms):
+            entry = {"count": count, "mean_ms": round(total / count, 3) if count else None}
+            if recent is not None:
+                entry.update(zip(("p50_ms", "p99_ms", "max_ms"), (round(v, 3) for v in recent)))
+            stages[name + _format_labels(labels)] = entry
+        return {
+            "time": time(),
+            "uptime_s": round(time() - self.started_at, 1),
+            "stages": stages,
+            "counters": {name + _format_labels(labels): value for (name, labels), value in sorted(counters.items())},
+        }
+
+    def write_snapshot(self, path=METRICS_SNAPSHOT_PATH):
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            log_error(f"[METRICS] Could not write {path}: {e}")
+
+    def start(self, host=METRICS_HTTP_HOST, port=METRICS_HTTP_PORT, interval=METRICS_SNAPSHOT_SECONDS):
+        if not self.enabled:
+            return
+        worker.on_call = self._terminal_call
+        if port:
+            try:
+                self._server = ThreadingHTTPServer((host, port), _handler(self))
+            except OSError as e:
+                log_error(f"[METRICS] Could not listen on {host}:{port}: {e}")
+            else:
+                self._server.daemon_threads = True
+                threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+                log_info(f"[METRICS] Serving http://{host}:{port}/metrics")
+        if interval:
+            self._writer = threading.Thread(target=self._write_loop, args=(interval,), name="metrics-snapshot",
+                                            daemon=True)
+            self._writer.start()
+
+    def _write_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.write_snapshot()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._stop.set()
+        worker.on_call = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.write_snapshot()
+
+
+def _handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/snapshot.json":
+                body, content_type = json.dumps(metrics.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+metrics = Metrics()
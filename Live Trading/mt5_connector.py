@@ -1,16 +1,188 @@
-import MetaTrader5 as mt5
-import json
+import numpy as np
 import pandas as pd
 import time
+from collections import namedtuple
+from types import MappingProxyType
+from datetime import datetime, timedelta
 from config import *
+# After the star import, which would otherwise rebind mt5 to the raw module
+from terminal import mt5
+from bar_cache import BarCache
+from metrics import metrics
+from order_executor import executor
 from utils import log_info, log_error
 
+SymbolMeta = namedtuple("SymbolMeta", [
+    "point", "digits", "volume_min", "volume_max", "volume_step",
+    "filling_mode", "trade_stops_level", "trade_contract_size"
+])
+
+
+class ConnectorSession:
+    """
+    Terminal connection health plus static symbol metadata, so the order path
+    does not re-initialize MT5 or re-read symbol_info on every call.
+    The connection is only re-checked after a failed call or once
+    CONNECTION_CHECK_SECONDS have passed; metadata expires after SYMBOL_META_TTL_SECONDS.
+    """
+    def __init__(self, meta_ttl=SYMBOL_META_TTL_SECONDS, check_interval=CONNECTION_CHECK_SECONDS):
+        self.meta_ttl = meta_ttl
+        self.check_interval = check_interval
+        self.healthy = False
+        self.trade_allowed = False
+        self.last_check = 0.0
+        self.failures = 0
+        self._meta = {}  # symbol -> (fetched_at, SymbolMeta)
+
+    def mark_connected(self, account_info):
+        self.healthy = True
+        self.trade_allowed = bool(account_info.trade_allowed)
+        self.last_check = time.monotonic()
+        self.failures = 0
+
+    def mark_failed(self):
+        self.healthy = False
+        self.failures += 1
+        metrics.inc("terminal_failures")
+
+    def ensure_connected(self):
+        """True when the terminal is usable; re-initializes only if the last check failed."""
+        if self.healthy and time.monotonic() - self.last_check < self.check_interval:
+            return True
+        account_info = mt5.account_info()
+        if account_info is None:
+            mt5.shutdown()
+            if mt5.initialize():
+                account_info = mt5.account_info()
+        if account_info is None:
+            self.mark_failed()
+            log_error(f"MT5 connection unavailable ({self.failures} failed check(s)): {mt5.last_error()}")
+            return False
+        if not self.healthy:
+            log_info("MT5 connection healthy.")
+        self.mark_connected(account_info)
+        return True
+
+    def symbol_meta(self, symbol):
+        """Cached SymbolMeta for symbol (selecting it in Market Watch on first use), or None."""
+        cached = self._meta.get(symbol)
+        if cached is not None and time.monotonic() - cached[0] < self.meta_ttl:
+            return cached[1]
+        if not mt5.symbol_select(symbol, True):
+            log_error(f"Symbol {symbol} not available in MT5.")
+            return None
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            self.mark_failed()
+            log_error(f"Failed to get symbol info for {symbol}")
+            return None
+        meta = SymbolMeta(*(getattr(info, field) for field in SymbolMeta._fields))
+        self._meta[symbol] = (time.monotonic(), meta)
+        return meta
+
+    def tick(self, symbol):
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            self.mark_failed()
+            log_error(f"Failed to get price for {symbol}")
+        return tick
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self._meta.clear()
+        else:
+            self._meta.pop(symbol, None)
+
+
+session = ConnectorSession()
+
+
+class CycleSnapshot(namedtuple("CycleSnapshot", ["taken_at", "account", "positions", "ticks"])):
+    """
+    Account, open positions and ticks read once per loop cycle. Risk checks,
+    execute_trade and the trailing stop all read the same view instead of
+    querying the terminal separately.
+    """
+    __slots__ = ()
+
+    def positions_for(self, symbol):
+        return tuple(p for p in self.positions if p.symbol == symbol)
+
+    def tick(self, symbol):
+        return self.ticks.get(symbol)
+
+    @property
+    def floating_pnl(self):
+        return sum(p.profit for p in self.positions)
+
+
+def take_snapshot(symbols=()):
+    """Snapshot of the account, all positions and ticks for symbols plus every position's symbol, or None."""
+    account = mt5.account_info()
+    positions = mt5.positions_get()
+    if account is None or positions is None:
+        session.mark_failed()
+        log_error(f"Failed to take account snapshot: {mt5.last_error()}")
+        return None
+    positions = tuple(positions)
+    ticks = {}
+    for symbol in dict.fromkeys([*symbols, *(p.symbol for p in positions)]):
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None:
+            ticks[symbol] = tick
+    return CycleSnapshot(time.time(), account, positions, MappingProxyType(ticks))
+
+
+def refresh_symbol(snapshot, symbol):
+    """
+    snapshot with symbol's positions and tick read again, right before an order is sent
+    for it; the account and other symbols stay as they were. None on terminal failure.
+    """
+    positions = mt5.positions_get(symbol=symbol)
+    tick = mt5.symbol_info_tick(symbol)
+    if positions is None or tick is None:
+        session.mark_failed()
+        log_error(f"Failed to refresh positions for {symbol}: {mt5.last_error()}")
+        return None
+    others = tuple(p for p in snapshot.positions if p.symbol != symbol)
+    ticks = dict(snapshot.ticks)
+    ticks[symbol] = tick
+    return snapshot._replace(positions=others + tuple(positions), ticks=MappingProxyType(ticks))
+
+
+class SnapshotCache:
+    """
+    The latest loop snapshot. The monitor loop stores one per cycle; strategy threads
+    reuse it while it is at most SNAPSHOT_MAX_AGE_SECONDS old instead of taking their own.
+    """
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._snapshot = None
+
+    def put(self, snapshot):
+        if snapshot is not None:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get(self, symbols=()):
+        """The stored snapshot if fresh and it has ticks for symbols, else a new one (stored too)."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.time() - snapshot.taken_at <= self.max_age and \
+                all(symbol in snapshot.ticks for symbol in symbols):
+            return snapshot
+        return self.put(take_snapshot(symbols))
+
+
+snapshots = SnapshotCache()
+
+
 def initialize_mt5():
     for attempt in range(3):
         if mt5.initialize():
             account_info = mt5.account_info()
             if account_info:
                 log_info(f"Logged in as {account_info.login} (Balance: {account_info.balance})")
+                session.mark_connected(account_info)
                 return True
             else:
                 log_error("Failed to retrieve account info.")
@@ -20,21 +192,60 @@ def initialize_mt5():
     return False
 
 def shutdown_mt5():
+    executor.drain(timeout=10)
     mt5.shutdown()
     log_info("MT5 connection closed")
 
-def fetch_historical_data(symbol, timeframe, Bars):
-    if not mt5.symbol_select(symbol, True):
-        log_error(f"Symbol {symbol} not available in MT5.")
-        return pd.DataFrame()
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, Bars)
+def fetch_rates(symbol, timeframe, Bars):
+    """Last Bars rates (the newest still forming) as an MT5 rate array, or None."""
+    with metrics.timer("fetch_rates", symbol=symbol):
+        if BAR_CACHE_ENABLED:
+            rates = _fetch_cached_rates(symbol, timeframe, Bars)
+        elif session.symbol_meta(symbol) is None:
+            return None
+        else:
+            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, Bars)
     if rates is None or len(rates) == 0:
         log_error(f"Failed to fetch data for {symbol}")
+        return None
+    return rates
+
+def fetch_historical_data(symbol, timeframe, Bars):
+    rates = fetch_rates(symbol, timeframe, Bars)
+    if rates is None:
         return pd.DataFrame()
     df = pd.DataFrame(rates)
     df['time'] = pd.to_datetime(df['time'], unit='s')
     return df
 
+def _fetch_cached_rates(symbol, timeframe, Bars):
+    """
+    Fetch only bars newer than the cached tail, merge them into the bar cache
+    and return the last Bars cached bars. Falls back to the cache alone when
+    the terminal is unavailable.
+    """
+    cache = BarCache()
+    cached = cache.load(symbol, timeframe)
+    if session.symbol_meta(symbol) is None:
+        log_error(f"Using cached bars for {symbol}.")
+        rates = None
+    elif cached is None or len(cached) < Bars:
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, Bars)
+    else:
+        # Refetch from the last cached bar, which may have still been forming
+        last_time = pd.to_datetime(int(cached["time"][-1]), unit="s")
+        rates = mt5.copy_rates_range(symbol, timeframe, last_time, datetime.now() + timedelta(days=1))
+    # Release the memory map before the cache file is replaced
+    del cached
+
+    if rates is not None and len(rates) > 0:
+        # The newest bar is still forming, so only mark coverage up to just before it
+        cache.store(symbol, timeframe, rates, int(rates["time"][0]), int(rates["time"][-1]) - 1,
+                    max_bars=BAR_CACHE_MAX_BARS)
+
+    cached = cache.load(symbol, timeframe)
+    return None if cached is None else np.array(cached[-Bars:])
+
 def get_open_chart():
     try:
         return MANUAL_SYMBOL, MANUAL_TIMEFRAME
@@ -42,27 +253,32 @@ def get_open_chart():
         log_error(f"Failed to retrieve open chart: {e}")
     return None, None
 
-def execute_trade(symbol, action, price, stop_loss=None, tp=None):
-    if not mt5.initialize():
-        log_error("MT5 is not initialized.")
-        return False
-
-    account_info = mt5.account_info()
-    if account_info is None:
-        log_error("MT5 is not logged in. Check your credentials.")
-        return False
+def execute_trade(symbol, action, price, stop_loss=None, tp=None, snapshot=None):
+    """
+    Validate against the snapshot and queue the order on the executor without
+    waiting for it. Returns the order's Future, or False if nothing was sent.
+    """
+    if snapshot is None:
+        # A caller's snapshot already proves the terminal answers
+        if not session.ensure_connected():
+            log_error("MT5 is not connected.")
+            return False
+        snapshot = take_snapshot([symbol])
+        if snapshot is None:
+            return False
 
-    if not account_info.trade_allowed:
+    if not snapshot.account.trade_allowed:
         log_error("Trading not allowed on this account. Check broker settings.")
         return False
 
-    if not mt5.symbol_select(symbol, True):
-        log_error(f"Symbol {symbol} not available in MT5.")
+    symbol_info = session.symbol_meta(symbol)
+    if symbol_info is None:
         return False
 
-    positions = mt5.positions_get(symbol=symbol)
+    positions = snapshot.positions_for(symbol)
 
     # Prevent opening a new trade in the same direction
+    closes = []
     for position in positions:
         if position.type == mt5.ORDER_TYPE_BUY and action == "buy":
             log_info(f"Skipped BUY: already open BUY on {symbol}")
@@ -74,25 +290,24 @@ def execute_trade(symbol, action, price, stop_loss=None, tp=None):
         # Close opposite direction trade
         if position.type == mt5.ORDER_TYPE_BUY and action == "sell":
             log_info(f"Closing opposite BUY trade for {symbol}")
-            close_position(position)
+            closes.append(close_position(position, snapshot.tick(symbol), symbol_info))
         elif position.type == mt5.ORDER_TYPE_SELL and action == "buy":
             log_info(f"Closing opposite SELL trade for {symbol}")
-            close_position(position)
-
-    symbol_info = mt5.symbol_info(symbol)
-    if symbol_info is None:
-        log_error(f"Failed to get symbol info for {symbol}")
-        return False
+            closes.append(close_position(position, snapshot.tick(symbol), symbol_info))
+        if False in closes:
+            log_error(f"Could not queue the close of {position.ticket}; not opening {action.upper()} {symbol}")
+            return False
 
     if LOT_SIZE < symbol_info.volume_min or LOT_SIZE > symbol_info.volume_max:
         log_error(f"Lot size {LOT_SIZE} is outside allowed range.")
         return False
 
-    price_data = mt5.symbol_info_tick(symbol)
+    price_data = snapshot.tick(symbol)
     if price_data is None:
         log_error(f"Failed to get price for {symbol}")
         return False
 
+    signal_price = price
     ask_price = price_data.ask
     bid_price = price_data.bid
     price = ask_price if action == "buy" else bid_price
@@ -104,71 +319,56 @@ def execute_trade(symbol, action, price, stop_loss=None, tp=None):
         else:
             stop_loss = price + (50 * symbol_info.point)
 
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
+    request = executor.template(symbol, symbol_info)
+    request.update({
         "volume": LOT_SIZE,
         "type": mt5.ORDER_TYPE_BUY if action == "buy" else mt5.ORDER_TYPE_SELL,
         "price": price,
         "sl": round(stop_loss, symbol_info.digits),
         "tp": tp if tp else 0.0,
-        "deviation": 50,
-        "magic": 123456,
-        "comment": "AutoTrade",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": symbol_info.filling_mode
-    }
+    })
 
-    log_info(f"Sending trade request: {json.dumps(request, indent=4)}")
+    log_info(f"Queueing {action.upper()} {symbol} {LOT_SIZE} @ {price} (signal {signal_price}, spread {spread:.{symbol_info.digits}f})")
+    # Only opened once the opposite position is closed
+    return executor.submit(request, symbol_info, signal_price, label=action.upper(), after=closes)
 
-    for attempt in range(3):
-        result = mt5.order_send(request)
-        if result is None:
-            error = mt5.last_error()
-            log_error(f"Trade attempt {attempt + 1} failed. Broker rejection. Error: {error}")
-        else:
-            log_info(f"MT5 Trade Response (Attempt {attempt + 1}): {result._asdict()}")
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                log_info(f"Trade executed: {action.upper()} {symbol} at {price}")
-                return True
-            else:
-                log_error(f"Trade failed (Attempt {attempt + 1}): Retcode {result.retcode} - {result.comment}")
-        time.sleep(2)
-
-    return False
-
-def close_position(position):
+def close_position(position, tick=None, meta=None):
+    """Queue a market close of position; returns the order's Future, or False."""
     close_type = mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-    price = mt5.symbol_info_tick(position.symbol).bid if close_type == mt5.ORDER_TYPE_SELL else mt5.symbol_info_tick(position.symbol).ask
+    if tick is None:
+        tick = session.tick(position.symbol)
+    if tick is None:
+        return False
+    price = tick.bid if close_type == mt5.ORDER_TYPE_SELL else tick.ask
+    meta = meta or session.symbol_meta(position.symbol)
+    if meta is None:
+        return False
 
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": position.symbol,
+    request = executor.template(position.symbol, meta)
+    request.update({
         "volume": position.volume,
         "type": close_type,
         "position": position.ticket,
         "price": price,
         "deviation": 20,
-        "magic": 123456,
         "comment": "AutoClose",
-        "type_time": mt5.ORDER_TIME_GTC,
         "type_filling": mt5.ORDER_FILLING_IOC,
-    }
+    })
 
-    result = mt5.order_send(request)
-    if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
-        log_info(f"Closed trade {position.ticket} ({'BUY' if position.type == 0 else 'SELL'}) at {price}")
-        return True
-    else:
-        log_error(f"Failed to close position {position.ticket}. Retcode: {getattr(result, 'retcode', 'N/A')}")
-        return False
+    log_info(f"Queueing close of {position.ticket} ({'BUY' if position.type == 0 else 'SELL'}) at {price}")
+    return executor.submit(request, meta, label=f"CLOSE {position.ticket}")
 
 
-def adjust_trailing_stop():
+def adjust_trailing_stop(snapshot=None):
     if not TRAILING_STOP_ENABLED:
         return
 
-    positions = mt5.positions_get()
+    if snapshot is None:
+        snapshot = take_snapshot()
+        if snapshot is None:
+            return
+
+    positions = snapshot.positions
     if not positions:
         log_info("No open positions.")
         return
@@ -176,15 +376,13 @@ def adjust_trailing_stop():
     for position in positions:
         symbol = position.symbol
         order_type = position.type
-        tick_data = mt5.symbol_info_tick(symbol)
-
+        tick_data = snapshot.tick(symbol)
         if tick_data is None:
             log_error(f"Failed to get tick data for {symbol}")
             continue
 
-        symbol_info = mt5.symbol_info(symbol)
+        symbol_info = session.symbol_meta(symbol)
         if symbol_info is None:
-            log_error(f"Failed to get symbol info for {symbol}")
             continue
 
         current_price = tick_data.ask if order_type == mt5.ORDER_TYPE_BUY else tick_data.bid
@@ -202,13 +400,11 @@ def adjust_trailing_stop():
                (order_type == mt5.ORDER_TYPE_SELL and (position.sl == 0 or new_sl < position.sl)):
                 modify_request = {
                     "action": mt5.TRADE_ACTION_SLTP,
+                    "symbol": symbol,
                     "position": position.ticket,
                     "sl": round(new_sl, symbol_info.digits),
                     "tp": position.tp
                 }
 
-                result = mt5.order_send(modify_request)
-                if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-                    log_info(f"Trailing Stop updated for {symbol} at {new_sl}")
-                else:
-                    log_error(f"Failed to update trailing stop for {symbol}: {result.retcode}")
+                log_info(f"Queueing trailing stop for {symbol} at {new_sl}")
+                executor.submit(modify_request, symbol_info, label=f"SLTP {position.ticket}")
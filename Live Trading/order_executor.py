@@ -0,0 +1,196 @@
+# order_executor.py
+# Sends orders from a dedicated thread so signal evaluation never waits on
+# order_send retries. Requests are built from per-symbol templates, retried
+# per retcode, and every order_send round trip is timed.
+
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from config import ORDER_MAX_ATTEMPTS, ORDER_RETRY_BACKOFF_SECONDS, ORDER_REPORT_HISTORY, ORDER_MAGIC
+from terminal import mt5
+from metrics import metrics
+from utils import log_info, log_error
+
+OrderReport = namedtuple("OrderReport", [
+    "label", "symbol", "retcode", "attempts", "latency_ms",
+    "signal_price", "request_price", "fill_price", "slippage_pts"
+])
+
+# Retcodes worth retrying: with a fresh price, or after a backoff. TRADE_RETCODE_REJECT is
+# final: the broker turned the request down and resending it would only be rejected again
+REPRICE_RETCODES = ("TRADE_RETCODE_REQUOTE", "TRADE_RETCODE_PRICE_CHANGED", "TRADE_RETCODE_PRICE_OFF")
+BACKOFF_RETCODES = ("TRADE_RETCODE_TIMEOUT", "TRADE_RETCODE_CONNECTION", "TRADE_RETCODE_TOO_MANY_REQUESTS",
+                    "TRADE_RETCODE_LOCKED")
+SUCCESS_RETCODES = ("TRADE_RETCODE_DONE", "TRADE_RETCODE_DONE_PARTIAL", "TRADE_RETCODE_PLACED")
+
+
+def _retcodes(names):
+    return {getattr(mt5, name) for name in names if hasattr(mt5, name)}
+
+
+class OrderExecutor:
+    """
+    FIFO order queue served by one worker thread. submit() returns a Future that
+    resolves to the final OrderSendResult (or None). Retcodes in REPRICE_RETCODES
+    are resent at once with the current tick; BACKOFF_RETCODES and a None result
+    wait ORDER_RETRY_BACKOFF_SECONDS, doubling per attempt; anything else is final.
+    Only the newest queued SLTP request per position is sent, and an order submitted
+    with after= is skipped (resolving to None) unless those earlier orders all filled.
+    """
+    def __init__(self, max_attempts=ORDER_MAX_ATTEMPTS, backoff=ORDER_RETRY_BACKOFF_SECONDS,
+                 history=ORDER_REPORT_HISTORY):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.reports = deque(maxlen=history)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_future = None
+        self._latest_sltp = {}  # position ticket -> Future of its newest SLTP request
+        self._templates = {}
+        self._policy = None
+
+    def template(self, symbol, meta):
+        """Static part of a market-deal request for symbol, rebuilt only when its metadata changes."""
+        cached = self._templates.get(symbol)
+        if cached is None or cached[0] != meta:
+            cached = (meta, {
+                "action": mt5.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "deviation": 50,
+                "magic": ORDER_MAGIC,
+                "comment": "AutoTrade",
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": meta.filling_mode,
+            })
+            self._templates[symbol] = cached
+        return dict(cached[1])
+
+    def submit(self, request, meta, signal_price=None, label="order", after=()):
+        """Queue request; after holds Futures of orders that must fill first (e.g. closing the opposite side)."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-executor", daemon=True)
+                self._thread.start()
+            self._last_future = future
+            if request.get("action") == mt5.TRADE_ACTION_SLTP:
+                self._latest_sltp[request.get("position")] = future
+            self._queue.put((future, request, meta, signal_price, label, after))
+        return future
+
+    def drain(self, timeout=None):
+        """Wait for every order submitted so far (FIFO, so the last one is enough)."""
+        future = self._last_future
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def _run(self):
+        while True:
+            future, request, meta, signal_price, label, after = self._queue.get()
+            try:
+                if self._superseded(future, request):
+                    metrics.inc("orders", kind=label.split()[0], outcome="superseded")
+                    future.set_result(None)
+                    continue
+                if not all(self._filled(f) for f in after):
+                    log_error(f"[ORDER] {label} {request.get('symbol')} skipped: an order it depends on did not fill")
+                    metrics.inc("orders", kind=label.split()[0], outcome="skipped")
+                    future.set_result(None)
+                    continue
+                future.set_result(self._send(request, meta, signal_price, label))
+            except BaseException as e:
+                log_error(f"[ORDER] {label} {request.get('symbol')} failed: {e}")
+                future.set_exception(e)
+
+    def _superseded(self, future, request):
+        """True for an SLTP request with a newer one for the same position queued behind it."""
+        if request.get("action") != mt5.TRADE_ACTION_SLTP:
+            return False
+        with self._lock:
+            ticket = request.get("position")
+            if self._latest_sltp.get(ticket) is not future:
+                return True
+            del self._latest_sltp[ticket]
+            return False
+
+    def _filled(self, future):
+        """Whether an earlier order (already resolved, the queue being FIFO) filled."""
+        if future.exception() is not None:
+            return False
+        result = future.result()
+        success, _, _ = self._retry_policy()
+        return result is not None and result.retcode in success
+
+    def _retry_policy(self):
+        if self._policy is None:
+            self._policy = (_retcodes(SUCCESS_RETCODES), _retcodes(REPRICE_RETCODES), _retcodes(BACKOFF_RETCODES))
+        return self._policy
+
+    def _send(self, request, meta, signal_price, label):
+        success, reprice, backoff = self._retry_policy()
+        symbol = request.get("symbol")
+        kind = label.split()[0]
+        result = retcode = None
+        latency_ms = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            t0 = time.perf_counter()
+            result = mt5.order_send(request)
+            latency_ms = (time.perf_counter() - t0) * 1000
+            retcode = result.retcode if result is not None else None
+            metrics.observe("order_send", latency_ms, kind=kind)
+            metrics.inc("order_attempts", symbol=symbol, kind=kind)
+            metrics.inc("order_retcodes", retcode=retcode)
+
+            if retcode in success:
+                self._record(label, request, meta, result, retcode, attempt, latency_ms, signal_price)
+                return result
+
+            comment = result.comment if result is not None else mt5.last_error()
+            log_error(f"[ORDER] {label} {symbol} attempt {attempt}/{self.max_attempts} failed "
+                      f"in {latency_ms:.1f} ms: retcode {retcode} - {comment}")
+            if attempt == self.max_attempts:
+                break
+            if retcode in reprice and "price" in request:
+                tick = mt5.symbol_info_tick(symbol)
+                if tick is not None:
+                    request["price"] = tick.ask if request["type"] == mt5.ORDER_TYPE_BUY else tick.bid
+            elif retcode is None or retcode in backoff:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            else:
+                break
+
+        self._record(label, request, meta, result, retcode, attempt, latency_ms, signal_price)
+        return result
+
+    def _record(self, label, request, meta, result, retcode, attempts, latency_ms, signal_price):
+        request_price = request.get("price")
+        fill_price = getattr(result, "price", 0.0) or request_price
+        slippage_pts = None
+        if signal_price and fill_price and meta is not None:
+            # Positive = filled worse than the signal price
+            sign = 1 if request.get("type") == mt5.ORDER_TYPE_BUY else -1
+            slippage_pts = round(sign * (fill_price - signal_price) / meta.point, 1)
+        report = OrderReport(label, request.get("symbol"), retcode, attempts, round(latency_ms, 2),
+                             signal_price, request_price, fill_price, slippage_pts)
+        self.reports.append(report)
+        success, _, _ = self._retry_policy()
+        metrics.inc("orders", kind=label.split()[0], outcome="filled" if retcode in success else "failed")
+        log_info(f"[ORDER] {label} {report.symbol} retcode {retcode} after {attempts} attempt(s), "
+                 f"round trip {report.latency_ms} ms, fill {fill_price}, slippage {slippage_pts} pts")
+
+    def latency_percentiles(self):
+        """(p50, p99, max) order_send latency in ms over the kept reports, or None."""
+        latencies = sorted(r.latency_ms for r in self.reports)
+        if not latencies:
+            return None
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+        return pick(0.5), pick(0.99), latencies[-1]
+
+
+executor = OrderExecutor()
@@ -0,0 +1,56 @@
+# state_store.py
+# Warm-start snapshot of the live bot: per strategy the bar buffer, streaming
+# indicator state and last processed bar, plus the daily-loss day-start
+# balance. Saved on a timer and at shutdown, loaded at startup so a restart
+# only fetches the bars it missed and keeps the true day-start balance.
+
+import os
+import pickle
+from time import time
+from config import STATE_ENABLED, STATE_PATH
+from utils import log_info, log_error
+
+STATE_VERSION = 1
+
+
+def load_state(path=STATE_PATH):
+    """
+    The saved snapshot, or None when there is none or it cannot be used.
+    The file is a pickle and is only ever read back from the bot's own STATE_PATH.
+    """
+    if not STATE_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        log_error(f"[STATE] Could not read {path}: {e}. Starting cold.")
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        log_info(f"[STATE] {path} is from another version. Starting cold.")
+        return None
+    log_info(f"[STATE] Loaded {path}, saved {time() - state['saved_at']:.0f}s ago")
+    return state
+
+
+def strategy_state(state, name):
+    """One strategy's part of a loaded snapshot, or None."""
+    return state["strategies"].get(name) if state else None
+
+
+def save_state(strategies, daily_loss_manager, path=STATE_PATH):
+    if not STATE_ENABLED:
+        return
+    state = {
+        "version": STATE_VERSION,
+        "saved_at": time(),
+        "daily_loss": daily_loss_manager.state(),
+        "strategies": {s.name: s.state() for s in strategies},
+    }
+    # Write to a temp file and swap in, so a crash never leaves a half-written snapshot
+    try:
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    except (OSError, pickle.PicklingError) as e:
+        log_error(f"[STATE] Could not write {path}: {e}")
@@ -1,8 +1,19 @@
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
-from utils import log_info, log_error
+from utils import log_info, log_error, log_debug
 
-def calculate_indicators(df, params):
+# Compact frames keep only what the strategy reads: close, adx, rsi and the
+# SuperTrend direction as an int8 signal instead of "buy"/"sell"/"hold" strings
+SIGNAL_NAMES = {1: "buy", -1: "sell", 0: "hold"}
+COMPACT_TOLERANCE = 1e-6  # Max relative adx/rsi deviation of a compact frame (float32 rounding)
+
+def calculate_indicators(df, params, compact=False, float32=False):
+    """
+    Add SuperTrend, ADX and RSI for params to the bar frame, indexed by time.
+    With compact, return only close, adx, rsi and signal (int8: 1 buy, -1 sell, 0 hold),
+    with adx/rsi as float32 if asked.
+    """
     if df.empty:
         log_error("Empty DataFrame.")
         return df
@@ -20,6 +31,19 @@ def calculate_indicators(df, params):
         log_error(f"Missing {supertrend_col} column.")
         return df
 
+    if compact:
+        direction = df[supertrend_col].to_numpy()
+        signal = np.where(direction == 1, 1, np.where(direction == -1, -1, 0)).astype(np.int8)
+        adx = ta.adx(df['high'], df['low'], df['close'], length=params["adx_period"])[f"ADX_{params['adx_period']}"]
+        rsi = ta.rsi(df['close'], length=params["rsi_period"])
+        dtype = np.float32 if float32 else np.float64
+        return pd.DataFrame({
+            "close": df['close'].to_numpy(dtype=np.float64),
+            "adx": adx.ffill().to_numpy(dtype=dtype),
+            "rsi": rsi.ffill().to_numpy(dtype=dtype),
+            "signal": signal,
+        }, index=df.index)
+
     df["supertrend_signal"] = df[supertrend_col].map({1: "buy", -1: "sell"}).fillna("hold")
 
     if supertrend_lower_col in df.columns:
@@ -30,5 +54,39 @@ def calculate_indicators(df, params):
 
     df["rsi"] = ta.rsi(df['close'], length=params["rsi_period"]).ffill()
 
-    log_info(df.tail(5))
+    log_debug("Indicators tail:\n%s", df.tail(5))
     return df
+
+def row_signal(row):
+    """"buy"/"sell"/"hold" of a full or compact indicator row."""
+    if "signal" in row:
+        return SIGNAL_NAMES[int(row["signal"])]
+    return row["supertrend_signal"]
+
+def verify_compact(full, compact, tolerance=COMPACT_TOLERANCE):
+    """
+    Parity of a compact frame with the full calculate_indicators output for the same params:
+    signals and close must match exactly, adx/rsi within `tolerance` (relative).
+    """
+    if len(full) != len(compact) or not full.index.equals(compact.index):
+        log_error("[COMPACT] Index differs from the full frame")
+        return False
+    expected = full["supertrend_signal"].map({"buy": 1, "sell": -1}).fillna(0).to_numpy()
+    if not np.array_equal(expected, compact["signal"].to_numpy()):
+        log_error("[COMPACT] Signal mismatch vs the full frame")
+        return False
+    if not np.array_equal(full["close"].to_numpy(), compact["close"].to_numpy(), equal_nan=True):
+        log_error("[COMPACT] Close mismatch vs the full frame")
+        return False
+    worst = 0.0
+    for col in ("adx", "rsi"):
+        a = compact[col].to_numpy(dtype=np.float64)
+        b = full[col].to_numpy(dtype=np.float64)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            log_error(f"[COMPACT] {col} NaN pattern differs from the full frame")
+            return False
+        both = ~np.isnan(b)
+        if both.any():
+            worst = max(worst, float(np.max(np.abs(a[both] - b[both]) / np.maximum(np.abs(b[both]), 1.0))))
+    log_info(f"[COMPACT] Signals and close identical, max relative adx/rsi deviation {worst:.2e}")
+    return worst <= tolerance
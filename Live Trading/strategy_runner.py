@@ -0,0 +1,242 @@
+# strategy_runner.py
+# Runs several (symbol, timeframe, params) strategies in one process. Each
+# strategy waits for its own bar closes on a thread; every terminal call goes
+# through the single worker in terminal.py. Account-wide work (daily loss
+# check, trailing stops) runs once per cycle on the calling thread.
+
+import copy
+import os
+import threading
+from time import perf_counter
+import pandas as pd
+from config import *
+from bar_feed import BarFeed
+from metrics import metrics
+from mt5_connector import session, take_snapshot, snapshots, refresh_symbol, execute_trade, adjust_trailing_stop
+from strategy import calculate_indicators, row_signal, verify_compact
+from streaming_indicators import StreamingIndicators, verify_against_frame
+from state_store import save_state
+from utils import log_info, log_error
+
+
+class LiveStrategy:
+    """One strategy instance: its own bar buffer, indicator state and params."""
+    def __init__(self, symbol, timeframe, params):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.params = params
+        self.name = f"{symbol}@{timeframe}"
+        self.feed = BarFeed(symbol, timeframe, Bars)
+        # Incremental indicators, seeded from the bar buffer on the first closed bar
+        self.indicators = StreamingIndicators(params) if STREAMING_INDICATORS else None
+        self.compact = INDICATOR_COMPACT
+        self.last_bar = None  # time of the last closed bar evaluated
+        self.lock = threading.Lock()  # indicator updates vs state snapshots
+        # Set by StrategyRunner; every order is checked against the funded daily loss first
+        self.daily_loss_manager = None
+        self.halted = threading.Event()
+
+    def prime(self, saved=None):
+        """Warm start from this strategy's saved state when it fits, else load history from scratch."""
+        if saved is not None and self.restore(saved):
+            return True
+        if not self.feed.prime():
+            log_error(f"[{self.name}] No historical data.")
+            return False
+        if self.compact and INDICATOR_COMPACT_VERIFY and not verify_compact(
+                calculate_indicators(self.feed.frame(), self.params),
+                calculate_indicators(self.feed.frame(), self.params, compact=True)):
+            log_error(f"[{self.name}] Compact indicators differ from the full frame. Using full frames.")
+            self.compact = False
+        return True
+
+    def restore(self, saved):
+        """Restore bars and indicator state from a snapshot and fetch only the missed bars."""
+        t0 = perf_counter()
+        if saved["params"] != self.params or saved["capacity"] != self.feed.capacity:
+            log_info(f"[{self.name}] Saved state is for other params or buffer size. Starting cold.")
+            return False
+        missed = self.feed.restore(saved["bars"], saved["forming_time"])
+        if missed is None:
+            log_info(f"[{self.name}] Saved state is unusable or too old. Starting cold.")
+            return False
+        self.compact = saved["compact"]
+        self.last_bar = saved["last_bar"]
+        bars = self.feed.buffer.to_array()
+        indicators = saved["indicators"]
+        if self.indicators is not None and indicators is not None and indicators.last_time is not None:
+            # Catch up on every buffered bar the saved state has not seen: the missed
+            # bars, plus any the feed stored just before the snapshot was taken
+            indicators.extend(bars[bars["time"] > indicators.last_time])
+            self.indicators = indicators
+        if self.last_bar is not None:
+            # Signals on bars that closed while the bot was down are stale; report them, don't trade them
+            skipped = int((bars["time"] > self.last_bar).sum())
+            if skipped:
+                log_info(f"[{self.name}] {skipped} bar(s) closed since the last evaluated one at "
+                         f"{pd.to_datetime(self.last_bar, unit='s')} and were not traded. "
+                         f"Trading resumes on the next close.")
+        log_info(f"[{self.name}] Warm start in {(perf_counter() - t0) * 1000:.0f} ms, "
+                 f"{len(missed)} bar(s) missed")
+        return True
+
+    def state(self):
+        """Picklable warm-start state (see state_store)."""
+        bars, forming_time = self.feed.snapshot()
+        with self.lock:
+            indicators = copy.deepcopy(self.indicators)
+            last_bar = self.last_bar
+        return {
+            "params": self.params,
+            "capacity": self.feed.capacity,
+            "bars": bars,
+            "forming_time": forming_time,
+            "indicators": indicators,
+            "compact": self.compact,
+            "last_bar": last_bar,
+        }
+
+    def latest_rows(self, new_bars):
+        """(prev_row, last_row) of indicator values for the last two closed bars."""
+        if self.indicators is not None:
+            if self.indicators.last_time is not None:
+                return self.indicators.extend(new_bars)
+            # First bar: seed from everything in the buffer (new_bars are already in it)
+            self.indicators.extend(self.feed.buffer.to_array())
+            if not STREAMING_VERIFY or verify_against_frame(
+                    self.indicators, calculate_indicators(self.feed.frame(), self.params)):
+                return self.indicators.prev_row, self.indicators.last_row
+            log_error(f"[{self.name}] Streaming indicators out of tolerance. Falling back to full recalculation.")
+            self.indicators = None
+
+        df = calculate_indicators(self.feed.frame(), self.params, compact=self.compact)
+        return df.iloc[-2], df.iloc[-1]
+
+    def on_bars(self, new_bars):
+        """Evaluate the signal on the just-closed bar and trade it."""
+        with metrics.timer("indicators", strategy=self.name), self.lock:
+            prev_row, last_row = self.latest_rows(new_bars)
+            self.last_bar = int(new_bars["time"][-1])
+        params = self.params
+
+        signal = row_signal(last_row)
+        supertrend_signal = signal if signal == row_signal(prev_row) else "hold"
+        adx = last_row['adx']
+        rsi = last_row['rsi']
+        price = last_row['close']
+
+        log_info(f"[{self.name}] SuperTrend: {supertrend_signal}, ADX: {adx}, RSI: {rsi}, Price: {price}")
+
+        if not all(pd.notna([supertrend_signal, adx, rsi, price])):
+            return False
+        if supertrend_signal not in ("buy", "sell") or adx < params["adx_threshold"] or \
+           not params["rsi_oversold"] <= rsi <= params["rsi_overbought"]:
+            return False
+
+        if self.halted.is_set():
+            log_error(f"[{self.name}] Trading halted. Ignoring {supertrend_signal} signal.")
+            return False
+        # The loop's snapshot for the risk check; only this symbol is re-read before the order
+        with metrics.timer("snapshot", strategy=self.name):
+            snapshot = snapshots.get([self.symbol])
+        if snapshot is None:
+            return False
+        if FUNDED_MODE and self.daily_loss_manager is not None:
+            with metrics.timer("risk_check", strategy=self.name):
+                stop_bot = self.daily_loss_manager.check(snapshot)
+            if stop_bot:
+                self.halted.set()
+                log_error(f"[{self.name}] FUNDED MODE: Max daily loss exceeded. Order refused.")
+                return False
+        metrics.inc("signals", strategy=self.name, signal=supertrend_signal)
+        with metrics.timer("refresh_positions", strategy=self.name):
+            snapshot = refresh_symbol(snapshot, self.symbol)
+        if snapshot is None:
+            return False
+        with metrics.timer("execute_trade", strategy=self.name):
+            return execute_trade(self.symbol, supertrend_signal, price, snapshot=snapshot)
+
+    def run(self, stop):
+        while not stop.is_set():
+            new_bars = self.feed.wait_for_bar(TRADE_FREQUENCY_SECONDS)
+            if new_bars is None:
+                log_error(f"[{self.name}] No new bar data.")
+                stop.wait(TRADE_FREQUENCY_SECONDS)
+                continue
+            if len(new_bars) == 0 or stop.is_set():
+                continue
+            metrics.inc("bars", len(new_bars), strategy=self.name)
+            try:
+                with metrics.timer("signal_cycle", strategy=self.name):
+                    self.on_bars(new_bars)
+            except Exception as e:
+                metrics.inc("cycle_errors", strategy=self.name)
+                log_error(f"[{self.name}] Strategy cycle failed: {e}")
+
+
+class StrategyRunner:
+    """
+    Starts one thread per strategy and runs the account-wide loop (stop flag,
+    connection health, daily loss, trailing stops) every TRADE_FREQUENCY_SECONDS.
+    Strategies also check the daily loss before each order; whichever side trips it
+    sets the shared halted flag, which refuses further orders and stops the bot.
+    """
+    def __init__(self, strategies, daily_loss_manager):
+        self.strategies = strategies
+        self.daily_loss_manager = daily_loss_manager
+        self.stop = threading.Event()
+        self.halted = threading.Event()
+        for strategy in strategies:
+            strategy.daily_loss_manager = daily_loss_manager
+            strategy.halted = self.halted
+
+    def run(self):
+        symbols = list(dict.fromkeys(s.symbol for s in self.strategies))
+        threads = [threading.Thread(target=s.run, args=(self.stop,), name=s.name, daemon=True)
+                   for s in self.strategies]
+        last_save = perf_counter()
+        for thread in threads:
+            thread.start()
+        log_info(f"Running {len(threads)} strategies: {', '.join(s.name for s in self.strategies)}")
+
+        try:
+            while not self.stop.is_set():
+                if self.halted.is_set():
+                    log_error("FUNDED MODE: Max daily loss exceeded. Stopping.")
+                    break
+
+                if os.path.exists("stop.flag"):
+                    log_info("Stop flag detected. Exiting.")
+                    os.remove("stop.flag")
+                    break
+
+                if not session.ensure_connected():
+                    log_error("Reinitializing MT5...")
+                    self.stop.wait(5)
+                    continue
+
+                cycle_start = perf_counter()
+                with metrics.timer("snapshot", strategy="account"):
+                    snapshot = snapshots.put(take_snapshot(symbols))
+                if snapshot is not None:
+                    if FUNDED_MODE:
+                        with metrics.timer("risk_check"):
+                            stop_bot = self.daily_loss_manager.check(snapshot)
+                        if stop_bot:
+                            self.halted.set()
+                            log_error("FUNDED MODE: Max daily loss exceeded. Stopping.")
+                            break
+                    with metrics.timer("trailing_stop"):
+                        adjust_trailing_stop(snapshot)
+                metrics.observe("monitor_cycle", (perf_counter() - cycle_start) * 1000)
+
+                if perf_counter() - last_save >= STATE_SAVE_SECONDS:
+                    save_state(self.strategies, self.daily_loss_manager)
+                    last_save = perf_counter()
+
+                self.stop.wait(TRADE_FREQUENCY_SECONDS)
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join(timeout=1)
+            save_state(self.strategies, self.daily_loss_manager)
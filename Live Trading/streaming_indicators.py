@@ -0,0 +1,209 @@
+# streaming_indicators.py
+#
+# O(1)-per-bar SuperTrend, ADX and RSI that reproduce pandas_ta's native
+# (non TA-Lib) formulas, including its pandas ewm(adjust=True) smoothing and
+# the ffill done in strategy.calculate_indicators. Seeded once from history,
+# then fed one closed bar at a time.
+
+import math
+from collections import namedtuple
+from config import STREAMING_TOLERANCE
+from utils import log_info, log_error
+
+Bar = namedtuple("Bar", ["time", "high", "low", "close"])
+NAN = float("nan")
+EPSILON = 2.220446049250313e-16  # sys.float_info.epsilon, pandas_ta's zero() cutoff
+
+
+def _div(a, b):
+    """a / b with pandas semantics: x/0 -> +-inf, 0/0 and NaN -> NaN."""
+    if b == 0 or b != b:
+        if a != a or a == 0 or b != b:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class EWMMean:
+    """
+    One value at a time equivalent of series.ewm(alpha=alpha, min_periods=min_periods).mean()
+    (adjust=True, ignore_na=False), which is what pandas_ta's rma() computes.
+    """
+    def __init__(self, length):
+        self.alpha = 1.0 / length if length > 0 else 0.5
+        self.min_periods = length
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value):
+        is_obs = value == value
+        self.nobs += is_obs
+        if self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + value) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif is_obs:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class StreamingATR:
+    """pandas_ta atr(): rma of the true range; the first bar has no true range."""
+    def __init__(self, length):
+        self.rma = EWMMean(length)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            tr = NAN
+        else:
+            pc = self.prev_close
+            tr = max(abs(high - low), abs(high - pc), abs(pc - low))
+        self.prev_close = close
+        return self.rma.update(tr)
+
+
+class StreamingRSI:
+    def __init__(self, length):
+        self.pos = EWMMean(length)
+        self.neg = EWMMean(length)
+        self.prev_close = None
+
+    def update(self, close):
+        diff = NAN if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        pos_avg = self.pos.update(diff if diff != diff else max(diff, 0.0))
+        neg_avg = self.neg.update(diff if diff != diff else min(diff, 0.0))
+        return _div(100 * pos_avg, pos_avg + abs(neg_avg))
+
+
+class StreamingADX:
+    def __init__(self, length):
+        self.atr = StreamingATR(length)
+        self.dmp = EWMMean(length)
+        self.dmn = EWMMean(length)
+        self.adx = EWMMean(length)
+        self.prev_high = None
+        self.prev_low = None
+
+    def update(self, high, low, close):
+        atr = self.atr.update(high, low, close)
+        if self.prev_high is None:
+            pos = neg = NAN
+        else:
+            up = high - self.prev_high
+            dn = self.prev_low - low
+            pos = up if (up > dn and up > 0) else 0.0
+            neg = dn if (dn > up and dn > 0) else 0.0
+            pos = 0.0 if abs(pos) < EPSILON else pos
+            neg = 0.0 if abs(neg) < EPSILON else neg
+        self.prev_high, self.prev_low = high, low
+
+        k = _div(100, atr)
+        dmp = k * self.dmp.update(pos)
+        dmn = k * self.dmn.update(neg)
+        dx = _div(100 * abs(dmp - dmn), dmp + dmn)
+        return self.adx.update(dx)
+
+
+class StreamingSuperTrend:
+    """pandas_ta supertrend(): direction flips when close breaks the previous bar's band."""
+    def __init__(self, length, multiplier):
+        self.atr = StreamingATR(length)
+        self.multiplier = multiplier
+        self.upper = None
+        self.lower = None
+        self.direction = 1
+
+    def update(self, high, low, close):
+        matr = self.multiplier * self.atr.update(high, low, close)
+        hl2 = 0.5 * (high + low)
+        upper, lower = hl2 + matr, hl2 - matr
+
+        if self.upper is not None:
+            if close > self.upper:
+                self.direction = 1
+            elif close < self.lower:
+                self.direction = -1
+            else:
+                if self.direction > 0 and lower < self.lower:
+                    lower = self.lower
+                if self.direction < 0 and upper > self.upper:
+                    upper = self.upper
+        self.upper, self.lower = upper, lower
+        return self.direction
+
+
+class StreamingIndicators:
+    """
+    The indicator set of strategy.calculate_indicators for one params dict,
+    fed one closed bar at a time. Rows come back as dicts with the same keys
+    the bot reads from the DataFrame: supertrend_signal, adx, rsi, close.
+    """
+    def __init__(self, params):
+        self.params = params
+        self.supertrend = StreamingSuperTrend(params["supertrend_period"], params["supertrend_multiplier"])
+        self.adx_calc = StreamingADX(params["adx_period"])
+        self.rsi_calc = StreamingRSI(params["rsi_period"])
+        self.adx = NAN
+        self.rsi = NAN
+        self.last_time = None
+        self.prev_row = None
+        self.last_row = None
+
+    def update(self, bar):
+        """Commit one closed bar (needs time, high, low, close) and return its row."""
+        direction = self.supertrend.update(bar.high, bar.low, bar.close)
+        adx = self.adx_calc.update(bar.high, bar.low, bar.close)
+        rsi = self.rsi_calc.update(bar.close)
+        # calculate_indicators ffills adx/rsi
+        if adx == adx:
+            self.adx = adx
+        if rsi == rsi:
+            self.rsi = rsi
+        self.last_time = bar.time
+        self.prev_row = self.last_row
+        self.last_row = {
+            "supertrend_signal": "buy" if direction == 1 else "sell",
+            "adx": self.adx,
+            "rsi": self.rsi,
+            "close": bar.close,
+        }
+        return self.last_row
+
+    def extend(self, rates):
+        """Commit closed bars from an MT5 rate array; returns (prev_row, last_row)."""
+        for t, high, low, close in zip(rates["time"].tolist(), rates["high"].tolist(),
+                                       rates["low"].tolist(), rates["close"].tolist()):
+            self.update(Bar(t, high, low, close))
+        return self.prev_row, self.last_row
+
+
+def verify_against_frame(stream, frame, tail=500):
+    """
+    Compare a seeded StreamingIndicators with calculate_indicators output over the
+    last `tail` closed rows. Returns True when adx/rsi agree within STREAMING_TOLERANCE
+    (relative) and every supertrend_signal matches.
+    """
+    check = StreamingIndicators(stream.params)
+    rows = frame.reset_index()
+    start = max(0, len(rows) - tail)
+    worst = 0.0
+    for i, bar in enumerate(rows[["time", "high", "low", "close"]].itertuples(index=False)):
+        row = check.update(bar)
+        if i < start:
+            continue
+        expected = rows.iloc[i]
+        if row["supertrend_signal"] != expected["supertrend_signal"]:
+            log_error(f"[STREAMING] SuperTrend mismatch at {bar.time}")
+            return False
+        for col in ("adx", "rsi"):
+            a, b = row[col], expected[col]
+            if a != a and b != b:
+                continue
+            worst = max(worst, abs(a - b) / max(abs(b), 1.0))
+    log_info(f"[STREAMING] Max relative deviation vs pandas_ta: {worst:.2e}")
+    return worst <= STREAMING_TOLERANCE
@@ -0,0 +1,74 @@
+# terminal.py
+# The MetaTrader5 package is not safe to call from several threads at once, so
+# every terminal call is funneled through one worker thread. Modules import
+# `mt5` from here instead of importing MetaTrader5 directly; constants pass
+# straight through and function calls run serialized on the worker.
+
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+from time import perf_counter
+import MetaTrader5 as _mt5
+
+
+class TerminalWorker:
+    """
+    Single daemon thread that runs terminal calls in submission order.
+    on_call, when set, is called as on_call(fn_name, wait_ms, run_ms) after each call.
+    """
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.on_call = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mt5-terminal", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            future, fn, args, kwargs, queued_at = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = perf_counter()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            on_call = self.on_call
+            if on_call is not None:
+                done = perf_counter()
+                on_call(getattr(fn, "__name__", "call"), (started - queued_at) * 1000, (done - started) * 1000)
+
+    def call(self, fn, *args, **kwargs):
+        # Calls made from the worker itself (nested) run inline
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs, perf_counter()))
+        return future.result()
+
+
+class TerminalProxy:
+    """Looks like the MetaTrader5 module; callables are routed through the worker."""
+    def __init__(self, module, worker):
+        self._module = module
+        self._worker = worker
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if callable(attr) and not isinstance(attr, type):
+            attr = functools.partial(self._worker.call, attr)
+        # Cache so later lookups skip __getattr__
+        setattr(self, name, attr)
+        return attr
+
+
+worker = TerminalWorker()
+mt5 = TerminalProxy(_mt5, worker)
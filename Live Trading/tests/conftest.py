@@ -0,0 +1,37 @@
+# conftest.py
+# Live Trading tests run offline on the backtester's fake_mt5 stand-in, installed
+# before any module that imports MetaTrader5 (config, terminal, ...).
+# Run from Live Trading/ (python -m pytest tests); see Backtester/tests/conftest.py.
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(HERE)), "Backtester"))
+# utils opens bot.log relative to the working directory at import time; keep it out of the tree
+os.chdir(tempfile.mkdtemp(prefix="live-tests-"))
+
+import fake_mt5  # noqa: E402
+
+fake_mt5.install()
+
+
+@pytest.fixture
+def rates():
+    """Factory for seeded random-walk M15 bars in MT5 rate-array layout."""
+    def make(n_bars, seed):
+        return fake_mt5.synthetic_rates(n_bars, seed=seed)
+    return make
+
+
+@pytest.fixture
+def with_gaps():
+    """Float series with a NaN warm-up and scattered NaNs, like the inputs rma() sees."""
+    values = np.random.default_rng(7).normal(0, 1, 400)
+    values[:3] = np.nan
+    values[[50, 51, 52, 200, 333]] = np.nan
+    return values
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_indicators import Bar, EWMMean, StreamingIndicators, StreamingRSI, verify_against_frame
+from config import STREAMING_TOLERANCE
+
+PARAMS = [dict(supertrend_period=10, supertrend_multiplier=3, adx_period=14, rsi_period=14),
+          dict(supertrend_period=7, supertrend_multiplier=2.5, adx_period=5, rsi_period=21)]
+
+
+def rma(values, length):
+    """pandas_ta's rma(): pandas ewm with adjust=True."""
+    return pd.Series(values).ewm(alpha=1.0 / length, min_periods=length).mean().to_numpy()
+
+
+def frame(rates):
+    df = pd.DataFrame(rates)
+    df["time"] = pd.to_datetime(df["time"], unit="s")
+    return df
+
+
+@pytest.mark.parametrize("length", [1, 2, 5, 14])
+def test_ewm_mean_matches_pandas(with_gaps, length):
+    ewm = EWMMean(length)
+    streamed = np.array([ewm.update(v) for v in with_gaps.tolist()])
+    np.testing.assert_allclose(streamed, rma(with_gaps, length), rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("length", [5, 14])
+def test_rsi_matches_pandas(rates, length):
+    close = rates(1500, seed=1)["close"]
+    diff = pd.Series(close).diff()
+    pos, neg = rma(diff.clip(lower=0), length), rma(diff.clip(upper=0), length)
+    expected = 100 * pos / (pos + np.abs(neg))
+
+    rsi = StreamingRSI(length)
+    np.testing.assert_allclose([rsi.update(c) for c in close.tolist()], expected, rtol=1e-10, equal_nan=True)
+
+
+@pytest.mark.parametrize("params", PARAMS, ids=["st10", "st7"])
+def test_matches_calculate_indicators(rates, params):
+    pytest.importorskip("pandas_ta")
+    from strategy import calculate_indicators
+
+    bars = rates(3000, seed=3)
+    full = calculate_indicators(frame(bars), params)
+    stream = StreamingIndicators(params)
+    rows = [stream.update(Bar(*bar)) for bar in frame(bars)[["time", "high", "low", "close"]].itertuples(index=False)]
+
+    assert [row["supertrend_signal"] for row in rows] == full["supertrend_signal"].tolist()
+    for col in ("adx", "rsi"):
+        np.testing.assert_allclose([row[col] for row in rows], full[col].to_numpy(),
+                                   rtol=STREAMING_TOLERANCE, atol=STREAMING_TOLERANCE, equal_nan=True)
+    assert verify_against_frame(stream, full, tail=len(full))
+
+
+def test_verify_rejects_tampered_frame(rates):
+    pytest.importorskip("pandas_ta")
+    from strategy import calculate_indicators
+
+    bars = rates(1000, seed=4)
+    full = calculate_indicators(frame(bars), PARAMS[0])
+    stream = StreamingIndicators(PARAMS[0])
+    stream.extend(bars)
+    full.iloc[-3, full.columns.get_loc("rsi")] *= 1.01
+    assert not verify_against_frame(stream, full)
+
+
+def test_extend_in_pieces_matches_one_pass(rates):
+    bars = rates(2000, seed=5)
+    whole = StreamingIndicators(PARAMS[1])
+    expected = whole.extend(bars)
+
+    pieces = StreamingIndicators(PARAMS[1])
+    for lo, hi in ((0, 700), (700, 701), (701, 1999), (1999, 2000)):
+        result = pieces.extend(bars[lo:hi])
+    assert result == expected
+    assert pieces.last_time == whole.last_time == int(bars["time"][-1])
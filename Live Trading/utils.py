@@ -1,21 +1,59 @@
+import atexit
+import json
 import logging
-import MetaTrader5 as mt5
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from terminal import mt5
 import datetime
+from config import LOG_LEVEL, LOG_JSON, LOG_MAX_BYTES, LOG_BACKUP_COUNT
 
-logging.basicConfig(
-    filename="bot.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+LOG_FILE = "bot.log"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-def log_info(msg):
-    logging.info(msg)
-    print(f"[INFO] {msg}")
 
-def log_error(msg):
-    logging.error(msg)
-    print(f"[ERROR] {msg}")
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers and jq."""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Callers (strategy threads, the order executor) only enqueue records;
+# a listener thread does the console and disk I/O.
+_file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                    delay=True)
+_file_handler.setFormatter(JsonLineFormatter() if LOG_JSON else
+                           logging.Formatter("%(asctime)s [%(levelname)s] - %(message)s", DATE_FORMAT))
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+
+_queue = queue.SimpleQueue()
+_listener = QueueListener(_queue, _file_handler, _console_handler)
+_listener.start()
+atexit.register(_listener.stop)
+
+logger = logging.getLogger("bot")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+logger.addHandler(QueueHandler(_queue))
+
+def log_info(msg, *args):
+    logger.info(msg, *args)
+
+def log_error(msg, *args):
+    logger.error(msg, *args)
+
+def log_debug(msg, *args):
+    """Formatting args is skipped entirely unless LOG_LEVEL is DEBUG."""
+    logger.debug(msg, *args)
 
 def log_trade(action, symbol, price, lot_size, sl, tp):
     msg = f"TRADE EXECUTED: {action.upper()} {symbol} at {price} | Lot: {lot_size} | SL: {sl} | TP: {tp if tp else 'None'}"